@@ -36,7 +36,7 @@ class AudioProcessor:
             result = subprocess.run(command, check=True, capture_output=True, text=True)
             val = result.stdout.strip()
             return float(val) if val and val != "N/A" else 0.0
-        except (subprocess.CalledProcessError, ValueError):
+        except (subprocess.CalledProcessError, ValueError, OSError):
             return 0.0
 
     @staticmethod
@@ -129,15 +129,17 @@ class AudioProcessor:
             return []
 
     @staticmethod
-    def split_by_size(input_path: str, output_pattern: str, max_size_mb: int = 15, threads: int = 0) -> List[str]:
+    def split_by_size(input_path: str, output_pattern: str, max_size_mb: int = 15, threads: int = 0, max_segment_time: int = None) -> List[str]:
         """
         Splits the audio into chunks of specified maximum size in MB.
+        If max_segment_time is given, chunks are also kept at or below that many seconds.
         """
         try:
             current_size_bytes = AudioProcessor.get_file_size(input_path)
             target_size_bytes = max_size_mb * 1024 * 1024
+            duration = AudioProcessor.get_duration(input_path) if max_segment_time else 0.0
             
-            if current_size_bytes <= target_size_bytes:
+            if current_size_bytes <= target_size_bytes and not (max_segment_time and duration > max_segment_time):
                 # No splitting needed, but copy to match pattern-ish if needed or just return single
                 directory = os.path.dirname(output_pattern) or "."
                 base_name = os.path.basename(output_pattern).replace("%03d", "001")
@@ -145,13 +147,15 @@ class AudioProcessor:
                 shutil.copy2(input_path, single_chunk)
                 return [single_chunk]
 
-            duration = AudioProcessor.get_duration(input_path)
+            duration = duration or AudioProcessor.get_duration(input_path)
             if duration <= 0:
                 return []
             
             # Estimate segment time: (target_size / current_size) * total_duration
             # We add a 10% safety margin to ensure we are under the MB limit
             segment_time = int((target_size_bytes / current_size_bytes) * duration * 0.9)
+            if max_segment_time:
+                segment_time = min(segment_time, int(max_segment_time))
             if segment_time < 10: segment_time = 10 # Minimum 10s
             
             print(f"      - Splitting into chunks based on size (estimated segment: {segment_time}s, threads={threads})...")
@@ -162,9 +166,10 @@ class AudioProcessor:
             return []
 
     @staticmethod
-    def process_for_transcription(input_path: str, max_size_mb: int = 15, output_dir: str = "temp", threads: int = 0, output_pattern: str = None) -> List[str]:
+    def process_for_transcription(input_path: str, max_size_mb: int = 15, output_dir: str = "temp", threads: int = 0, output_pattern: str = None, max_segment_time: int = None) -> List[str]:
         """
         Orchestrates the audio processing using duration-based chunking.
+        max_segment_time optionally caps chunk duration in seconds (e.g. from the token planner).
         """
         if not os.path.exists(output_dir):
             os.makedirs(output_dir, exist_ok=True)
@@ -191,7 +196,8 @@ class AudioProcessor:
                 shutil.copy2(input_path, prepared_path)
 
         # 2. Check size and split if needed
-        if AudioProcessor.is_under_limit(prepared_path, max_size_mb):
+        over_duration = bool(max_segment_time) and AudioProcessor.get_duration(prepared_path) > max_segment_time
+        if AudioProcessor.is_under_limit(prepared_path, max_size_mb) and not over_duration:
             print(f"   - Processed file size is within limit ({max_size_mb} MB).")
             # Copy to match pattern for consistency if needed, but here we can just return it
             # To be consistent with split_by_size return, let's copy it
@@ -203,11 +209,14 @@ class AudioProcessor:
             shutil.copy2(prepared_path, final_path)
             return [final_path]
 
-        print(f"   - Processed file size exceeds limit ({max_size_mb} MB). Splitting...")
+        if over_duration:
+            print(f"   - Processed file is longer than the planned chunk duration ({max_segment_time}s). Splitting...")
+        else:
+            print(f"   - Processed file size exceeds limit ({max_size_mb} MB). Splitting...")
         if not output_pattern:
             output_pattern = os.path.join(output_dir, f"{base_name}_chunk_%03d{extension}")
         
-        chunks = AudioProcessor.split_by_size(prepared_path, output_pattern, max_size_mb, threads=threads)
+        chunks = AudioProcessor.split_by_size(prepared_path, output_pattern, max_size_mb, threads=threads, max_segment_time=max_segment_time)
         print(f"   - Split into {len(chunks)} chunks.")
         
         return chunks
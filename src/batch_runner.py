@@ -0,0 +1,145 @@
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Failure messages that retrying will not fix (mostly yt-dlp extractor errors)
+PERMANENT_ERROR_PATTERNS = [
+    r"unsupported url",
+    r"is not a valid url",
+    r"video unavailable",
+    r"private video",
+    r"video is private",
+    r"has been removed",
+    r"account .* terminated",
+    r"members[- ]only",
+    r"sign in to confirm your age",
+    r"http error 40[14]",
+    r"http error 410",
+    r"no video formats found",
+]
+_PERMANENT_RE = re.compile("|".join(PERMANENT_ERROR_PATTERNS), re.IGNORECASE)
+
+def classify_failure(error: Optional[str]) -> str:
+    """Returns 'permanent' for errors retrying cannot fix, otherwise 'transient'."""
+    return "permanent" if error and _PERMANENT_RE.search(error) else "transient"
+
+class BatchRunner:
+    """
+    Runs the pending jobs of a JobManager through a ProcessingPipeline, claiming each one
+    first. A failed job does not stop the batch: permanent failures are set aside and
+    transient ones are retried after an exponential backoff, up to max_attempts per run.
+    A job whose stored failure count (kept across runs) reaches max_failures is set aside
+    as a permanent failure too.
+    With a DownloadStage, queued jobs are downloaded in the background and jobs whose
+    audio is ready run first.
+    """
+
+    def __init__(self, manager, pipeline, policy: str = "fifo", lease_seconds: float = 120,
+                 max_attempts: int = 3, max_failures: int = 10, base_delay: float = 30, max_delay: float = 600,
+                 sleep: Callable[[float], None] = time.sleep, clock: Callable[[], float] = time.time,
+                 downloads=None):
+        self.manager = manager
+        self.pipeline = pipeline
+        self.policy = policy
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.max_failures = max(1, max_failures)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.clock = clock
+        self.downloads = downloads
+
+    def retry_delay(self, attempt: int) -> float:
+        """Backoff before retrying after the given (1-based) failed attempt."""
+        return min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+    def run(self) -> List[Dict[str, Any]]:
+        """Processes jobs until none are left to try. Returns one summary entry per job, in run order."""
+        results: Dict[str, Dict[str, Any]] = {}
+        retry_at: Dict[str, float] = {}
+        self.manager.start_heartbeat(self.lease_seconds)
+        try:
+            while True:
+                now = self.clock()
+                waiting = {job_id for job_id, at in retry_at.items() if at > now}
+                done = {job_id for job_id, r in results.items() if r["outcome"] != "retrying"}
+                job = self._claim_next(done | waiting)
+                if job is None:
+                    if self.downloads and (self.downloads.in_flight() or self.downloads.drop_ready()):
+                        self.downloads.wait(timeout=self.lease_seconds)
+                        continue
+                    if not waiting:
+                        break
+                    delay = min(retry_at[job_id] for job_id in waiting) - now
+                    print(f"\n⏳ Waiting {delay:.0f}s before retrying {len(waiting)} failed job(s)...")
+                    self.sleep(max(delay, 0))
+                    continue
+                self._run_job(job, results, retry_at)
+        finally:
+            if self.downloads:
+                self.downloads.shutdown()
+            self.manager.stop_heartbeat()
+        return list(results.values())
+
+    def _run_job(self, job, results, retry_at):
+        result = results.setdefault(job['id'], {"id": job['id'], "name": job['name'], "attempts": 0, "outcome": None, "error": None})
+        result["attempts"] += 1
+        attempt = result["attempts"]
+        suffix = f" (attempt {attempt}/{self.max_attempts})" if attempt > 1 else ""
+        print(f"\n--- Processing Job: {job['name']}{suffix} ---")
+        # The lease is held until this worker's last write, so no other worker can
+        # claim the job and have its progress overwritten by this (older) copy
+        try:
+            success = self.pipeline.execute_job(job)
+            # Save progress after each job
+            self.manager.save_history([job])
+            self._record_outcome(job, success, result, retry_at)
+        finally:
+            self.manager.release_job(job['id'])
+
+    def _record_outcome(self, job, success, result, retry_at):
+        retry_at.pop(job['id'], None)
+        attempt = result["attempts"]
+
+        if success:
+            stored = self.manager.get_job(job['id']) or job
+            result.update(outcome=stored.get('status', 'completed'), error=None)
+            return
+
+        error = self.pipeline.last_error or "Unknown error"
+        kind = self.pipeline.last_error_kind or classify_failure(error)
+        failures = job.get('failures', 0) + 1
+        result["error"] = error
+        if kind == "permanent":
+            print(f"⛔ Job '{job['name']}' failed permanently: {error}")
+            self.manager.record_failure(job['id'], error, permanent=True)
+            result["outcome"] = "failed_permanent"
+        elif failures >= self.max_failures:
+            print(f"⛔ Job '{job['name']}' has failed {failures} times across runs. Giving up: {error}")
+            self.manager.record_failure(job['id'], error, permanent=True)
+            result["outcome"] = "failed_permanent"
+        elif attempt >= self.max_attempts:
+            print(f"⚠️ Job '{job['name']}' failed {attempt} times. Leaving it for a later run.")
+            self.manager.record_failure(job['id'], error)
+            result["outcome"] = "failed"
+        else:
+            delay = self.retry_delay(attempt)
+            print(f"🔁 Job '{job['name']}' failed ({error}). Retrying in {delay:.0f}s; continuing with other jobs.")
+            self.manager.record_failure(job['id'], error)
+            retry_at[job['id']] = self.clock() + delay
+            result["outcome"] = "retrying"
+
+    def _claim_next(self, exclude):
+        if not self.downloads:
+            return self.manager.claim_next_job(self.policy, exclude=exclude, ttl=self.lease_seconds)
+        # Queued jobs are downloaded by the stage, fed in policy order as it has room.
+        # The runner only takes them inline if the stage already tried and gave up.
+        queued = [j for j in self.manager.get_pending_from_last_150() if j.get('status') == 'queue' and j['id'] not in exclude]
+        fresh = [j for j in queued if j['id'] not in self.downloads.attempted]
+        self.downloads.submit(self.manager.order_jobs(fresh, self.policy)[:self.downloads.capacity()])
+        skip = exclude | self.downloads.in_flight() | {j['id'] for j in fresh if j['id'] not in self.downloads.attempted}
+        job = self.manager.claim_next_job(self.policy, exclude=skip, ttl=self.lease_seconds, prefer=self.downloads.ready_ids())
+        if job:
+            self.downloads.discard(job['id'])
+        return job
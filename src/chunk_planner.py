@@ -0,0 +1,113 @@
+import json
+import os
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class ChunkPlanner:
+    """
+    Records per-request token usage (from Gemini usageMetadata) and learns, per model,
+    how many prompt tokens an audio second costs and how many output tokens an audio
+    minute produces. Uses those rates to pick chunk durations that stay within the
+    model's output and context limits.
+    """
+    DEFAULT_LIMITS = {"max_output_tokens": 8192, "context_tokens": 1048576}
+
+    def __init__(self, stats_file: str = "token_stats.json", model_limits: Optional[Dict[str, Dict[str, int]]] = None,
+                 window: int = 500, min_samples: int = 3):
+        self.stats_file = stats_file
+        self.model_limits = model_limits or {}
+        self.window = window
+        self.min_samples = min_samples
+        self.requests: List[Dict[str, Any]] = self._load_requests()
+
+    def _load_requests(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.stats_file):
+            return []
+        try:
+            with open(self.stats_file, 'r') as f:
+                data = json.load(f)
+                return data.get("requests", []) if isinstance(data, dict) else []
+        except (json.JSONDecodeError, IOError):
+            return []
+
+    def _save_requests(self):
+        try:
+            with open(self.stats_file, 'w') as f:
+                json.dump({"requests": self.requests}, f)
+        except IOError as e:
+            logger.error(f"Error saving token stats: {e}")
+
+    def record(self, model_name: str, usage: Dict[str, Any], finish_reason: Optional[str] = None, audio_seconds: Optional[float] = None):
+        """Records the token counts of one request."""
+        if not usage:
+            return
+        self.requests.append({
+            "timestamp": time.time(),
+            "model": model_name,
+            "prompt_tokens": usage.get("promptTokenCount", 0),
+            "output_tokens": usage.get("candidatesTokenCount", 0),
+            "total_tokens": usage.get("totalTokenCount", 0),
+            "finish_reason": finish_reason,
+            "audio_seconds": audio_seconds,
+        })
+        del self.requests[:-self.window]
+        self._save_requests()
+
+    def get_limits(self, model_name: str) -> Dict[str, int]:
+        return {**self.DEFAULT_LIMITS, **self.model_limits.get(model_name, {})}
+
+    def rates(self, model_name: str, pct: float = 90) -> Optional[Dict[str, float]]:
+        """
+        Returns the pct-th percentile of prompt tokens per audio second and output tokens
+        per audio minute for audio requests of model_name, or None without enough samples.
+        Truncated responses are excluded since their output count is only a lower bound.
+        """
+        samples = [
+            r for r in self.requests
+            if r["model"] == model_name and r.get("audio_seconds") and r.get("finish_reason") != "MAX_TOKENS"
+        ]
+        if len(samples) < self.min_samples:
+            return None
+
+        def pick(values):
+            values = sorted(values)
+            return values[min(len(values) - 1, int(pct / 100 * len(values)))]
+
+        return {
+            "prompt_tokens_per_audio_second": pick(r["prompt_tokens"] / r["audio_seconds"] for r in samples),
+            "output_tokens_per_audio_minute": pick(r["output_tokens"] / (r["audio_seconds"] / 60) for r in samples),
+            "samples": len(samples),
+        }
+
+    def output_ratio(self, model_name: str, pct: float = 90) -> Optional[float]:
+        """Returns the pct-th percentile of output/prompt tokens for text-only requests of model_name."""
+        ratios = sorted(
+            r["output_tokens"] / r["prompt_tokens"] for r in self.requests
+            if r["model"] == model_name and not r.get("audio_seconds") and r.get("prompt_tokens")
+            and r.get("finish_reason") != "MAX_TOKENS"
+        )
+        if len(ratios) < self.min_samples:
+            return None
+        return ratios[min(len(ratios) - 1, int(pct / 100 * len(ratios)))]
+
+    def plan_chunk_seconds(self, model_name: str, safety: float = 0.8, min_seconds: int = 60) -> Optional[int]:
+        """
+        Returns the longest chunk duration (seconds) whose predicted output and prompt
+        tokens stay within safety * the model's limits, or None if nothing is learned yet.
+        """
+        rates = self.rates(model_name)
+        if not rates:
+            return None
+        limits = self.get_limits(model_name)
+
+        candidates = []
+        if rates["output_tokens_per_audio_minute"] > 0:
+            candidates.append(limits["max_output_tokens"] * safety / rates["output_tokens_per_audio_minute"] * 60)
+        if rates["prompt_tokens_per_audio_second"] > 0:
+            candidates.append(limits["context_tokens"] * safety / rates["prompt_tokens_per_audio_second"])
+        if not candidates:
+            return None
+        return max(min_seconds, int(min(candidates)))
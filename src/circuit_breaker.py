@@ -0,0 +1,171 @@
+import json
+import os
+import time
+import logging
+from typing import Callable, Dict, Any, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """
+    Per-account circuit breaker with closed/open/half_open states and a health score.
+    State is persisted so a restart does not retry an account that is known to be failing.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    # kind: (failures before opening, base cooldown seconds, max cooldown seconds)
+    POLICIES = {
+        "rate_limit": (1, 30, 900),
+        "auth": (1, 1800, 6 * 3600),
+        "server": (3, 30, 600),
+        "timeout": (3, 20, 600),
+        "other": (5, 30, 600),
+    }
+    HEALTH_DECAY = 0.8
+    HEALTH_RECOVERY_HALF_LIFE = 600
+    HEALTHY_THRESHOLD = 0.5
+
+    def __init__(self, health_file: str = "account_health.json", store=None):
+        self.health_file = health_file
+        # Optional SharedStateStore; when set, breaker state is shared with other processes
+        self.store = store
+        self.accounts: Dict[str, Dict[str, Any]] = self._load_state()
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        if self.store:
+            return self.store.load_breakers()
+        if not os.path.exists(self.health_file):
+            return {}
+        try:
+            with open(self.health_file, 'r') as f:
+                data = json.load(f)
+                return data if isinstance(data, dict) else {}
+        except (json.JSONDecodeError, IOError):
+            return {}
+
+    def _reload(self):
+        if self.store:
+            self.accounts = self.store.load_breakers()
+
+    def _save_state(self):
+        try:
+            with open(self.health_file, 'w') as f:
+                json.dump(self.accounts, f, indent=4)
+        except IOError as e:
+            logger.error(f"Error saving account health: {e}")
+
+    def _entry(self, email: str) -> Dict[str, Any]:
+        return self.accounts.setdefault(email, {
+            "state": self.CLOSED,
+            "failures": 0,
+            "opened_count": 0,
+            "open_until": 0,
+            "health": 1.0,
+            "health_updated": time.time(),
+            "last_error": None,
+        })
+
+    def _update(self, email: str, change: Callable[[Dict[str, Any]], None]):
+        """
+        Applies change to email's entry and saves it. With a shared store the entry is re-read
+        and written in one transaction, so another process's update in between is not lost.
+        """
+        if not self.store:
+            change(self._entry(email))
+            self._save_state()
+            return
+
+        def apply(stored: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+            if stored is None:
+                self.accounts.pop(email, None)
+            else:
+                self.accounts[email] = stored
+            entry = self._entry(email)
+            change(entry)
+            return entry
+
+        self.store.update_breaker(email, apply)
+
+    @staticmethod
+    def classify(status_code: Optional[int]) -> str:
+        """Maps an HTTP status code (None for timeouts) to an error kind."""
+        if status_code is None:
+            return "timeout"
+        if status_code == 429:
+            return "rate_limit"
+        if status_code in (401, 403):
+            return "auth"
+        if status_code >= 500:
+            return "server"
+        return "other"
+
+    def get_state(self, email: str) -> str:
+        """Returns the current state, moving open breakers whose cooldown elapsed to half_open."""
+        self._reload()
+        entry = self.accounts.get(email)
+        if not entry:
+            return self.CLOSED
+        if entry["state"] == self.OPEN and time.time() >= entry["open_until"]:
+            def half_open(entry: Dict[str, Any]):
+                if entry["state"] == self.OPEN and time.time() >= entry["open_until"]:
+                    entry["state"] = self.HALF_OPEN
+
+            self._update(email, half_open)
+        return self.accounts[email]["state"]
+
+    def allow(self, email: str) -> bool:
+        return self.get_state(email) != self.OPEN
+
+    def health(self, email: str) -> float:
+        """Returns the health score in [0, 1]. Lost health recovers over time so idle accounts get retried."""
+        entry = self.accounts.get(email)
+        if not entry:
+            return 1.0
+        elapsed = max(0.0, time.time() - entry.get("health_updated", 0))
+        return 1 - (1 - entry["health"]) * 0.5 ** (elapsed / self.HEALTH_RECOVERY_HALF_LIFE)
+
+    def _update_health(self, entry: Dict[str, Any], email: str, success: bool):
+        current = self.health(email)
+        entry["health"] = current * self.HEALTH_DECAY + ((1 - self.HEALTH_DECAY) if success else 0)
+        entry["health_updated"] = time.time()
+
+    def record_success(self, email: str):
+        def close(entry: Dict[str, Any]):
+            if entry["state"] != self.CLOSED:
+                logger.info(f"Circuit closed for {email}")
+            entry.update({"state": self.CLOSED, "failures": 0, "opened_count": 0, "open_until": 0})
+            self._update_health(entry, email, success=True)
+
+        self._update(email, close)
+
+    def record_failure(self, email: str, kind: str, retry_after: Optional[float] = None):
+        """Records a failed request. Opens the breaker once the policy threshold for kind is reached."""
+        threshold, base_cooldown, max_cooldown = self.POLICIES.get(kind, self.POLICIES["other"])
+
+        def fail(entry: Dict[str, Any]):
+            entry["failures"] += 1
+            entry["last_error"] = kind
+            self._update_health(entry, email, success=False)
+
+            # A failed half-open trial re-opens immediately
+            if entry["state"] == self.HALF_OPEN or entry["failures"] >= threshold:
+                cooldown = min(max_cooldown, base_cooldown * (2 ** entry["opened_count"]))
+                if retry_after:
+                    cooldown = max(cooldown, retry_after)
+                entry["state"] = self.OPEN
+                entry["opened_count"] += 1
+                entry["open_until"] = time.time() + cooldown
+                logger.warning(f"Circuit opened for {email} ({kind}) for {cooldown:.0f}s")
+
+        self._update(email, fail)
+
+    def seconds_until_available(self, emails: Iterable[str]) -> Optional[float]:
+        """Returns the shortest wait until one of emails can be tried again, or None if emails is empty."""
+        waits = []
+        for email in emails:
+            if self.allow(email):
+                return 0.0
+            waits.append(self.accounts[email]["open_until"] - time.time())
+        return max(0.0, min(waits)) if waits else None
@@ -4,9 +4,13 @@ import shutil
 class FileCleanupService:
     @staticmethod
     def cleanup_job_files(files: list):
-        """Deletes a list of files if they exist."""
+        """Deletes a list of files if they exist. Audio held by the download cache is kept for reuse."""
+        from src.downloader import get_media_cache
+        cache = get_media_cache()
         for f in files:
-            if f and os.path.exists(f):
+            if f and cache.enabled and cache.holds(f):
+                print(f"Cleanup: Kept cached audio {f}")
+            elif f and os.path.exists(f):
                 try:
                     os.remove(f)
                     print(f"Cleanup: Deleted {f}")
@@ -36,9 +40,10 @@ class FileCleanupService:
                                 print(f"Targeted Cleanup: Deleted {path}")
                             except: pass
                 
-                # 2. Downloads directory (main audio and partials)
-                from src.downloader import get_expected_audio_path
-                audio_path = get_expected_audio_path(job)
+                # 2. Downloads directory (main audio and partials). Cached audio is left
+                # to the download cache, which evicts it once its quota is reached.
+                from src.downloader import get_download_path
+                audio_path = get_download_path(job)
                 if os.path.exists(audio_path):
                     try:
                         os.remove(audio_path)
@@ -8,10 +8,24 @@ class ConfigManager:
         "note_generation_model": "gemini-3-flash-preview",
         "user_agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
         "api_timeout": 300,
+        "api_connect_timeout": 10,
+        "api_idle_timeout": 120,
+        "api_max_timeout": 1800,
         "api_max_retries": 3,
         "api_retry_delay": 10,
         "notion_integration_enabled": False,
-        "max_chunk_size_mb": 15
+        "max_chunk_size_mb": 15,
+        "chunk_delay_seconds": 10,
+        "response_cache_enabled": True,
+        "response_cache_max_mb": 200,
+        "download_cache_enabled": True,
+        "download_cache_max_mb": 4096,
+        "hedging_enabled": False,
+        "hedge_percentile": 95,
+        "hedge_min_samples": 20,
+        "hedge_budget_ratio": 0.1,
+        "loop_detection_enabled": True,
+        "max_continuations": 3
     }
 
     def __init__(self, config_file: str = "config.json"):
@@ -66,6 +80,18 @@ class ConfigManager:
         except IOError as e:
             print(f"Error saving config: {e}")
 
+    @staticmethod
+    def load_models_catalog(models_file: str = "models.json") -> Dict[str, Any]:
+        """Loads models.json (model list, per-model limits and fallbacks). Returns {} if unavailable."""
+        if not os.path.exists(models_file):
+            return {}
+        try:
+            with open(models_file, 'r') as f:
+                data = json.load(f)
+                return data if isinstance(data, dict) else {}
+        except (json.JSONDecodeError, IOError):
+            return {}
+
     def get(self, key: str, default: Optional[Any] = None) -> Any:
         return self.config.get(key, default)
 
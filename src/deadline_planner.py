@@ -0,0 +1,74 @@
+import logging
+from typing import Optional, TypedDict
+
+logger = logging.getLogger(__name__)
+
+class Deadlines(TypedDict):
+    connect: float     # establishing the connection
+    first_byte: float  # request sent until the first SSE line
+    idle: float        # longest allowed gap between SSE lines
+    total: float       # whole request, including streaming
+
+class DeadlinePlanner:
+    """
+    Computes per-request deadlines from the expected output size (audio duration or prompt
+    size, via the ChunkPlanner's learned token rates) and each model's observed first-byte
+    latency and output throughput (from the LatencyTracker). Falls back to fixed budgets
+    until enough samples exist.
+    """
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, latency_tracker, chunk_planner, api_timeout: float = 300, connect_timeout: float = 10,
+                 idle_timeout: float = 120, max_total: float = 1800, safety: float = 2.0, min_samples: int = 5):
+        self.latency_tracker = latency_tracker
+        self.chunk_planner = chunk_planner
+        self.api_timeout = api_timeout
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self.max_total = max_total
+        self.safety = safety
+        self.min_samples = min_samples
+
+    def record_throughput(self, model_name: str, output_tokens: int, stream_seconds: float):
+        """Records output tokens per second measured from the first byte to the end of the stream."""
+        if output_tokens and stream_seconds > 0:
+            self.latency_tracker.record(model_name, "output_tokens_per_second", output_tokens / stream_seconds)
+
+    def expected_output_tokens(self, model_name: str, audio_seconds: Optional[float] = None, prompt_chars: int = 0) -> Optional[float]:
+        """Predicts the output tokens of a request, capped at the model's output limit, or None if unknown."""
+        expected = None
+        rates = self.chunk_planner.rates(model_name) if audio_seconds else None
+        if rates:
+            expected = rates["output_tokens_per_audio_minute"] * audio_seconds / 60
+        elif not audio_seconds and prompt_chars:
+            ratio = self.chunk_planner.output_ratio(model_name)
+            if ratio is not None:
+                expected = ratio * prompt_chars / self.CHARS_PER_TOKEN
+        if expected is None:
+            return None
+        return min(expected, self.chunk_planner.get_limits(model_name)["max_output_tokens"])
+
+    def _learned(self, model_name: str, metric: str, pct: float) -> Optional[float]:
+        if self.latency_tracker.count(model_name, metric) < self.min_samples:
+            return None
+        return self.latency_tracker.percentile(model_name, metric, pct)
+
+    def plan(self, model_name: str, audio_seconds: Optional[float] = None, prompt_chars: int = 0) -> Deadlines:
+        first_byte = self.api_timeout
+        slow_first_byte = self._learned(model_name, "first_byte", 99)
+        if slow_first_byte is not None:
+            first_byte = min(self.api_timeout, max(15.0, slow_first_byte * self.safety))
+
+        # Without a size estimate only the idle budget bounds a long stream
+        total = self.max_total
+        tokens = self.expected_output_tokens(model_name, audio_seconds, prompt_chars)
+        slow_throughput = self._learned(model_name, "output_tokens_per_second", 10)
+        if tokens is not None and slow_throughput:
+            total = min(self.max_total, max(60.0, first_byte + tokens / slow_throughput * self.safety))
+
+        return {
+            "connect": self.connect_timeout,
+            "first_byte": first_byte,
+            "idle": min(self.idle_timeout, total),
+            "total": total,
+        }
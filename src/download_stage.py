@@ -0,0 +1,161 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlparse
+from src.downloader import download_audio, get_expected_audio_path, get_media_cache
+from src.url_canonicalizer import media_key
+
+logger = logging.getLogger(__name__)
+
+def host_key(url: str) -> str:
+    """Groups URLs by the site whose bandwidth they share (youtu.be and youtube.com are one site)."""
+    prefix = media_key(url).split(":", 1)[0]
+    if prefix != "url":
+        return prefix
+    host = (urlparse(url if "://" in url else "https://" + url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+class DownloadStage:
+    """
+    Downloads queued jobs' audio on background threads ahead of transcription. At most
+    max_concurrent downloads run at once, and at most per_host against one site, so a slow
+    CDN only holds up its own links. Each download holds the job's lease. Finished jobs
+    wait in a ready set until the runner takes them. At most max_ready of them wait at a
+    time, which bounds the disk space used. Their cached audio stays pinned until the
+    runner takes them, so the download cache cannot evict it in between.
+    """
+
+    def __init__(self, manager, max_concurrent: int = 3, per_host: int = 1, max_ready: Optional[int] = None,
+                 lease_seconds: float = 120, download: Callable[[Dict[str, Any]], str] = download_audio):
+        self.manager = manager
+        self.max_concurrent = max(1, max_concurrent)
+        self.per_host = max(1, per_host)
+        self.max_ready = self.max_concurrent if max_ready is None else max_ready
+        self.lease_seconds = lease_seconds
+        self.download = download
+        self.cond = threading.Condition()
+        self.waiting: List[Dict[str, Any]] = []
+        self.active: Dict[str, str] = {}
+        self.ready: List[str] = []
+        self.attempted: Set[str] = set()
+        self.pinned: Dict[str, str] = {}
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="download")
+
+    def capacity(self) -> int:
+        """How many more jobs can be submitted without exceeding the concurrency and ready limits."""
+        with self.cond:
+            return max(0, self.max_concurrent + self.max_ready - len(self.waiting) - len(self.active) - len(self.ready))
+
+    def submit(self, jobs: Iterable[Dict[str, Any]]):
+        """Queues jobs for download. Jobs already submitted once are ignored."""
+        with self.cond:
+            for job in jobs:
+                if job['id'] not in self.attempted:
+                    self.attempted.add(job['id'])
+                    self.waiting.append(job)
+            self._pump()
+
+    def _host_load(self, host: str) -> int:
+        return sum(1 for h in self.active.values() if h == host)
+
+    def _pump(self):
+        # Caller holds self.cond. Skips past jobs whose site is at its limit.
+        for job in list(self.waiting):
+            if len(self.active) >= self.max_concurrent:
+                break
+            host = host_key(job['url'])
+            if self._host_load(host) >= self.per_host:
+                continue
+            self.waiting.remove(job)
+            self.active[job['id']] = host
+            self._pool.submit(self._run, job)
+
+    def _run(self, job: Dict[str, Any]):
+        ok = False
+        try:
+            ok = self._download(job)
+        except Exception as e:
+            logger.warning(f"Background download of '{job['name']}' failed: {e}")
+        finally:
+            with self.cond:
+                self.active.pop(job['id'], None)
+                if ok:
+                    self.ready.append(job['id'])
+                else:
+                    self._unpin(job['id'])
+                self._pump()
+                self.cond.notify_all()
+
+    def _download(self, job: Dict[str, Any]) -> bool:
+        if not self.manager.claim_job(job['id'], self.lease_seconds):
+            return False
+        with self.cond:
+            self.pinned[job['id']] = job['url']
+        get_media_cache().pin(job['url'])
+        try:
+            stored = self.manager.store.get(job['id'])
+            if not stored or stored.get('status') != 'queue':
+                return False
+            if not os.path.exists(get_expected_audio_path(job)):
+                self.manager.update_job_status(job['id'], 'downloading')
+                started = time.time()
+                try:
+                    audio_path = self.download(job)
+                except Exception:
+                    audio_path = None
+                if not audio_path or not os.path.exists(audio_path):
+                    # The pipeline retries the download and reports the failure
+                    self.manager.update_job_status(job['id'], 'queue')
+                    return False
+                self.manager.record_stage('download', os.path.getsize(audio_path) / (1024 * 1024), time.time() - started)
+            self.manager.update_job_status(job['id'], 'DOWNLOADED')
+            return True
+        finally:
+            self.manager.release_job(job['id'])
+
+    def _unpin(self, job_id: str):
+        url = self.pinned.pop(job_id, None)
+        if url is not None:
+            get_media_cache().unpin(url)
+
+    def in_flight(self) -> Set[str]:
+        with self.cond:
+            return {job['id'] for job in self.waiting} | set(self.active)
+
+    def ready_ids(self) -> Set[str]:
+        with self.cond:
+            return set(self.ready)
+
+    def discard(self, job_id: str):
+        """Marks a ready job as taken by the runner."""
+        with self.cond:
+            if job_id in self.ready:
+                self.ready.remove(job_id)
+            self._unpin(job_id)
+
+    def drop_ready(self) -> bool:
+        """Forgets ready jobs the runner could not claim (e.g. another worker took them). Returns True if any."""
+        with self.cond:
+            dropped = bool(self.ready)
+            for job_id in self.ready:
+                self._unpin(job_id)
+            self.ready.clear()
+            return dropped
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits until a download finishes or nothing is in flight. Returns True if a job is ready."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.ready or not (self.waiting or self.active), timeout)
+            return bool(self.ready)
+
+    def shutdown(self):
+        """Drops downloads that have not started and waits for running ones."""
+        with self.cond:
+            self.waiting.clear()
+        self._pool.shutdown(wait=True)
+        with self.cond:
+            for job_id in list(self.pinned):
+                self._unpin(job_id)
@@ -5,6 +5,7 @@ import sys
 from typing import List
 from urllib.parse import urlparse
 from src.config_manager import ConfigManager
+from src.media_cache import MediaCache
 
 # CONFIGURATION
 DOWNLOAD_DIR = "downloads"
@@ -29,6 +30,20 @@ os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 os.makedirs(TEMP_DIR, exist_ok=True)
 os.makedirs(COOKIES_DIR, exist_ok=True)
 
+_media_cache = None
+
+def get_media_cache(config=None) -> MediaCache:
+    """The process-wide download cache, configured on first use from config (default: config.json)."""
+    global _media_cache
+    if _media_cache is None:
+        config = config or ConfigManager()
+        _media_cache = MediaCache(
+            cache_dir=os.path.join(DOWNLOAD_DIR, "media"),
+            max_size_mb=config.get("download_cache_max_mb", 4096),
+            enabled=config.get("download_cache_enabled", True)
+        )
+    return _media_cache
+
 def get_cookie_path(client_id="default"):
     specific = os.path.join(COOKIES_DIR, f"{client_id}.txt")
     if os.path.exists(specific):
@@ -45,12 +60,38 @@ def run_command(cmd_args: List[str]):
         raise Exception(process.stderr)
     return process.stdout.strip()
 
-def get_expected_audio_path(job):
+def run_yt_dlp(args: List[str], job=None, engine=None):
+    """Runs yt-dlp with the given command-line arguments, in-process when an engine (YtDlpEngine) is given."""
+    if engine is None:
+        # Use sys.executable -m yt_dlp to ensure we use the venv's version
+        return run_command([sys.executable, "-m", "yt_dlp"] + args)
+    print(f"Executing in-process: yt-dlp {' '.join(shlex.quote(arg) for arg in args)}")
+    engine.run(args, job)
+
+def get_download_path(job):
+    """Where yt-dlp writes the job's audio before it moves into the download cache."""
     name = job['name']
     safe_name = name.replace(" ", "_").replace("/", "-")
     return os.path.join(DOWNLOAD_DIR, f"{safe_name}.mp3")
 
-def download_audio(job):
+def get_expected_audio_path(job):
+    """
+    The job's audio: its download cache entry, which any job for the same media shares.
+    On a miss, a file already downloaded under the job's name (e.g. before the cache existed)
+    is moved into the cache; otherwise this is where download_audio will write the audio.
+    """
+    cache = get_media_cache()
+    download_path = get_download_path(job)
+    if not cache.enabled:
+        return download_path
+    cached = cache.lookup(job['url'])
+    if cached:
+        return cached
+    if os.path.isfile(download_path):
+        return cache.put(job['url'], download_path)
+    return download_path
+
+def download_audio(job, engine=None):
     url = job['url']
     name = job['name']
     
@@ -63,12 +104,14 @@ def download_audio(job):
     
     cookie_file = get_cookie_path()
 
+    cache = get_media_cache()
+    cached = cache.lookup(url)
+    if cached:
+        print(f"⏩ Using cached audio for {name}: {cached}")
+        return cached
+
     print(f"\n⬇️  Starting Download: {name}")
     
-    # Base command as a list
-    # Use sys.executable -m yt_dlp to ensure we use the venv's version
-    base_cmd = [sys.executable, "-m", "yt_dlp"]
-    
     common_args = [
         "--js-runtime", "node",
         "--no-cache-dir",
@@ -88,36 +131,36 @@ def download_audio(job):
     # 1. FACEBOOK
     if any(x in url for x in ["facebook.com", "fb.watch"]):
         print(">> Mode: Facebook")
-        cmd = base_cmd + ["-N", "16", "--no-part", "--no-keep-fragments"] + common_args + [
+        args = ["-N", "16", "--no-part", "--no-keep-fragments"] + common_args + [
             "-x", "--audio-format", "mp3", url
         ]
-        run_command(cmd)
+        run_yt_dlp(args, job, engine)
         match_found = True
 
     # 2. YOUTUBE
     elif any(x in url for x in ["youtube.com", "youtu.be", "youtube-nocookie.com"]):
         print(">> Mode: YouTube")
-        cmd = base_cmd + ["-N", "4"] + common_args + [
+        args = ["-N", "4"] + common_args + [
             "--extract-audio", "--audio-format", "mp3", "--audio-quality", "0", # 0 is best
             "--continue",
             "--add-header", "Referer: https://www.youtube.com/",
             "--add-header", f"User-Agent: {ua}",
             url
         ]
-        run_command(cmd)
+        run_yt_dlp(args, job, engine)
         match_found = True
 
     # 3. MEDIADELIVERY (Apar's Classroom)
     elif "mediadelivery.net" in url:
         print(">> Mode: MediaDelivery")
-        cmd = base_cmd + ["-N", "16", "--no-part", "--no-keep-fragments", "--no-playlist"] + common_args + [
+        args = ["-N", "16", "--no-part", "--no-keep-fragments", "--no-playlist"] + common_args + [
             "-x", "--audio-format", "mp3",
             "--add-header", "Referer: https://academic.aparsclassroom.com/",
             "--add-header", "Origin: https://academic.aparsclassroom.com",
             "--add-header", f"User-Agent: {ua}",
             url
         ]
-        run_command(cmd)
+        run_yt_dlp(args, job, engine)
         match_found = True
 
     # 4. EDGECOURSEBD
@@ -135,10 +178,10 @@ def download_audio(job):
             vimeo_url = run_command(scraper_cmd)
             print(f"   Found Vimeo URL: {vimeo_url}")
             
-            cmd = base_cmd + ["-N", "16", "--no-part", "--no-keep-fragments", "--downloader", "ffmpeg", "--hls-use-mpegts", "--referer", url] + common_args + [
+            args = ["-N", "16", "--no-part", "--no-keep-fragments", "--downloader", "ffmpeg", "--hls-use-mpegts", "--referer", url] + common_args + [
                 "-x", "--audio-format", "mp3", vimeo_url
             ]
-            run_command(cmd)
+            run_yt_dlp(args, job, engine)
             match_found = True
         except Exception as e:
             print(f"❌ Scraper failed: {e}")
@@ -147,7 +190,7 @@ def download_audio(job):
     # 5. FALLBACK
     if not match_found:
         print(">> Mode: Default/Fallback")
-        cmd = base_cmd + ["-N", "16"] + common_args + [
+        args = ["-N", "16"] + common_args + [
             "--extract-audio", "--audio-format", "mp3", "--audio-quality", "5",
             "--continue",
             "--add-header", "Referer: https://www.youtube.com/",
@@ -155,11 +198,11 @@ def download_audio(job):
             url
         ]
         try:
-            run_command(cmd)
+            run_yt_dlp(args, job, engine)
         except Exception as e:
             print(f"❌ Fallback download failed: {e}")
             raise e
     
-    final_output = f"{DOWNLOAD_DIR}/{safe_name}.mp3"
+    final_output = cache.put(url, f"{DOWNLOAD_DIR}/{safe_name}.mp3")
     print(f"✅ Download Complete: {final_output}")
     return final_output
@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import queue
+import atexit
+import hashlib
+import logging
+import threading
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+HASH_SLICE = 1 << 20
+
+
+def summarize_payload(data: Any, max_string: int = 200) -> Any:
+    """
+    Returns a JSON-safe view of data where long strings (e.g. base64 audio) are replaced
+    by their length, a short preview and a hash. Long strings are hashed in bounded
+    slices so no full copy is made.
+    """
+    if isinstance(data, dict):
+        return {k: summarize_payload(v, max_string) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [summarize_payload(i, max_string) for i in data]
+    if isinstance(data, str) and len(data) > max_string:
+        h = hashlib.sha256()
+        for i in range(0, len(data), HASH_SLICE):
+            h.update(data[i:i + HASH_SLICE].encode("utf-8", errors="replace"))
+        return {"summary": "truncated", "length": len(data), "sha256": h.hexdigest()[:16], "preview": data[:64]}
+    return data
+
+
+class ErrorLogSink:
+    """
+    Append-only JSON-lines error log with size-based rotation.
+    Entries are queued and serialized on a background thread so the request path only enqueues.
+    """
+    _shared: Dict[str, "ErrorLogSink"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, log_file: str = "error.jsonl", max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3, max_queue: int = 1000):
+        self.log_file = log_file
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, log_file: str = "error.jsonl", **kwargs) -> "ErrorLogSink":
+        """Returns one sink per log file so concurrent writers in a process do not race on rotation."""
+        path = os.path.abspath(log_file)
+        with cls._shared_lock:
+            if path not in cls._shared:
+                cls._shared[path] = cls(log_file, **kwargs)
+            return cls._shared[path]
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="error-log-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def log(self, request: Any, response: Any):
+        """
+        Queues an error entry. Never blocks; entries are dropped if the queue is full.
+        Payloads are summarized on the writer thread, so callers must not mutate them afterwards.
+        """
+        self._ensure_started()
+        try:
+            self.queue.put_nowait((time.time(), request, response))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Blocks until every queued entry has been written."""
+        if self._thread and self._thread.is_alive():
+            self.queue.join()
+
+    def _run(self):
+        while True:
+            timestamp, request, response = self.queue.get()
+            try:
+                self._write({
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp)),
+                    "request": summarize_payload(request),
+                    "response": summarize_payload(response),
+                })
+            except Exception as e:
+                logger.error(f"Error writing error log entry: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _write(self, entry: Dict[str, Any]):
+        line = (json.dumps(entry, default=str) + "\n").encode("utf-8")
+        try:
+            size = os.path.getsize(self.log_file)
+        except OSError:
+            size = 0
+        if size and size + len(line) > self.max_bytes:
+            self._rotate()
+        with open(self.log_file, 'ab') as f:
+            f.write(line)
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            os.remove(self.log_file)
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.log_file}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.log_file}.{i + 1}")
+        os.replace(self.log_file, f"{self.log_file}.1")
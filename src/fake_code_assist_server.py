@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Code Assist `v1internal:streamGenerateContent` endpoint
+and the Google OAuth token endpoint, for load-testing without spending quota.
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from copy import deepcopy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs
+
+DEFAULT_SETTINGS = {
+    # First-byte latency. distribution: fixed (value), uniform (low, high),
+    # exponential (mean) or lognormal (median, sigma). Values are seconds.
+    "first_byte_latency": {"distribution": "lognormal", "median": 0.5, "sigma": 0.5},
+    # Number of SSE events per response and the pause between them
+    "sse_chunks": 5,
+    "chunk_interval": 0.05,
+    "words_per_chunk": 40,
+    # Probability of answering with an injected error instead of a response
+    "error_rates": {"429": 0.0, "503": 0.0},
+    # Per-account (project) quota: at most `requests` per sliding `window_seconds`
+    "account_quota": {"requests": 0, "window_seconds": 60},
+    "token_expires_in": 3600,
+    "seed": None,
+}
+
+VOCABULARY = (
+    "lecture student notes energy matrix theorem cell protein force velocity "
+    "equation reaction market history function derivative integral gene atom "
+    "circuit voltage theory example problem solution method proof vector"
+).split()
+
+
+class FakeCodeAssistServer:
+    """Threaded fake server. Use start()/stop() or run it from the command line."""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, host: str = "127.0.0.1", port: int = 0):
+        self.settings = deepcopy(DEFAULT_SETTINGS)
+        for key, value in (settings or {}).items():
+            if isinstance(value, dict) and isinstance(self.settings.get(key), dict):
+                self.settings[key].update(value)
+            else:
+                self.settings[key] = value
+
+        self.random = random.Random(self.settings["seed"])
+        self.lock = threading.Lock()
+        self.requests = []
+        self.account_windows: Dict[str, list] = {}
+        self.token_requests = 0
+
+        handler = self._make_handler()
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def sample_latency(self) -> float:
+        spec = self.settings["first_byte_latency"]
+        dist = spec.get("distribution", "fixed")
+        with self.lock:
+            if dist == "uniform":
+                value = self.random.uniform(spec.get("low", 0.0), spec.get("high", 1.0))
+            elif dist == "exponential":
+                value = self.random.expovariate(1 / spec.get("mean", 1.0))
+            elif dist == "lognormal":
+                value = self.random.lognormvariate(math.log(spec.get("median", 1.0)), spec.get("sigma", 0.5))
+            else:
+                value = spec.get("value", 0.0)
+        return max(0.0, value)
+
+    def _injected_error(self) -> Optional[int]:
+        with self.lock:
+            roll = self.random.random()
+        threshold = 0.0
+        for status, rate in self.settings["error_rates"].items():
+            threshold += rate
+            if roll < threshold:
+                return int(status)
+        return None
+
+    def _over_quota(self, account: str) -> bool:
+        quota = self.settings["account_quota"]
+        if not quota.get("requests"):
+            return False
+        now = time.time()
+        with self.lock:
+            window = [t for t in self.account_windows.get(account, []) if now - t < quota["window_seconds"]]
+            over = len(window) >= quota["requests"]
+            if not over:
+                window.append(now)
+            self.account_windows[account] = window
+        return over
+
+    def _record(self, account: str, status: int, started: float, first_byte: Optional[float] = None):
+        with self.lock:
+            self.requests.append({
+                "account": account,
+                "status": status,
+                "duration": time.time() - started,
+                "first_byte": first_byte,
+            })
+
+    def _response_words(self, count: int):
+        with self.lock:
+            return " ".join(self.random.choice(VOCABULARY) for _ in range(count))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns request counts by status and account plus latency percentiles of successful requests."""
+        with self.lock:
+            requests = list(self.requests)
+            token_requests = self.token_requests
+        by_status: Dict[str, int] = {}
+        by_account: Dict[str, int] = {}
+        for r in requests:
+            by_status[str(r["status"])] = by_status.get(str(r["status"]), 0) + 1
+            by_account[r["account"]] = by_account.get(r["account"], 0) + 1
+        durations = sorted(r["duration"] for r in requests if r["status"] == 200)
+        return {
+            "requests": len(requests),
+            "succeeded": len(durations),
+            "by_status": by_status,
+            "by_account": by_account,
+            "token_requests": token_requests,
+            "latency": {f"p{p}": percentile(durations, p) for p in (50, 95, 99)},
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _read_body(self) -> bytes:
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length) if length else b""
+
+            def _send_json(self, status: int, payload: Any):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path.startswith("/stats"):
+                    self._send_json(200, server.get_stats())
+                else:
+                    self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+            def do_POST(self):
+                body = self._read_body()
+                if self.path.startswith("/token"):
+                    self._handle_token(body)
+                elif self.path.startswith("/v1internal:streamGenerateContent"):
+                    self._handle_generate(body)
+                else:
+                    self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+            def _handle_token(self, body: bytes):
+                form = parse_qs(body.decode("utf-8"))
+                with server.lock:
+                    server.token_requests += 1
+                if not form.get("refresh_token") and not form.get("code"):
+                    self._send_json(400, {"error": "invalid_grant"})
+                    return
+                self._send_json(200, {
+                    "access_token": f"fake-access-{uuid.uuid4().hex}",
+                    "expires_in": server.settings["token_expires_in"],
+                    "token_type": "Bearer",
+                })
+
+            def _handle_generate(self, body: bytes):
+                started = time.time()
+                try:
+                    request = json.loads(body or b"{}")
+                except json.JSONDecodeError:
+                    request = {}
+                account = request.get("project") or "unknown"
+
+                status = 429 if server._over_quota(account) else server._injected_error()
+                if status:
+                    message = "Resource has been exhausted (e.g. check quota)." if status == 429 else "The service is currently unavailable."
+                    payload = {"error": {"code": status, "message": message}}
+                    if status == 429:
+                        payload["error"]["details"] = [{
+                            "@type": "type.googleapis.com/google.rpc.RetryInfo",
+                            "retryDelay": f"{server.settings['account_quota']['window_seconds']}s",
+                        }]
+                    server._record(account, status, started)
+                    self._send_json(status, payload)
+                    return
+
+                time.sleep(server.sample_latency())
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                first_byte = time.time() - started
+                chunks = max(1, server.settings["sse_chunks"])
+                words = server.settings["words_per_chunk"]
+                prompt_tokens = max(1, len(body) // 4)
+                for i in range(chunks):
+                    event = {"response": {"candidates": [{
+                        "content": {"role": "model", "parts": [{"text": server._response_words(words) + "\n"}]},
+                    }]}}
+                    if i == chunks - 1:
+                        event["response"]["candidates"][0]["finishReason"] = "STOP"
+                        event["response"]["usageMetadata"] = {
+                            "promptTokenCount": prompt_tokens,
+                            "candidatesTokenCount": chunks * words,
+                            "totalTokenCount": prompt_tokens + chunks * words,
+                        }
+                    self._send_chunk(f"data: {json.dumps(event)}\r\n\r\n".encode("utf-8"))
+                    if i < chunks - 1:
+                        time.sleep(server.settings["chunk_interval"])
+                self._send_chunk(b"")
+                server._record(account, 200, started, first_byte)
+
+        return Handler
+
+
+def percentile(values, pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    rank = max(0, min(len(values) - 1, int(math.ceil(pct / 100 * len(values))) - 1))
+    return values[rank]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Code Assist server.")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--settings", help="JSON file overriding DEFAULT_SETTINGS")
+    args = parser.parse_args()
+
+    settings = {}
+    if args.settings:
+        with open(args.settings, 'r') as f:
+            settings = json.load(f)
+
+    server = FakeCodeAssistServer(settings, port=args.port).start()
+    print(f"Fake Code Assist server listening on {server.url}")
+    print(f"Set \"code_assist_endpoint\": \"{server.url}\" and \"oauth_token_url\": \"{server.url}/token\" in config.json")
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,52 @@ import httpx
 import logging
 import json
 import os
+import base64
 import asyncio
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, TypedDict
 from src.gemini_auth_service import GeminiAuthService, GeminiCliAuthRecord
+from src.circuit_breaker import CircuitBreaker
 from src.usage_tracker import UsageTracker
+from src.shared_state import SharedStateStore
 from src.audio_processor import AudioProcessor
+from src.response_cache import ResponseCache
+from src.latency_tracker import LatencyTracker
+from src.error_log import ErrorLogSink
+from src.chunk_planner import ChunkPlanner
+from src.prompts import CONTINUATION_PROMPT
+from src.model_router import ModelRouter
+from src.repetition_detector import RepetitionDetector
+from src.request_lanes import LaneScheduler
+from src.deadline_planner import DeadlinePlanner, Deadlines
 
 logger = logging.getLogger(__name__)
 
+class GeminiHTTPError(Exception):
+    """Raised when the Code Assist endpoint answers with a non-200 status."""
+    def __init__(self, status_code: int, payload: Any):
+        super().__init__(f"API Error {status_code}: {payload}")
+        self.status_code = status_code
+        self.payload = payload
+
+class DegenerateStreamError(Exception):
+    """Raised when a streamed response falls into a repetition loop and is aborted."""
+    def __init__(self, received_chars: int, repeat_ratio: float):
+        super().__init__(f"Repetition loop detected after {received_chars} chars (repeat ratio {repeat_ratio:.2f})")
+        self.received_chars = received_chars
+        self.repeat_ratio = repeat_ratio
+
+class DeadlineExceeded(httpx.TimeoutException):
+    """Raised when a request exceeds one of its planned deadlines (first_byte, idle or total)."""
+    def __init__(self, budget: str, seconds: float):
+        super().__init__(f"{budget} deadline of {seconds:.0f}s exceeded")
+        self.budget = budget
+        self.seconds = seconds
+
+class StreamResult(TypedDict):
+    text: str
+    usage: Dict[str, Any]  # usageMetadata of the last event carrying it
+    finish_reason: Optional[str]
+
 class GeminiAPIWrapper:
     CODE_ASSIST_ENDPOINT = "https://cloudcode-pa.googleapis.com"
     GEMINI_CLI_HEADERS = {
@@ -23,93 +61,325 @@ class GeminiAPIWrapper:
         }),
     }
 
-    def __init__(self, config=None, auth_service=None, usage_tracker=None):
+    def __init__(self, config=None, auth_service=None, usage_tracker=None, response_cache=None, latency_tracker=None, error_log=None, chunk_planner=None, model_router=None, lanes=None, deadline_planner=None):
         from src.config_manager import ConfigManager
         self.config = config or ConfigManager()
-        self.auth_service = auth_service or GeminiAuthService()
-        self.usage_tracker = usage_tracker or UsageTracker()
+        store = SharedStateStore.from_config(self.config)
+        self.auth_service = auth_service or GeminiAuthService.shared(token_url=self.config.get("oauth_token_url"), store=store)
+        if self.config.get("background_token_refresh", True):
+            self.auth_service.start_background_refresh(
+                interval=self.config.get("token_refresh_interval", 60),
+                lead_seconds=self.config.get("token_refresh_lead_seconds", 300)
+            )
+        self.usage_tracker = usage_tracker or UsageTracker(store=store)
+        self.response_cache = response_cache or ResponseCache(
+            max_size_mb=self.config.get("response_cache_max_mb", 200),
+            enabled=self.config.get("response_cache_enabled", True)
+        )
+        self.latency_tracker = latency_tracker or LatencyTracker()
+        catalog = self.config.load_models_catalog()
+        self.chunk_planner = chunk_planner or ChunkPlanner(model_limits=catalog.get("limits", {}))
+        self.model_router = model_router or ModelRouter(
+            fallbacks=catalog.get("fallbacks", {}),
+            policy=catalog.get("fallback_policy", {})
+        )
+        self.lanes = lanes or LaneScheduler.shared(
+            self.config.get("request_lanes"),
+            self.config.get("max_concurrent_requests", 0)
+        )
+        self.last_model_used: Optional[str] = None
         
+        self.endpoint = self.config.get("code_assist_endpoint") or self.CODE_ASSIST_ENDPOINT
         self.api_timeout = self.config.get("api_timeout", 300)
         self.api_max_retries = self.config.get("api_max_retries", 3)
         self.api_retry_delay = self.config.get("api_retry_delay", 10)
+        self.deadline_planner = deadline_planner or DeadlinePlanner(
+            self.latency_tracker, self.chunk_planner,
+            api_timeout=self.api_timeout,
+            connect_timeout=self.config.get("api_connect_timeout", 10),
+            idle_timeout=self.config.get("api_idle_timeout", 120),
+            max_total=self.config.get("api_max_timeout", 1800)
+        )
         
-        self.error_file = "error.json"
+        self.error_log = error_log or ErrorLogSink.shared(
+            self.config.get("error_log_file", "error.jsonl"),
+            max_bytes=int(self.config.get("error_log_max_mb", 5) * 1024 * 1024),
+            backup_count=self.config.get("error_log_backups", 3)
+        )
+
+        # Hedging bookkeeping
+        self._in_flight: Dict[str, int] = {}
+        self._primary_requests = 0
+        self._hedged_requests = 0
+        self.loop_aborts = 0
 
     def _log_error(self, request_body: Any, response_data: Any):
-        """Logs the full request and response to error.json with truncation for large data."""
-        
-        def truncate_recursive(data):
-            if isinstance(data, dict):
-                return {k: truncate_recursive(v) for k, v in data.items()}
-            elif isinstance(data, list):
-                return [truncate_recursive(i) for i in data]
-            elif isinstance(data, str) and len(data) > 200:
-                return data[:100] + "... [TRUNCATED] ..." + data[-50:]
-            return data
-
-        truncated_request = truncate_recursive(request_body)
-        
-        error_entry = {
-            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-            "request": truncated_request,
-            "response": response_data
-        }
-        
-        errors = []
-        if os.path.exists(self.error_file):
-            try:
-                with open(self.error_file, 'r') as f:
-                    errors = json.load(f)
-                    if not isinstance(errors, list):
-                        errors = []
-            except Exception:
-                errors = []
-        
-        errors.append(error_entry)
-        # Keep last 50 errors to avoid massive file
-        errors = errors[-50:]
-        
-        with open(self.error_file, 'w') as f:
-            json.dump(errors, f, indent=4)
+        """Queues the request and response for the background error log. Large fields are summarized."""
+        self.error_log.log(request_body, response_data)
 
-    async def generate_content_async(self, prompt: str, audio_base64: Optional[str] = None, model_type: str = "note", system_instruction: Optional[str] = None) -> str:
+    def _resolve_model(self, model_type: str) -> str:
         # Map 'note' to 'note_generation' to match config key
         config_prefix = "note_generation" if model_type == "note" else model_type
-        model_name = self.config.get(f"{config_prefix}_model") or "gemini-2.0-flash"
+        return self.config.get(f"{config_prefix}_model") or "gemini-2.0-flash"
+
+    @staticmethod
+    def _retry_delay_from_payload(payload: Any) -> Optional[float]:
+        """Extracts the server-suggested retry delay (google.rpc.RetryInfo) from an error payload."""
+        if isinstance(payload, list) and payload:
+            payload = payload[0]
+        if not isinstance(payload, dict):
+            return None
+        for detail in payload.get("error", {}).get("details", []):
+            delay = detail.get("retryDelay") if isinstance(detail, dict) else None
+            if isinstance(delay, str) and delay.endswith("s"):
+                try:
+                    return float(delay[:-1])
+                except ValueError:
+                    return None
+        return None
+
+    async def _stream_request(self, client: httpx.AsyncClient, auth_record: GeminiCliAuthRecord, request_body: Dict[str, Any], first_byte: Optional[asyncio.Event] = None, deadlines: Optional[Deadlines] = None) -> StreamResult:
+        """
+        Sends one streamGenerateContent request and returns its text, usage metadata and finish reason.
+        Raises DeadlineExceeded if the first line or a later one does not arrive within its budget.
+        """
+        self._in_flight[auth_record["email"]] = self._in_flight.get(auth_record["email"], 0) + 1
+        start_time = time.time()
+        try:
+            async with client.stream(
+                "POST",
+                f"{self.endpoint}/v1internal:streamGenerateContent?alt=sse",
+                headers={
+                    "Authorization": f"Bearer {auth_record['access']}",
+                    "Content-Type": "application/json",
+                    "Accept": "text/event-stream",
+                    **self.GEMINI_CLI_HEADERS,
+                },
+                json=request_body
+            ) as resp:
+                if resp.status_code != 200:
+                    await resp.aread()
+                    error_payload = resp.text
+                    try:
+                        error_payload = resp.json()
+                    except Exception: pass
+                    raise GeminiHTTPError(resp.status_code, error_payload)
+
+                # Process SSE stream
+                full_text = ""
+                usage: Dict[str, Any] = {}
+                finish_reason = None
+                received_first_byte = None
+                detector = RepetitionDetector() if self.config.get("loop_detection_enabled", True) else None
+                lines = resp.aiter_lines()
+                while True:
+                    budget, budget_name = None, None
+                    if deadlines:
+                        if received_first_byte is None:
+                            budget, budget_name = max(0.0, deadlines["first_byte"] - (time.time() - start_time)), "first_byte"
+                        else:
+                            budget, budget_name = deadlines["idle"], "idle"
+                    try:
+                        line = await asyncio.wait_for(anext(lines), budget)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        raise DeadlineExceeded(budget_name, deadlines[budget_name])
+
+                    if received_first_byte is None:
+                        received_first_byte = time.time()
+                        self.latency_tracker.record(request_body["model"], "first_byte", received_first_byte - start_time)
+                        if first_byte:
+                            first_byte.set()
+
+                    if line.startswith("data:"):
+                        json_str = line[5:].strip()
+                        if not json_str: continue
+                        try:
+                            chunk = json.loads(json_str)
+                            response = chunk.get("response", {})
+                            usage = response.get("usageMetadata") or usage
+                            candidates = response.get("candidates", [])
+                            if candidates:
+                                finish_reason = candidates[0].get("finishReason") or finish_reason
+                                parts_resp = candidates[0].get("content", {}).get("parts", [])
+                                for p in parts_resp:
+                                    if "text" in p:
+                                        full_text += p["text"]
+                                        if detector:
+                                            detector.feed(p["text"])
+                        except Exception:
+                            continue
+                        # Leaving the context manager closes the connection and stops generation
+                        if detector and detector.looping:
+                            raise DegenerateStreamError(len(full_text), detector.repeat_ratio())
+
+                if received_first_byte is not None:
+                    self.deadline_planner.record_throughput(request_body["model"], usage.get("candidatesTokenCount", 0), time.time() - received_first_byte)
+                return {"text": full_text, "usage": usage, "finish_reason": finish_reason}
+        finally:
+            self._in_flight[auth_record["email"]] -= 1
+
+    def _hedge_delay(self, model_name: str) -> Optional[float]:
+        """Returns how long to wait for a first byte before hedging, or None if hedging is not allowed."""
+        if not self.config.get("hedging_enabled", False):
+            return None
+        if self.latency_tracker.count(model_name, "first_byte") < self.config.get("hedge_min_samples", 20):
+            return None
+        budget = self.config.get("hedge_budget_ratio", 0.1) * self._primary_requests
+        if self._hedged_requests + 1 > budget:
+            return None
+        return self.latency_tracker.percentile(model_name, "first_byte", self.config.get("hedge_percentile", 95))
+
+    async def _request_with_hedging(self, client: httpx.AsyncClient, auth_record: GeminiCliAuthRecord, request_body: Dict[str, Any], model_name: str, exclude: Optional[set] = None, deadlines: Optional[Deadlines] = None, lane: Optional[str] = None):
+        """
+        Runs the request and, if no first byte arrives within the learned latency percentile,
+        races a duplicate on another idle account. The duplicate needs a free slot of the
+        caller's lane. Returns (StreamResult, account record that answered).
+        """
+        self._primary_requests += 1
+        delay = self._hedge_delay(model_name)
+        if delay is None:
+            return await self._stream_request(client, auth_record, request_body, deadlines=deadlines), auth_record
+
+        first_byte = asyncio.Event()
+        primary = asyncio.create_task(self._stream_request(client, auth_record, request_body, first_byte, deadlines))
+        first_byte_wait = asyncio.create_task(first_byte.wait())
+        hedge = None
+        # Whatever ends this coroutine (including the caller's total deadline cancelling it
+        # mid-wait) must not leave a request streaming on the account
+        try:
+            await asyncio.wait({primary, first_byte_wait}, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+            first_byte_wait.cancel()
+            if primary.done() or first_byte.is_set():
+                return await primary, auth_record
+
+            busy = {email for email, count in self._in_flight.items() if count > 0}
+            hedge_record = self.auth_service.get_next_account(exclude=busy | (exclude or set()) | {auth_record["email"]})
+            if hedge_record:
+                try:
+                    hedge_record = await self.auth_service.get_valid_account(hedge_record)
+                except Exception as e:
+                    logger.error(f"Failed to refresh token for hedge account {hedge_record.get('email')}: {e}")
+                    hedge_record = None
+            if not hedge_record:
+                return await primary, auth_record
+            if lane and not self.lanes.try_acquire(lane):
+                logger.info(f"No free '{lane}' lane slot for a hedged request")
+                return await primary, auth_record
+
+            self._hedged_requests += 1
+            logger.info(f"No first byte after {delay:.1f}s. Hedging request on {hedge_record['email']}")
+            hedge_body = {
+                **request_body,
+                "project": hedge_record["projectId"],
+                "requestId": f"pi-{int(time.time()*1000)}-{os.urandom(4).hex()}",
+            }
+            async def hedged():
+                try:
+                    return await self._stream_request(client, hedge_record, hedge_body, deadlines=deadlines)
+                finally:
+                    if lane:
+                        self.lanes.release(lane)
+
+            hedge = asyncio.create_task(hedged())
+            records = {primary: auth_record, hedge: hedge_record}
+
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            logger.info(f"Hedged request on {hedge_record['email']} finished first")
+                        return task.result(), records[task]
+            # Both failed: surface the primary's error
+            return await primary, auth_record
+        finally:
+            for task in (first_byte_wait, primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    @staticmethod
+    def _stitch(text: str, continuation: str, min_overlap: int = 20, max_overlap: int = 200) -> str:
+        """Appends continuation to text, dropping a prefix of it that repeats the end of text."""
+        for size in range(min(max_overlap, len(text), len(continuation)), min_overlap - 1, -1):
+            if text.endswith(continuation[:size]):
+                return text + continuation[size:]
+        return text + continuation
+
+    async def generate_content_async(self, prompt: str, audio_base64: Optional[str] = None, model_type: str = "note", system_instruction: Optional[str] = None, audio_duration: Optional[float] = None) -> str:
+        # Prepare parts
+        parts = []
+        if audio_base64:
+            parts.append({"inline_data": {"mime_type": "audio/mp3", "data": audio_base64}})
+        parts.append({"text": prompt})
+        user_turn = {"role": "user", "parts": parts}
+
+        result = await self._generate_with_retries([user_turn], model_type, system_instruction, audio_duration)
+        text = result["text"]
+
+        # A response cut off at max output tokens is continued instead of re-requested
+        continuations = 0
+        while result["finish_reason"] == "MAX_TOKENS" and continuations < self.config.get("max_continuations", 3):
+            continuations += 1
+            logger.warning(f"Response truncated at {len(text)} chars (MAX_TOKENS). Requesting continuation {continuations}...")
+            contents = [
+                user_turn,
+                {"role": "model", "parts": [{"text": text}]},
+                {"role": "user", "parts": [{"text": CONTINUATION_PROMPT}]},
+            ]
+            # Continuations are text-only for the chunk planner's per-audio-second rates
+            result = await self._generate_with_retries(contents, model_type, system_instruction, None)
+            if not result["text"]:
+                break
+            text = self._stitch(text, result["text"])
+
+        if result["finish_reason"] == "MAX_TOKENS":
+            logger.warning(f"Response still truncated after {continuations} continuation(s).")
+        return text
+
+    async def _generate_with_retries(self, contents: List[Dict[str, Any]], model_type: str, system_instruction: Optional[str], audio_duration: Optional[float]) -> StreamResult:
+        """Sends contents with account rotation, model fallback and retries. Returns the first successful StreamResult."""
+        primary_model = self._resolve_model(model_type)
+
+        # Lanes are named after the task; accounts outside the lane's pool are never used for it
+        excluded = self.lanes.excluded_accounts(model_type, [acc["email"] for acc in self.auth_service.accounts])
+        prompt_chars = len(system_instruction or "") + sum(len(p.get("text", "")) for c in contents for p in c["parts"])
         
-        max_accounts_to_try = len(self.auth_service.accounts) or 1
+        max_accounts_to_try = (len(self.auth_service.accounts) - len(excluded)) or 1
         accounts_tried = 0
         
         while accounts_tried < max_accounts_to_try:
             accounts_tried += 1
-            auth_record = self.auth_service.get_next_account()
+            model_name = self.model_router.select(model_type, primary_model)
+            auth_record = self.auth_service.get_next_account(exclude=excluded)
             if not auth_record:
-                raise Exception("No Gemini CLI accounts configured. Please add an account first.")
+                if not self.auth_service.accounts:
+                    raise Exception("No Gemini CLI accounts configured. Please add an account first.")
+                valid_emails = [acc["email"] for acc in self.auth_service.accounts if acc.get("status") == "valid" and acc["email"] not in excluded]
+                wait = self.auth_service.breaker.seconds_until_available(valid_emails)
+                if wait is None:
+                    raise Exception("No valid Gemini CLI accounts available. Please re-login.")
+                logger.warning(f"All accounts are cooling down. Waiting {wait:.0f}s for the next one...")
+                await asyncio.sleep(wait)
+                accounts_tried -= 1
+                continue
             
             # Ensure token is valid
             try:
                 auth_record = await self.auth_service.get_valid_account(auth_record)
             except Exception as e:
                 logger.error(f"Failed to refresh token for {auth_record.get('email')}: {e}")
+                self.auth_service.breaker.record_failure(auth_record["email"], "auth")
                 continue # Try next account
 
-            # Prepare parts
-            parts = []
-            if audio_base64:
-                parts.append({"inline_data": {"mime_type": "audio/mp3", "data": audio_base64}})
-            parts.append({"text": prompt})
-
             request_id = f"pi-{int(time.time()*1000)}-{os.urandom(4).hex()}"
             request_body = {
                 "project": auth_record["projectId"],
                 "model": model_name,
                 "request": {
-                    "contents": [
-                        {
-                            "role": "user",
-                            "parts": parts,
-                        },
-                    ],
+                    "contents": contents,
                 },
                 "userAgent": "pi-cli-standalone",
                 "requestId": request_id,
@@ -121,80 +391,86 @@ class GeminiAPIWrapper:
                     "parts": [{"text": system_instruction}]
                 }
 
+            deadlines = self.deadline_planner.plan(model_name, audio_duration, prompt_chars)
+            timeout = httpx.Timeout(self.api_timeout, connect=deadlines["connect"], read=max(deadlines["first_byte"], deadlines["idle"]))
+
             for attempt in range(self.api_max_retries + 1):
                 logger.info(f"Gemini API Request - Account: {auth_record['email']}, Type: {model_type}, Model: {model_name} (Attempt: {attempt + 1})")
                 
                 start_time = time.time()
                 try:
-                    async with httpx.AsyncClient(timeout=self.api_timeout) as client:
-                        resp = await client.post(
-                            f"{self.CODE_ASSIST_ENDPOINT}/v1internal:streamGenerateContent?alt=sse",
-                            headers={
-                                "Authorization": f"Bearer {auth_record['access']}",
-                                "Content-Type": "application/json",
-                                "Accept": "text/event-stream",
-                                **self.GEMINI_CLI_HEADERS,
-                            },
-                            json=request_body
-                        )
-
-                        if resp.status_code != 200:
-                            error_payload = resp.text
-                            try:
-                                error_payload = resp.json()
-                            except: pass
-                            
-                            self._log_error(request_body, error_payload)
-                            logger.error(f"Gemini API Error ({resp.status_code}) for {auth_record['email']}")
-                            
-                            if resp.status_code == 429:
-                                logger.warning(f"Rate limit (429) for {auth_record['email']}. Waiting 30s and retrying indefinitely...")
-                                await asyncio.sleep(30)
-                                accounts_tried = 0 # Reset safety to allow indefinite retries
-                                break # Move to next account (or same if only one)
-                            
-                            if resp.status_code in [401, 403]:
-                                break # Move to next account
-                            
-                            if resp.status_code == 503:
-                                logger.warning("Service Unavailable (503). Retrying...")
-                                time.sleep(self.api_retry_delay)
-                                continue
-                            
-                            raise Exception(f"API Error {resp.status_code}: {resp.text}")
-
-                        # Process SSE stream
-                        full_text = ""
-                        for line in resp.iter_lines():
-                            # Ensure line is a string for startswith and slicing
-                            if isinstance(line, bytes):
-                                line = line.decode('utf-8')
-                                
-                            if line.startswith("data:"):
-                                json_str = line[5:].strip()
-                                if not json_str: continue
-                                try:
-                                    chunk = json.loads(json_str)
-                                    candidates = chunk.get("response", {}).get("candidates", [])
-                                    if candidates:
-                                        parts_resp = candidates[0].get("content", {}).get("parts", [])
-                                        for p in parts_resp:
-                                            if "text" in p:
-                                                full_text += p["text"]
-                                except Exception:
-                                    continue
+                    async with self.lanes.slot(model_type), httpx.AsyncClient(timeout=timeout) as client:
+                        try:
+                            result, used_record = await asyncio.wait_for(
+                                self._request_with_hedging(client, auth_record, request_body, model_name, exclude=excluded, deadlines=deadlines, lane=model_type),
+                                deadlines["total"]
+                            )
+                        except asyncio.TimeoutError:
+                            raise DeadlineExceeded("total", deadlines["total"])
 
                         duration = time.time() - start_time
-                        logger.info(f"Gemini API Response - Success - Duration: {duration:.2f}s")
+                        usage = result["usage"]
+                        logger.info(f"Gemini API Response - Success - Duration: {duration:.2f}s, Tokens: {usage.get('promptTokenCount', '?')} in / {usage.get('candidatesTokenCount', '?')} out")
                         
                         # Record usage
-                        self.usage_tracker.record_usage(auth_record["email"] or "unknown", model_name)
-                        return full_text
+                        self.usage_tracker.record_usage(used_record["email"] or "unknown", model_name)
+                        self.auth_service.breaker.record_success(used_record["email"])
+                        self.chunk_planner.record(model_name, usage, result["finish_reason"], audio_seconds=audio_duration)
+                        self.last_model_used = model_name
+                        return result
+
+                except GeminiHTTPError as e:
+                    self._log_error(request_body, e.payload)
+                    logger.error(f"Gemini API Error ({e.status_code}) for {auth_record['email']}")
+                    if e.status_code == 429:
+                        self.model_router.record_rate_limit(model_name)
 
-                except httpx.TimeoutException:
-                    logger.warning(f"Gemini API Timeout (Attempt {attempt+1})")
+                    # While a fallback model can take over, a 429 is the model's quota, not the account's fault
+                    if e.status_code != 429 or not self.model_router.has_fallback(model_type, primary_model, model_name):
+                        self.auth_service.breaker.record_failure(
+                            auth_record["email"],
+                            CircuitBreaker.classify(e.status_code),
+                            retry_after=self._retry_delay_from_payload(e.payload)
+                        )
+                    
+                    if e.status_code == 429:
+                        logger.warning(f"Rate limit (429) for {auth_record['email']} on {model_name}. Switching account and retrying indefinitely...")
+                        accounts_tried = 0 # Reset safety to allow indefinite retries
+                        break # Move to next account (waits only if every account is cooling down)
+                    
+                    if e.status_code in [401, 403]:
+                        break # Move to next account
+
+                    if not self.auth_service.breaker.allow(auth_record["email"]):
+                        break # Circuit opened, move to next account
+                    
+                    if e.status_code == 503:
+                        logger.warning("Service Unavailable (503). Retrying...")
+                        time.sleep(self.api_retry_delay)
+                        continue
+                    
+                    if attempt >= self.api_max_retries:
+                        break # Try next account
+                    time.sleep(self.api_retry_delay)
+                except DegenerateStreamError as e:
+                    self.loop_aborts += 1
+                    logger.warning(f"Aborted looping response from {model_name} for {auth_record['email']}: {e}")
+                    self._log_error(request_body, str(e))
                     if attempt >= self.api_max_retries:
                         break # Try next account
+                    # Retry right away with a higher temperature to break the loop
+                    generation_config = request_body["request"].get("generationConfig", {})
+                    temperature = min(2.0, generation_config.get("temperature", 1.0) + 0.3)
+                    request_body = {
+                        **request_body,
+                        "request": {**request_body["request"], "generationConfig": {**generation_config, "temperature": temperature}},
+                        "requestId": f"pi-{int(time.time()*1000)}-{os.urandom(4).hex()}",
+                    }
+                except httpx.TimeoutException as e:
+                    logger.warning(f"Gemini API Timeout (Attempt {attempt+1}): {e or type(e).__name__}")
+                    self.auth_service.breaker.record_failure(auth_record["email"], "timeout")
+                    if attempt >= self.api_max_retries or not self.auth_service.breaker.allow(auth_record["email"]):
+                        break # Try next account
                     time.sleep(self.api_retry_delay)
                 except Exception as e:
                     logger.error(f"Gemini API Exception ({type(e).__name__}): {e}")
@@ -206,14 +482,47 @@ class GeminiAPIWrapper:
         raise Exception("All configured Gemini CLI accounts failed or were skipped.")
 
     # Synchronous wrappers for existing pipeline
-    def generate_content(self, prompt, model_type="note", system_instruction=None):
+    def generate_content(self, prompt, model_type="note", system_instruction=None, use_cache=True):
         import asyncio
-        return asyncio.run(self.generate_content_async(prompt, model_type=model_type, system_instruction=system_instruction))
+        cache_key = None
+        if use_cache:
+            cache_key = ResponseCache.make_key(self._resolve_model(model_type), system_instruction, prompt)
+            request_bytes = len(prompt.encode("utf-8")) + len((system_instruction or "").encode("utf-8"))
+            cached = self.response_cache.get(cache_key, request_bytes=request_bytes)
+            if cached is not None:
+                self.last_model_used = self._resolve_model(model_type)
+                return cached
 
-    def generate_content_with_file(self, file_path, prompt, model_type="transcription", system_instruction=None):
+        self.last_model_used = self._resolve_model(model_type)
+        text = asyncio.run(self.generate_content_async(prompt, model_type=model_type, system_instruction=system_instruction))
+        # Fallback answers are not cached under the configured model's key
+        if cache_key and self.last_model_used == self._resolve_model(model_type):
+            self.response_cache.put(cache_key, text, model=self.last_model_used)
+        return text
+
+    def generate_content_with_file(self, file_path, prompt, model_type="transcription", system_instruction=None, use_cache=True, audio_duration=None):
         import asyncio
-        audio_base64 = AudioProcessor.encode_to_base64(file_path)
-        return asyncio.run(self.generate_content_async(prompt, audio_base64=audio_base64, model_type=model_type, system_instruction=system_instruction))
+        with open(file_path, "rb") as f:
+            audio_bytes = f.read()
+
+        cache_key = None
+        if use_cache:
+            cache_key = ResponseCache.make_key(self._resolve_model(model_type), system_instruction, prompt, audio_bytes)
+            request_bytes = len(audio_bytes) + len(prompt.encode("utf-8")) + len((system_instruction or "").encode("utf-8"))
+            cached = self.response_cache.get(cache_key, request_bytes=request_bytes)
+            if cached is not None:
+                self.last_model_used = self._resolve_model(model_type)
+                return cached
+
+        if audio_duration is None:
+            audio_duration = AudioProcessor.get_duration(file_path) or None
+        audio_base64 = base64.b64encode(audio_bytes).decode("utf-8")
+        self.last_model_used = self._resolve_model(model_type)
+        text = asyncio.run(self.generate_content_async(prompt, audio_base64=audio_base64, model_type=model_type, system_instruction=system_instruction, audio_duration=audio_duration))
+        # Fallback answers are not cached under the configured model's key
+        if cache_key and self.last_model_used == self._resolve_model(model_type):
+            self.response_cache.put(cache_key, text, model=self.last_model_used)
+        return text
 
     def _wait_for_file_active(self, client, file_obj):
         """Waits for the uploaded file to be in ACTIVE state."""
@@ -5,9 +5,13 @@ import hashlib
 import base64
 import secrets
 import logging
+import asyncio
+import threading
+import concurrent.futures
 import httpx
 from typing import Optional, Dict, List, TypedDict
 from urllib.parse import urlencode, urlparse, parse_qs
+from src.circuit_breaker import CircuitBreaker
 
 logger = logging.getLogger(__name__)
 
@@ -33,12 +37,50 @@ class GeminiAuthService:
         "https://www.googleapis.com/auth/userinfo.profile",
     ]
 
-    def __init__(self, auth_file: str = "gemini_cli_auth.json"):
+    _shared: Dict[tuple, "GeminiAuthService"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, auth_file: str = "gemini_cli_auth.json", breaker: Optional[CircuitBreaker] = None, token_url: Optional[str] = None, store=None):
         self.auth_file = auth_file
+        self.token_url = token_url or self.TOKEN_URL
+        # Optional SharedStateStore; when set, accounts and the rotation are shared with other processes
+        self.store = store
+        self._accounts_mtime: Optional[float] = None
         self.accounts: List[GeminiCliAuthRecord] = self._load_accounts()
         self.current_index = 0
+        self.breaker = breaker or CircuitBreaker(store=store)
 
-    def _load_accounts(self) -> List[GeminiCliAuthRecord]:
+        # Single-flight refreshes: email -> future shared by every caller waiting on that refresh
+        self._refresh_lock = threading.Lock()
+        self._inflight_refreshes: Dict[str, concurrent.futures.Future] = {}
+        self._save_lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._stop_refresher = threading.Event()
+
+    @classmethod
+    def shared(cls, auth_file: str = "gemini_cli_auth.json", token_url: Optional[str] = None, store=None) -> "GeminiAuthService":
+        """
+        Returns one service per auth file, token endpoint and store, so a process runs a single
+        background refresher and refreshes of an account are deduplicated process-wide.
+        Without a store, accounts are reloaded if the auth file changed since it was last read.
+        """
+        key = (os.path.abspath(auth_file), token_url, id(store))
+        with cls._shared_lock:
+            service = cls._shared.get(key)
+            if service is None:
+                service = cls._shared[key] = cls(auth_file, token_url=token_url, store=store)
+            elif not store and service._file_mtime() != service._accounts_mtime:
+                service.accounts = service._load_accounts()
+            return service
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.auth_file)
+        except OSError:
+            return None
+
+    def _load_json_accounts(self) -> List[GeminiCliAuthRecord]:
+        self._accounts_mtime = self._file_mtime()
         if not os.path.exists(self.auth_file):
             return []
         try:
@@ -50,10 +92,28 @@ class GeminiAuthService:
         except (json.JSONDecodeError, IOError):
             return []
 
-    def _save_accounts(self):
+    def _load_accounts(self) -> List[GeminiCliAuthRecord]:
+        if not self.store:
+            return self._load_json_accounts()
+        imported = self.store.import_accounts(self._load_json_accounts())
+        if imported:
+            logger.info(f"Imported {imported} account(s) from {self.auth_file} into the shared state store")
+        return self.store.load_accounts()
+
+    def _save_accounts(self, records: Optional[List[GeminiCliAuthRecord]] = None):
+        """
+        Persists the accounts. With a shared store only the given records (all if None) are
+        written, so records another process updated meanwhile are not overwritten.
+        """
+        if self.store:
+            for record in (self.accounts if records is None else records):
+                self.store.save_account(record)
+            return
         try:
-            with open(self.auth_file, 'w') as f:
-                json.dump(self.accounts, f, indent=4)
+            with self._save_lock:
+                with open(self.auth_file, 'w') as f:
+                    json.dump(self.accounts, f, indent=4)
+                self._accounts_mtime = self._file_mtime()
         except IOError as e:
             logger.error(f"Error saving auth records: {e}")
 
@@ -88,7 +148,7 @@ class GeminiAuthService:
             data["client_secret"] = client_secret
 
         async with httpx.AsyncClient() as client:
-            resp = await client.post(self.TOKEN_URL, data=data)
+            resp = await client.post(self.token_url, data=data)
             if resp.status_code != 200:
                 raise Exception(f"Token exchange failed: {resp.text}")
             
@@ -125,12 +185,12 @@ class GeminiAuthService:
         for i, acc in enumerate(self.accounts):
             if acc["email"] == record["email"]:
                 self.accounts[i] = record
-                self._save_accounts()
+                self._save_accounts([record])
                 return
         self.accounts.append(record)
-        self._save_accounts()
+        self._save_accounts([record])
 
-    async def refresh_token(self, record: GeminiCliAuthRecord) -> GeminiCliAuthRecord:
+    async def refresh_token(self, record: GeminiCliAuthRecord, save: bool = True) -> GeminiCliAuthRecord:
         data = {
             "client_id": record["clientId"],
             "refresh_token": record["refresh"],
@@ -140,10 +200,11 @@ class GeminiAuthService:
             data["client_secret"] = record["clientSecret"]
 
         async with httpx.AsyncClient() as client:
-            resp = await client.post(self.TOKEN_URL, data=data)
+            resp = await client.post(self.token_url, data=data)
             if resp.status_code != 200:
                 record["status"] = "invalid"
-                self._save_accounts()
+                if save:
+                    self._save_accounts([record])
                 raise Exception(f"Token refresh failed: {resp.text}")
             
             token_data = resp.json()
@@ -155,9 +216,116 @@ class GeminiAuthService:
             record["expires"] = int(time.time() * 1000) + (expires_in * 1000) - (5 * 60 * 1000)
             record["status"] = "valid"
             
-            self._save_accounts()
+            if save:
+                self._save_accounts([record])
             return record
 
+    async def refresh_single_flight(self, record: GeminiCliAuthRecord, save: bool = True) -> GeminiCliAuthRecord:
+        """
+        Refreshes the record's token unless a refresh of the same account is already running,
+        in which case its result is awaited instead. Works across threads and event loops.
+        """
+        email = record["email"]
+        with self._refresh_lock:
+            future = self._inflight_refreshes.get(email)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._inflight_refreshes[email] = future
+            if leader:
+                # A running future cannot be cancelled, so a cancelled follower does not take it down
+                future.set_running_or_notify_cancel()
+        if not leader:
+            try:
+                return await asyncio.wrap_future(future)
+            except asyncio.CancelledError:
+                if not future.done():
+                    raise
+                # The leader was cancelled, not this caller: take over the refresh
+                return await self.refresh_single_flight(record, save=save)
+
+        try:
+            if self.store:
+                result = await self._refresh_with_lease(record)
+            else:
+                result = await self.refresh_token(record, save=save)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            # Including cancellation, so followers never wait on an unresolved future
+            future.set_exception(e)
+            raise
+        finally:
+            with self._refresh_lock:
+                self._inflight_refreshes.pop(email, None)
+
+    def _stored_record(self, email: str) -> Optional[GeminiCliAuthRecord]:
+        return next((acc for acc in self.store.load_accounts() if acc["email"] == email), None)
+
+    async def _refresh_with_lease(self, record: GeminiCliAuthRecord, ttl: float = 60) -> GeminiCliAuthRecord:
+        """
+        Cross-process single flight: refreshes under a lease in the shared store. If another
+        process holds the lease, waits for it and adopts the token it stored.
+        """
+        lease = f"refresh:{record['email']}"
+
+        def refreshed_elsewhere() -> bool:
+            stored = self._stored_record(record["email"])
+            if stored and stored["access"] != record["access"] and stored["expires"] > record["expires"]:
+                record.update(stored)
+                return True
+            return False
+
+        while not self.store.try_lease(lease, ttl):
+            await asyncio.sleep(0.5)
+            if refreshed_elsewhere():
+                return record
+        try:
+            if refreshed_elsewhere():
+                return record
+            # Saved right away (a single row) so processes waiting on the lease see it
+            return await self.refresh_token(record, save=True)
+        finally:
+            self.store.release_lease(lease)
+
+    async def refresh_due_accounts(self, lead_seconds: float = 300) -> int:
+        """
+        Refreshes, concurrently, every valid account whose token expires within lead_seconds,
+        then saves all records in one write. Returns the number of accounts refreshed.
+        """
+        deadline = int((time.time() + lead_seconds) * 1000)
+        due = [acc for acc in self.accounts if acc.get("status") == "valid" and acc["expires"] <= deadline]
+        if not due:
+            return 0
+        results = await asyncio.gather(*(self.refresh_single_flight(acc, save=False) for acc in due), return_exceptions=True)
+        for acc, result in zip(due, results):
+            if isinstance(result, Exception):
+                logger.error(f"Background token refresh failed for {acc['email']}: {result}")
+        self._save_accounts(due)
+        return sum(1 for r in results if not isinstance(r, Exception))
+
+    def start_background_refresh(self, interval: float = 60, lead_seconds: float = 300):
+        """Starts a daemon thread that refreshes tokens before they expire. Does nothing if already running."""
+        if self._refresher and self._refresher.is_alive():
+            return
+        self._stop_refresher.clear()
+
+        def run():
+            while not self._stop_refresher.is_set():
+                try:
+                    asyncio.run(self.refresh_due_accounts(lead_seconds))
+                except Exception as e:
+                    logger.error(f"Background token refresh error: {e}")
+                self._stop_refresher.wait(interval)
+
+        self._refresher = threading.Thread(target=run, name="token-refresher", daemon=True)
+        self._refresher.start()
+
+    def stop_background_refresh(self):
+        self._stop_refresher.set()
+        if self._refresher:
+            self._refresher.join(timeout=5)
+
     async def _get_user_email(self, access_token: str) -> Optional[str]:
         try:
             async with httpx.AsyncClient() as client:
@@ -255,18 +423,38 @@ class GeminiAuthService:
                     return data
         raise Exception("Operation polling timeout")
 
-    def get_next_account(self) -> Optional[GeminiCliAuthRecord]:
-        valid_accounts = [acc for acc in self.accounts if acc["status"] == "valid"]
+    def get_next_account(self, exclude: Optional[set] = None) -> Optional[GeminiCliAuthRecord]:
+        """
+        Returns the next usable account, skipping emails in exclude and accounts whose
+        circuit breaker is open. Healthy accounts are rotated round-robin; degraded
+        ones are only used when no healthy account is left.
+        """
+        if self.store:
+            # Pick up accounts added or refreshed by other processes
+            self.accounts = self.store.load_accounts()
+        valid_accounts = [
+            acc for acc in self.accounts
+            if acc["status"] == "valid" and acc["email"] not in (exclude or ()) and self.breaker.allow(acc["email"])
+        ]
         if not valid_accounts:
             return None
+
+        healthy = [acc for acc in valid_accounts if self.breaker.health(acc["email"]) >= self.breaker.HEALTHY_THRESHOLD]
+        valid_accounts = healthy or valid_accounts
         
-        acc = valid_accounts[self.current_index % len(valid_accounts)]
-        self.current_index += 1
-        return acc
+        if self.store:
+            index = self.store.next_counter("account_rotation")
+        else:
+            index = self.current_index
+            self.current_index += 1
+        return valid_accounts[index % len(valid_accounts)]
 
     async def get_valid_account(self, record: GeminiCliAuthRecord) -> GeminiCliAuthRecord:
-        """Ensures the record has a valid access token, refreshing if necessary."""
+        """
+        Ensures the record has a valid access token. Tokens are normally renewed ahead of time by
+        the background refresher; an expired one is refreshed here, sharing any refresh in flight.
+        """
         if int(time.time() * 1000) >= record["expires"]:
             logger.info(f"Refreshing token for {record['email']}")
-            return await self.refresh_token(record)
+            return await self.refresh_single_flight(record)
         return record
@@ -0,0 +1,77 @@
+import os
+import gzip
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+class JobArchive:
+    """
+    Cold storage for finished jobs: gzip-compressed JSON-lines segments partitioned by the
+    month the job finished (jobs-YYYY-MM.jsonl.gz). Segments are only appended to; queries
+    read just the partitions overlapping the requested date range.
+    """
+
+    def __init__(self, archive_dir: str = "archive"):
+        self.archive_dir = archive_dir
+
+    def _segment_path(self, month: str) -> str:
+        return os.path.join(self.archive_dir, f"jobs-{month}.jsonl.gz")
+
+    def segments(self) -> List[Tuple[str, str]]:
+        """Returns (month, path) of every segment, oldest first."""
+        if not os.path.isdir(self.archive_dir):
+            return []
+        found = []
+        for name in sorted(os.listdir(self.archive_dir)):
+            if name.startswith("jobs-") and name.endswith(".jsonl.gz"):
+                found.append((name[len("jobs-"):-len(".jsonl.gz")], os.path.join(self.archive_dir, name)))
+        return found
+
+    def append(self, jobs: Iterable[Tuple[Dict[str, Any], datetime]]) -> int:
+        """Appends (job, finished_at) pairs to their monthly segments. Returns the number written."""
+        by_month: Dict[str, List[str]] = {}
+        for job, finished_at in jobs:
+            record = {**job, "archived_finished_at": finished_at.isoformat()}
+            by_month.setdefault(finished_at.strftime("%Y-%m"), []).append(json.dumps(record))
+        if not by_month:
+            return 0
+        os.makedirs(self.archive_dir, exist_ok=True)
+        written = 0
+        for month, lines in by_month.items():
+            # Each append is a separate gzip member; readers see the concatenation
+            with open(self._segment_path(month), 'ab') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='wb') as gz:
+                    gz.write(("\n".join(lines) + "\n").encode("utf-8"))
+                raw.flush()
+                os.fsync(raw.fileno())
+            written += len(lines)
+        return written
+
+    def query(self, status: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None,
+              name_contains: Optional[str] = None, url: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Returns archived jobs matching every given filter, oldest first. since/until bound the finish time."""
+        results: Dict[str, Dict[str, Any]] = {}
+        for month, path in self.segments():
+            if since and month < since.strftime("%Y-%m"):
+                continue
+            if until and month > until.strftime("%Y-%m"):
+                continue
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    job = json.loads(line)
+                    finished_at = datetime.fromisoformat(job["archived_finished_at"])
+                    if status and job.get("status") != status:
+                        continue
+                    if since and finished_at < since:
+                        continue
+                    if until and finished_at > until:
+                        continue
+                    if name_contains and name_contains.lower() not in job.get("name", "").lower():
+                        continue
+                    if url and job.get("url") != url:
+                        continue
+                    # A crash between archiving and deleting can archive a job twice; keep the last copy
+                    results[job["id"]] = job
+        return list(results.values())
@@ -1,29 +1,148 @@
 import re
 import json
 import os
-from datetime import datetime
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from src.job_store import JobStore
+from src.job_archive import JobArchive
+from src.url_canonicalizer import canonicalize
+from src.progress_model import ProgressModel
 
 HISTORY_FILE = "history.json"
+JOBS_DB = "jobs.db"
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = [
+    'queue', 'failed', 'downloading', 'processing',
+    'DOWNLOADED', 'SILENCE_REMOVED', 'BITRATE_MODIFIED', 'CHUNKED'
+]
+CHUNK_STATUS_PREFIX = 'TRANSCRIBING_CHUNK_'
+TERMINAL_STATUSES = ['completed', 'completed_local_only', 'cancelled', 'no_link_found']
+# Failed for a reason retrying cannot fix; not picked up again until requeued
+PERMANENT_FAILURE_STATUS = 'failed_permanent'
+# Duplicate of another pending job (same media); finishes when that job does
+COALESCED_STATUS = 'coalesced'
+# fifo: insertion order. priority: highest `priority` first. sjf: shortest `media_duration`
+# first (unknown durations last). edf: earliest `deadline` first (jobs without one last).
+SCHEDULING_POLICIES = ['fifo', 'priority', 'sjf', 'edf']
 
 class JobManager:
-    def __init__(self):
-        self.history = []
+    """
+    Job queue persisted in a SQLite JobStore (one row per job, indexed by id and status).
+    `history` is the in-memory view of the stored jobs; every change writes only the affected rows.
+    Finished jobs older than archive_after_days are moved to a compressed JobArchive on load,
+    so `history` only holds active and recently finished jobs.
+
+    Several workers (processes, or hosts sharing the database) can run the same queue: each
+    claims a job with a lease before running it and renews its leases from a heartbeat thread.
+    """
+    def __init__(self, db_file=None, durability="batched", archive_after_days=30):
+        self.store = JobStore(db_file or JOBS_DB, durability=durability)
+        self.archive = JobArchive(os.path.join(os.path.dirname(self.store.db_file), "archive"))
+        self.archive_after_days = archive_after_days
+        self.progress_model = ProgressModel(self.store)
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{os.urandom(4).hex()}"
+        self._heartbeat = None
+        self._stop_heartbeat = threading.Event()
+        # Guards _history, _index and the cached job dicts: download threads update jobs
+        # while the runner reads and updates them
+        self._lock = threading.RLock()
+        self._history = []
+        self._index = {}
         self.load_history()
 
+    @property
+    def history(self):
+        return self._history
+
+    @history.setter
+    def history(self, jobs):
+        """Replaces every stored job with jobs."""
+        self._set_history(jobs)
+        self.store.replace_all(jobs)
+
+    def _set_history(self, jobs):
+        with self._lock:
+            self._history = jobs
+            self._index = {job.get('id'): job for job in jobs}
+
+    def _find(self, job_id):
+        """Returns the cached job, falling back to the store for jobs added by another process."""
+        with self._lock:
+            job = self._index.get(job_id)
+            if job is not None:
+                return job
+            for job in self._history:
+                if job.get('id') == job_id:
+                    self._index[job_id] = job
+                    return job
+            job = self.store.get(job_id)
+            if job is not None:
+                self._history.append(job)
+                self._index[job_id] = job
+            return job
+
+    def _migrate_history_file(self):
+        """One-time import of a legacy history.json into an empty store."""
+        if self.store.count() or not os.path.exists(HISTORY_FILE):
+            return
+        try:
+            with open(HISTORY_FILE, 'r') as f:
+                jobs = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.error(f"Could not migrate {HISTORY_FILE}: {e}")
+            return
+        self.store.upsert_many(job for job in jobs if job.get('id'))
+        os.replace(HISTORY_FILE, HISTORY_FILE + ".migrated")
+        logger.info(f"Migrated {len(jobs)} jobs from {HISTORY_FILE} to {self.store.db_file}")
+
     def load_history(self):
-        if os.path.exists(HISTORY_FILE):
-            try:
-                with open(HISTORY_FILE, 'r') as f:
-                    self.history = json.load(f)
-            except:
-                self.history = []
-        else:
-            self.history = []
+        self._migrate_history_file()
+        if self.archive_after_days is not None:
+            self.archive_old_jobs(self.archive_after_days)
+        self._set_history(self.store.load_all())
+
+    @staticmethod
+    def _finished_at(job, last_event_at):
+        if last_event_at:
+            return datetime.fromtimestamp(last_event_at)
+        try:
+            return datetime.fromisoformat(job.get('added_at', ''))
+        except ValueError:
+            return None
+
+    def archive_old_jobs(self, max_age_days=30):
+        """Moves finished jobs older than max_age_days from the store to the archive. Returns the count moved."""
+        cutoff = datetime.now() - timedelta(days=max_age_days)
+        old = []
+        for job, last_event_at in self.store.jobs_with_last_event(TERMINAL_STATUSES):
+            finished_at = self._finished_at(job, last_event_at)
+            if finished_at and finished_at < cutoff:
+                old.append((job, finished_at))
+        if not old:
+            return 0
+        # Archive first: a crash in between leaves a duplicate, never a lost job
+        self.archive.append(old)
+        self.store.delete(job['id'] for job, _ in old)
+        with self._lock:
+            for job, _ in old:
+                self._index.pop(job['id'], None)
+            self._history = [j for j in self._history if j.get('id') in self._index]
+        logger.info(f"Archived {len(old)} finished jobs older than {max_age_days} days")
+        return len(old)
+
+    def query_archive(self, status=None, since=None, until=None, name_contains=None, url=None):
+        """Searches archived jobs. since/until are datetimes bounding when the job finished."""
+        return self.archive.query(status=status, since=since, until=until, name_contains=name_contains, url=url)
 
-    def save_history(self):
-        # Save entire history to file
-        with open(HISTORY_FILE, 'w') as f:
-            json.dump(self.history, f, indent=4)
+    def save_history(self, jobs=None):
+        # Jobs are written as they change; this persists any in-place edits to cached jobs.
+        # Workers sharing the store pass just their own jobs so they don't overwrite each other's.
+        with self._lock:
+            self.store.upsert_many(self._history if jobs is None else jobs)
 
     def get_pending_from_last_150(self):
         """
@@ -31,63 +150,255 @@ class JobManager:
         Also includes granular intermediate states.
         Exclude 'no_link_found' from retry.
         """
-        target_statuses = [
-            'queue', 'failed', 'downloading', 'processing',
-            'DOWNLOADED', 'SILENCE_REMOVED', 'BITRATE_MODIFIED', 'CHUNKED'
-        ]
-        # Use regex for TRANSCRIBING_CHUNK_N
-        pending = []
-        for job in self.history:
-            status = job.get('status', '')
-            if status in target_statuses or status.startswith('TRANSCRIBING_CHUNK_'):
+        with self._lock:
+            pending = []
+            for stored in self.store.find_by_status(PENDING_STATUSES, [CHUNK_STATUS_PREFIX]):
+                job = self._find(stored['id'])
+                job.update(stored)
                 pending.append(job)
-        return pending
+            return pending
+
+    @staticmethod
+    def _schedule_key(job, policy):
+        priority = -(job.get('priority') or 0)
+        if policy == 'sjf':
+            duration = job.get('media_duration')
+            return (duration is None, duration or 0)
+        if policy == 'edf':
+            deadline = job.get('deadline')
+            return (deadline is None, datetime.fromisoformat(deadline) if deadline else datetime.max, priority)
+        if policy == 'priority':
+            return (priority,)
+        return ()
+
+    def order_jobs(self, jobs, policy='fifo'):
+        """Returns jobs in the order the scheduling policy runs them. Ties keep insertion order."""
+        if policy not in SCHEDULING_POLICIES:
+            logger.warning(f"Unknown scheduling policy '{policy}', using fifo")
+            policy = 'fifo'
+        return sorted(jobs, key=lambda job: self._schedule_key(job, policy))
+
+    def next_pending_job(self, policy='fifo', exclude=()):
+        """Returns the pending job the policy would run next, skipping ids in exclude, or None."""
+        pending = [job for job in self.get_pending_from_last_150() if job['id'] not in exclude]
+        ordered = self.order_jobs(pending, policy)
+        return ordered[0] if ordered else None
+
+    def claim_job(self, job_id, ttl=120):
+        """Claims a job for this worker for ttl seconds. Returns False if another worker holds it."""
+        return self.store.claim(job_id, self.worker_id, ttl)
+
+    def release_job(self, job_id):
+        self.store.release(job_id, self.worker_id)
+
+    def claim_next_job(self, policy='fifo', exclude=(), ttl=120, prefer=()):
+        """
+        Claims and returns the first pending job in policy order that no other worker holds, or None.
+        Jobs in prefer (e.g. already downloaded) come before the rest.
+        """
+        pending = [job for job in self.get_pending_from_last_150() if job['id'] not in exclude]
+        ordered = self.order_jobs(pending, policy)
+        ordered.sort(key=lambda job: job['id'] not in prefer)
+        for job in ordered:
+            if not self.claim_job(job['id'], ttl):
+                continue
+            # Another worker may have finished it between the query and the claim
+            stored = self.store.get(job['id'])
+            if stored and self._is_pending(stored, PENDING_STATUSES):
+                with self._lock:
+                    job.update(stored)
+                return job
+            self.release_job(job['id'])
+        return None
+
+    def start_heartbeat(self, ttl=120, interval=None):
+        """Renews this worker's leases every interval seconds (default ttl/3) from a daemon thread."""
+        if self._heartbeat and self._heartbeat.is_alive():
+            return
+        self._stop_heartbeat.clear()
+        interval = interval or ttl / 3
+
+        def run():
+            while not self._stop_heartbeat.wait(interval):
+                try:
+                    self.store.renew_leases(self.worker_id, ttl)
+                except Exception as e:
+                    logger.error(f"Job lease heartbeat failed: {e}")
+
+        self._heartbeat = threading.Thread(target=run, name="job-lease-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def stop_heartbeat(self):
+        self._stop_heartbeat.set()
+
+    def set_job_schedule(self, job_id, priority=None, deadline=None):
+        """Sets a job's priority (higher runs first) and/or deadline (datetime or ISO string)."""
+        with self._lock:
+            job = self._find(job_id)
+            if job is None:
+                return False
+            if priority is not None:
+                job['priority'] = int(priority)
+            if deadline is not None:
+                job['deadline'] = deadline.isoformat() if isinstance(deadline, datetime) else str(deadline)
+            self.store.upsert(job)
+            return True
+
+    def record_probe(self, job_id, metadata):
+        """Stores pre-download metadata (see media_probe) on the job; its duration feeds the sjf policy."""
+        with self._lock:
+            job = self._find(job_id)
+            if job is None:
+                return False
+            job['probe'] = metadata
+            if metadata.get('duration') and not job.get('media_duration'):
+                job['media_duration'] = metadata['duration']
+            self.store.upsert(job)
+            return True
+
+    def record_media_duration(self, job_id, seconds):
+        """Records the probed media duration used by the sjf policy."""
+        with self._lock:
+            job = self._find(job_id)
+            if job is None:
+                return False
+            job['media_duration'] = float(seconds)
+            self.store.upsert(job)
+            return True
+
+    def _is_pending(self, job, statuses):
+        status = job.get('status', '')
+        return status in statuses or status.startswith(CHUNK_STATUS_PREFIX)
+
+    def _refresh_cached(self, jobs):
+        """Replaces cached copies of jobs with their stored versions."""
+        with self._lock:
+            for job in jobs:
+                cached = self._index.get(job['id'])
+                if cached is not None:
+                    cached.clear()
+                    cached.update(job)
 
     def cancel_pending(self):
         """Cancel ALL pending, failed, and stuck jobs in history"""
-        target_statuses = [
-            'queue', 'failed', 'downloading', 'processing',
-            'DOWNLOADED', 'SILENCE_REMOVED', 'BITRATE_MODIFIED', 'CHUNKED'
-        ]
-        for job in self.history:
-            status = job.get('status', '')
-            if status in target_statuses or status.startswith('TRANSCRIBING_CHUNK_'):
-                job['status'] = 'cancelled'
-        self.save_history()
+        def cancel(job):
+            job['status'] = 'cancelled'
+
+        # Decided on the stored rows: this process's cached copies may be stale, and jobs
+        # another worker is running are not ours to cancel
+        changed = self.store.transition(
+            PENDING_STATUSES + [COALESCED_STATUS], [CHUNK_STATUS_PREFIX], self.worker_id, cancel
+        )
+        self._refresh_cached(changed)
 
     def fail_pending(self):
         """Mark ALL pending, downloading, or processing jobs as failed"""
-        target_statuses = [
-            'queue', 'downloading', 'processing',
-            'DOWNLOADED', 'SILENCE_REMOVED', 'BITRATE_MODIFIED', 'CHUNKED'
-        ]
-        for job in self.history:
-            status = job.get('status', '')
-            if status in target_statuses or status.startswith('TRANSCRIBING_CHUNK_'):
-                # Preserve the current state in a separate field if it's granular
-                if status not in ['queue', 'downloading', 'processing']:
-                    job['last_granular_state'] = status
-                job['status'] = 'failed'
-        self.save_history()
+        def fail(job):
+            # Preserve the current state in a separate field if it's granular
+            if job.get('status') not in ['queue', 'downloading', 'processing']:
+                job['last_granular_state'] = job.get('status')
+            job['status'] = 'failed'
+
+        target_statuses = [s for s in PENDING_STATUSES if s != 'failed']
+        changed = self.store.transition(target_statuses, [CHUNK_STATUS_PREFIX], self.worker_id, fail)
+        self._refresh_cached(changed)
 
     def update_job_status(self, job_id, status):
         """Update the status of a specific job by ID."""
-        for job in self.history:
-            if job.get('id') == job_id:
-                old_status = job.get('status')
-                if status == 'failed' and old_status not in ['queue', 'downloading', 'processing', 'failed', 'completed', 'cancelled']:
-                    job['last_granular_state'] = old_status
+        with self._lock:
+            job = self._find(job_id)
+            if job is None:
+                return False
+            old_status = job.get('status')
+            if status == 'failed' and old_status not in ['queue', 'downloading', 'processing', 'failed', 'completed', 'cancelled']:
+                job['last_granular_state'] = old_status
+            job['status'] = status
+            self.store.record_status([job])
+            if status in TERMINAL_STATUSES:
+                self._resolve_followers(job_id, status)
+            return True
+
+    def get_followers(self, job_id):
+        """Returns the jobs coalesced into job_id that are still waiting for its result."""
+        with self._lock:
+            followers = []
+            for stored in self.store.find_by_status([COALESCED_STATUS]):
+                if stored.get('coalesced_into') == job_id:
+                    job = self._find(stored['id'])
+                    job.update(stored)
+                    followers.append(job)
+            return followers
+
+    def _resolve_followers(self, job_id, status, error=None):
+        with self._lock:
+            followers = self.get_followers(job_id)
+            for job in followers:
                 job['status'] = status
-                self.save_history()
-                return True
-        return False
+                if error:
+                    job['last_error'] = error
+            self.store.record_status(followers)
+
+    def record_failure(self, job_id, error, permanent=False):
+        """Records why a job failed. Permanent failures leave the pending queue."""
+        with self._lock:
+            job = self._find(job_id)
+            if job is None:
+                return False
+            job['failures'] = job.get('failures', 0) + 1
+            job['last_error'] = error
+            if permanent:
+                if job.get('status') != 'failed':
+                    job['last_granular_state'] = job.get('status')
+                job['status'] = PERMANENT_FAILURE_STATUS
+                self.store.record_status([job])
+                self._resolve_followers(job_id, PERMANENT_FAILURE_STATUS, error)
+            else:
+                self.store.upsert(job)
+            return True
+
+    def record_stage(self, stage, units, seconds, model=None):
+        """Records one finished stage run (see ProgressModel) to learn its throughput."""
+        self.progress_model.record(stage, units, seconds, model)
+
+    def update_progress(self, job_id, stage, done=None, total=None, unit=None, **details):
+        """
+        Stores the job's live progress (done/total units of the current stage) and its ETA.
+        details holds stage-specific extras such as the download speed.
+        """
+        with self._lock:
+            job = self._find(job_id)
+            if job is None:
+                return False
+            job['progress'] = {**self.progress_model.progress_record(job, stage, done, total, unit), **details}
+            self.store.upsert(job)
+            return True
+
+    def status_report(self):
+        """Returns the pending jobs in insertion order with their progress and a fresh ETA in seconds (None if unknown)."""
+        report = []
+        for job in self.get_pending_from_last_150():
+            report.append({
+                "id": job['id'],
+                "name": job.get('name'),
+                "status": job.get('status'),
+                "progress": job.get('progress'),
+                "eta_seconds": self.progress_model.estimate_remaining(job),
+            })
+        return report
+
+    def record_chunk_model(self, job_id, chunk_index, model_name):
+        """Record which model transcribed a chunk (it differs from the configured one after a fallback)."""
+        with self._lock:
+            job = self._find(job_id)
+            if not job:
+                return False
+            job.setdefault('chunk_models', {})[str(chunk_index)] = model_name
+            self.store.upsert(job)
+            return True
 
     def get_job(self, job_id):
         """Get a specific job by ID."""
-        for job in self.history:
-            if job.get('id') == job_id:
-                return job
-        return None
+        return self._find(job_id)
 
     def smart_split(self, text):
         """Splits by comma/pipe/newline but respects (groups)"""
@@ -104,7 +415,24 @@ class JobManager:
             return [x.strip() for x in content.split(",") if x.strip()]
         return [text]
 
-    def add_jobs(self, name_input, url_input):
+    def _coalesce(self, new_jobs):
+        """
+        Tags new jobs with their canonical URL and media key. A job whose media is already
+        pending (queued earlier or earlier in this batch) becomes a follower of that job:
+        it is not processed itself and receives a copy of its notes.
+        """
+        primaries = {}
+        for job in self.store.find_by_status(PENDING_STATUSES, [CHUNK_STATUS_PREFIX]):
+            primaries.setdefault(job.get('media_key') or canonicalize(job.get('url', ''))[1], job)
+        for job in new_jobs:
+            job['canonical_url'], job['media_key'] = canonicalize(job['url'])
+            primary = primaries.setdefault(job['media_key'], job)
+            if primary is not job:
+                job['status'] = COALESCED_STATUS
+                job['coalesced_into'] = primary['id']
+                logger.info(f"'{job['name']}' is the same media as '{primary['name']}'; sharing its notes")
+
+    def add_jobs(self, name_input, url_input, priority=0, deadline=None):
         name_slots = self.smart_split(name_input)
         url_slots = self.smart_split(url_input)
         
@@ -163,6 +491,14 @@ class JobManager:
                         "added_at": str(datetime.now())
                     })
         
-        self.history.extend(new_jobs)
-        self.save_history()
+        for job in new_jobs:
+            job['priority'] = priority
+            if deadline is not None:
+                job['deadline'] = deadline.isoformat() if isinstance(deadline, datetime) else str(deadline)
+        self._coalesce(new_jobs)
+
+        with self._lock:
+            self._history.extend(new_jobs)
+            self._index.update((job['id'], job) for job in new_jobs)
+            self.store.record_status(new_jobs)
         return new_jobs
\ No newline at end of file
@@ -0,0 +1,310 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    status TEXT,
+    data TEXT NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+CREATE TABLE IF NOT EXISTS job_events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    at REAL NOT NULL,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events (job_id);
+CREATE TABLE IF NOT EXISTS stage_samples (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    stage TEXT NOT NULL,
+    at REAL NOT NULL,
+    units REAL NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_stage_samples_stage ON stage_samples (stage);
+"""
+
+# Columns added after the first release, created on open for older databases
+MIGRATED_COLUMNS = {"lease_owner": "TEXT", "lease_expires": "REAL"}
+
+# durability setting -> PRAGMA synchronous. In WAL mode "batched" appends commits to the
+# log without fsync and syncs them together at the next checkpoint.
+SYNC_MODES = {"full": "FULL", "batched": "NORMAL", "off": "OFF"}
+
+class JobStore:
+    """
+    SQLite (WAL mode) persistence for jobs. One row per job, indexed by id and status,
+    so a status change is a single-row write. Rows keep their insertion order (seq).
+
+    A worker claims a job by taking its lease (an atomic conditional UPDATE) and keeps it
+    with heartbeats; the lease of a crashed worker expires and another worker can claim it.
+
+    Every status change is also appended to job_events. Writes go to the append-only WAL,
+    which SQLite replays after a crash. Compaction checkpoints the WAL into the database
+    and writes an atomic snapshot, which is restored if the database is ever found corrupt.
+    """
+
+    def __init__(self, db_file: str = "jobs.db", durability: str = "batched"):
+        self.db_file = db_file
+        self.snapshot_file = db_file + ".snapshot"
+        self.synchronous = SYNC_MODES.get(durability, "NORMAL")
+        self._local = threading.local()
+        self._compactor: Optional[threading.Thread] = None
+        self._stop_compactor = threading.Event()
+        self._open()
+
+    def _open(self):
+        try:
+            conn = self._connect()
+            if conn.execute("PRAGMA quick_check").fetchone()[0] != "ok":
+                raise sqlite3.DatabaseError("quick_check failed")
+            self._init_schema(conn)
+        except sqlite3.DatabaseError as e:
+            if not os.path.exists(self.snapshot_file):
+                raise
+            logger.error(f"{self.db_file} is corrupt ({e}). Restoring the last snapshot.")
+            self._close()
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(self.db_file + suffix):
+                    os.replace(self.db_file + suffix, f"{self.db_file}.corrupt{suffix}")
+            os.replace(self.snapshot_file, self.db_file)
+            self._init_schema(self._connect())
+
+    @staticmethod
+    def _init_schema(conn: sqlite3.Connection):
+        conn.executescript(SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for name, kind in MIGRATED_COLUMNS.items():
+            if name not in columns:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.conn = conn
+        return conn
+
+    def _close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _transaction(self, statements):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, params in statements:
+                conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _upsert_statement(job: Dict[str, Any]):
+        return (
+            "INSERT INTO jobs (id, status, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET status = excluded.status, data = excluded.data",
+            (job["id"], job.get("status"), json.dumps(job))
+        )
+
+    @staticmethod
+    def _event_statement(job: Dict[str, Any]):
+        return ("INSERT INTO job_events (job_id, at, status) VALUES (?, ?, ?)", (job["id"], time.time(), job.get("status")))
+
+    def count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        return [json.loads(r[0]) for r in self._connect().execute("SELECT data FROM jobs ORDER BY seq")]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @staticmethod
+    def _status_clause(statuses: Iterable[str], prefixes: Iterable[str]) -> Tuple[Optional[str], List[str]]:
+        statuses, prefixes = list(statuses), list(prefixes)
+        clauses = []
+        if statuses:
+            clauses.append(f"status IN ({','.join('?' * len(statuses))})")
+        # Range scans on the status index instead of LIKE
+        clauses += ["(status >= ? AND status < ?)"] * len(prefixes)
+        params = statuses + [bound for p in prefixes for bound in (p, p + "￿")]
+        return (f"({' OR '.join(clauses)})" if clauses else None), params
+
+    def find_by_status(self, statuses: Iterable[str], prefixes: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """Returns jobs whose status is one of statuses or starts with one of prefixes, in insertion order."""
+        where, params = self._status_clause(statuses, prefixes)
+        if where is None:
+            return []
+        rows = self._connect().execute(f"SELECT data FROM jobs WHERE {where} ORDER BY seq", params)
+        return [json.loads(r[0]) for r in rows]
+
+    def transition(self, statuses: Iterable[str], prefixes: Iterable[str], owner: str,
+                   change: Callable[[Dict[str, Any]], None]) -> List[Dict[str, Any]]:
+        """
+        Applies change(job) to every stored job in statuses (or starting with prefixes) that no
+        worker other than owner holds a live lease on. Rows are read and written back, with a
+        status event each, in one transaction, so changes other workers made are never lost.
+        Returns the changed jobs.
+        """
+        where, params = self._status_clause(statuses, prefixes)
+        if where is None:
+            return []
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                f"SELECT data FROM jobs WHERE {where} "
+                "AND (lease_owner IS NULL OR lease_owner = ? OR lease_expires < ?) ORDER BY seq",
+                params + [owner, time.time()]
+            ).fetchall()
+            changed = []
+            for (data,) in rows:
+                job = json.loads(data)
+                change(job)
+                conn.execute(*self._upsert_statement(job))
+                conn.execute(*self._event_statement(job))
+                changed.append(job)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return changed
+
+    def upsert(self, job: Dict[str, Any]):
+        self._connect().execute(*self._upsert_statement(job))
+
+    def upsert_many(self, jobs: Iterable[Dict[str, Any]]):
+        self._transaction([self._upsert_statement(job) for job in jobs])
+
+    def record_status(self, jobs: Iterable[Dict[str, Any]]):
+        """Writes the jobs and appends their new status to the event log in one transaction."""
+        statements = []
+        for job in jobs:
+            statements += [self._upsert_statement(job), self._event_statement(job)]
+        if statements:
+            self._transaction(statements)
+
+    # Leases
+
+    def claim(self, job_id: str, owner: str, ttl: float) -> bool:
+        """Takes the job's lease for ttl seconds if it is free, expired or already owner's."""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_owner = ?, lease_expires = ? "
+            "WHERE id = ? AND (lease_owner IS NULL OR lease_owner = ? OR lease_expires < ?)",
+            (owner, now + ttl, job_id, owner, now)
+        )
+        return cursor.rowcount == 1
+
+    def renew_leases(self, owner: str, ttl: float) -> int:
+        """Extends every lease owner holds. Returns the number renewed."""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_expires = ? WHERE lease_owner = ?", (time.time() + ttl, owner)
+        )
+        return cursor.rowcount
+
+    def release(self, job_id: str, owner: str):
+        self._connect().execute(
+            "UPDATE jobs SET lease_owner = NULL, lease_expires = NULL WHERE id = ? AND lease_owner = ?", (job_id, owner)
+        )
+
+    def leased_by_others(self, owner: str) -> List[str]:
+        """Returns the ids of jobs with a live lease held by someone other than owner."""
+        rows = self._connect().execute(
+            "SELECT id FROM jobs WHERE lease_owner IS NOT NULL AND lease_owner != ? AND lease_expires >= ?",
+            (owner, time.time())
+        )
+        return [r[0] for r in rows]
+
+    def jobs_with_last_event(self, statuses: Iterable[str]) -> List[Tuple[Dict[str, Any], Optional[float]]]:
+        """Returns (job, time of its last status event) for jobs in statuses."""
+        statuses = list(statuses)
+        rows = self._connect().execute(
+            f"""SELECT j.data, (SELECT MAX(at) FROM job_events e WHERE e.job_id = j.id)
+                FROM jobs j WHERE j.status IN ({','.join('?' * len(statuses))}) ORDER BY j.seq""",
+            statuses
+        )
+        return [(json.loads(data), last_at) for data, last_at in rows]
+
+    def events(self, job_id: str) -> List[Dict[str, Any]]:
+        rows = self._connect().execute("SELECT at, status FROM job_events WHERE job_id = ? ORDER BY seq", (job_id,))
+        return [{"at": at, "status": status} for at, status in rows]
+
+    # Stage throughput samples (see ProgressModel)
+
+    def add_stage_sample(self, stage: str, units: float, seconds: float):
+        self._connect().execute(
+            "INSERT INTO stage_samples (stage, at, units, seconds) VALUES (?, ?, ?, ?)", (stage, time.time(), units, seconds)
+        )
+
+    def stage_samples(self, stage: str, limit: int = 50, prefix: bool = False) -> List[Tuple[float, float]]:
+        """Returns the latest (units, seconds) samples of stage, or of every stage starting with it."""
+        where, params = ("stage >= ? AND stage < ?", (stage, stage + "￿")) if prefix else ("stage = ?", (stage,))
+        rows = self._connect().execute(
+            f"SELECT units, seconds FROM stage_samples WHERE {where} ORDER BY seq DESC LIMIT ?", (*params, limit)
+        )
+        return rows.fetchall()
+
+    def compact(self, keep_events_days: float = 30):
+        """
+        Folds the WAL into the database, drops old events and writes an atomic snapshot
+        (written to a temp file, fsynced, then renamed over the previous one).
+        """
+        conn = self._connect()
+        conn.execute("DELETE FROM job_events WHERE at < ?", (time.time() - keep_events_days * 86400,))
+        # Throughput only needs recent samples
+        conn.execute(
+            "DELETE FROM stage_samples WHERE seq NOT IN "
+            "(SELECT seq FROM stage_samples s WHERE s.stage = stage_samples.stage ORDER BY seq DESC LIMIT 500)"
+        )
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        tmp = self.snapshot_file + ".tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        conn.execute("VACUUM INTO ?", (tmp,))
+        with open(tmp, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_file)
+
+    def start_compaction(self, interval: float = 600, keep_events_days: float = 30):
+        """Starts a daemon thread that compacts every interval seconds. Does nothing if already running."""
+        if self._compactor and self._compactor.is_alive():
+            return
+        self._stop_compactor.clear()
+
+        def run():
+            while not self._stop_compactor.wait(interval):
+                try:
+                    self.compact(keep_events_days)
+                except sqlite3.Error as e:
+                    logger.error(f"Job store compaction failed: {e}")
+
+        self._compactor = threading.Thread(target=run, name="job-store-compactor", daemon=True)
+        self._compactor.start()
+
+    def stop_compaction(self):
+        self._stop_compactor.set()
+
+    def replace_all(self, jobs: Iterable[Dict[str, Any]]):
+        self._transaction([("DELETE FROM jobs", ())] + [self._upsert_statement(job) for job in jobs])
+
+    def delete(self, job_ids: Iterable[str]):
+        self._transaction([("DELETE FROM jobs WHERE id = ?", (job_id,)) for job_id in job_ids])
@@ -0,0 +1,49 @@
+import json
+import os
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class LatencyTracker:
+    """Keeps a rolling window of observed request latencies per model and metric."""
+
+    def __init__(self, stats_file: str = "latency_stats.json", window: int = 200):
+        self.stats_file = stats_file
+        self.window = window
+        self.samples = self._load_samples()
+
+    def _load_samples(self) -> Dict[str, Dict[str, List[float]]]:
+        if not os.path.exists(self.stats_file):
+            return {}
+        try:
+            with open(self.stats_file, 'r') as f:
+                data = json.load(f)
+                return data if isinstance(data, dict) else {}
+        except (json.JSONDecodeError, IOError):
+            return {}
+
+    def _save_samples(self):
+        try:
+            with open(self.stats_file, 'w') as f:
+                json.dump(self.samples, f)
+        except IOError as e:
+            logger.error(f"Error saving latency stats: {e}")
+
+    def record(self, model_name: str, metric: str, value: float):
+        """Records a latency sample (in seconds) for the given model and metric."""
+        series = self.samples.setdefault(model_name, {}).setdefault(metric, [])
+        series.append(round(value, 3))
+        del series[:-self.window]
+        self._save_samples()
+
+    def count(self, model_name: str, metric: str) -> int:
+        return len(self.samples.get(model_name, {}).get(metric, []))
+
+    def percentile(self, model_name: str, metric: str, pct: float) -> Optional[float]:
+        """Returns the pct-th percentile (nearest rank) of the samples, or None if there are none."""
+        series = sorted(self.samples.get(model_name, {}).get(metric, []))
+        if not series:
+            return None
+        rank = max(0, min(len(series) - 1, int(round(pct / 100 * len(series))) - 1))
+        return series[rank]
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Throughput load test: runs ProcessingPipeline against the local fake Code Assist
+server and reports requests/s, latency percentiles and retries.
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from src.config_manager import ConfigManager
+from src.fake_code_assist_server import FakeCodeAssistServer
+from src.job_manager import JobManager
+from src.pipeline import ProcessingPipeline
+
+
+def _prepare_workspace(server_url: str, jobs: int, chunks_per_job: int, chunk_kb: int, accounts: int, config_overrides: Dict[str, Any]):
+    """Creates auth, config and pre-chunked jobs in the current directory."""
+    for d in ("temp", "downloads", "notes"):
+        os.makedirs(d, exist_ok=True)
+
+    records = [{
+        "access": "",
+        "refresh": f"fake-refresh-{i}",
+        "expires": 0, # Force a refresh through the fake token endpoint
+        "projectId": f"fake-project-{i}",
+        "clientId": "fake-client",
+        "clientSecret": None,
+        "email": f"load{i}@example.com",
+        "status": "valid",
+    } for i in range(accounts)]
+    with open("gemini_cli_auth.json", 'w') as f:
+        json.dump(records, f, indent=4)
+
+    config = ConfigManager()
+    config.set("code_assist_endpoint", server_url)
+    config.set("oauth_token_url", f"{server_url}/token")
+    config.set("chunk_delay_seconds", 0)
+    config.set("api_retry_delay", 0.5)
+    config.set("response_cache_enabled", False)
+    config.set("notion_integration_enabled", False)
+    for key, value in config_overrides.items():
+        config.set(key, value)
+    config.save()
+
+    manager = JobManager()
+    names = "|".join(f"Load Job {i + 1}" for i in range(jobs))
+    urls = "|".join(f"https://example.com/lecture/{i + 1}" for i in range(jobs))
+    for job in manager.add_jobs(names, urls):
+        safe_name = job['name'].replace(" ", "_").replace("/", "-")
+        with open(os.path.join("downloads", f"{safe_name}.mp3"), 'wb') as f:
+            f.write(b"\0")
+        for c in range(chunks_per_job):
+            with open(os.path.join("temp", f"job_{job['id']}_chunk_{c + 1:03d}.mp3"), 'wb') as f:
+                f.write(os.urandom(chunk_kb * 1024))
+        manager.update_job_status(job['id'], 'CHUNKED')
+    return config, manager
+
+
+def run_load_test(jobs: int = 5, chunks_per_job: int = 4, chunk_kb: int = 256, accounts: int = 3, workers: int = 1,
+                  settings: Optional[Dict[str, Any]] = None, config_overrides: Optional[Dict[str, Any]] = None,
+                  keep_workspace: bool = False) -> Dict[str, Any]:
+    """Runs the pipeline for synthetic pre-chunked jobs against a fake server and returns a report."""
+    server = FakeCodeAssistServer(settings).start()
+    workspace = tempfile.mkdtemp(prefix="zaknotes_load_")
+    original_cwd = os.getcwd()
+    os.chdir(workspace)
+    try:
+        config, manager = _prepare_workspace(server.url, jobs, chunks_per_job, chunk_kb, accounts, config_overrides or {})
+        pending = manager.get_pending_from_last_150()
+
+        def run_job(job):
+            return ProcessingPipeline(config, job_manager=manager).execute_job(job)
+
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = list(pool.map(run_job, pending))
+        elapsed = time.time() - start
+
+        stats = server.get_stats()
+        return {
+            "jobs": len(pending),
+            "jobs_succeeded": sum(1 for r in results if r),
+            "elapsed_seconds": elapsed,
+            "requests": stats["requests"],
+            "requests_per_second": stats["requests"] / elapsed if elapsed else 0.0,
+            "successful_requests_per_second": stats["succeeded"] / elapsed if elapsed else 0.0,
+            "retries": stats["requests"] - stats["succeeded"],
+            "latency": stats["latency"],
+            "by_status": stats["by_status"],
+            "by_account": stats["by_account"],
+            "token_requests": stats["token_requests"],
+            "workspace": workspace if keep_workspace else None,
+        }
+    finally:
+        os.chdir(original_cwd)
+        server.stop()
+        if not keep_workspace:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+
+def print_report(report: Dict[str, Any]):
+    def fmt(value):
+        return f"{value:.3f}s" if value is not None else "n/a"
+
+    print("\n--- Load Test Report ---")
+    print(f"Jobs: {report['jobs_succeeded']}/{report['jobs']} succeeded in {report['elapsed_seconds']:.2f}s")
+    print(f"Requests: {report['requests']} ({report['requests_per_second']:.2f} req/s, {report['successful_requests_per_second']:.2f} successful req/s)")
+    print(f"Retries: {report['retries']}  Status codes: {report['by_status']}")
+    latency = report["latency"]
+    print(f"Latency: p50 {fmt(latency['p50'])}  p95 {fmt(latency['p95'])}  p99 {fmt(latency['p99'])}")
+    print(f"Requests per account: {report['by_account']}")
+    if report.get("workspace"):
+        print(f"Workspace kept at: {report['workspace']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the pipeline against a local fake Code Assist server.")
+    parser.add_argument("--jobs", type=int, default=5)
+    parser.add_argument("--chunks", type=int, default=4, help="Chunks per job")
+    parser.add_argument("--chunk-kb", type=int, default=256)
+    parser.add_argument("--accounts", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1, help="Jobs processed concurrently")
+    parser.add_argument("--settings", help="JSON file with fake server settings (latency, error_rates, account_quota, ...)")
+    parser.add_argument("--config", help="JSON file with config.json overrides for the run")
+    parser.add_argument("--keep-workspace", action="store_true")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s: %(message)s')
+
+    settings = None
+    if args.settings:
+        with open(args.settings, 'r') as f:
+            settings = json.load(f)
+    overrides = None
+    if args.config:
+        with open(args.config, 'r') as f:
+            overrides = json.load(f)
+
+    report = run_load_test(args.jobs, args.chunks, args.chunk_kb, args.accounts, args.workers,
+                           settings=settings, config_overrides=overrides, keep_workspace=args.keep_workspace)
+    if args.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Optional, Dict, Any
+from src.url_canonicalizer import media_key
+
+logger = logging.getLogger(__name__)
+
+class MediaCache:
+    """
+    On-disk store for downloaded audio, keyed by the canonical media id of the job URL
+    (see url_canonicalizer) rather than the job name, so re-queued or renamed jobs reuse
+    an earlier download. Entries are evicted in LRU order once the total size exceeds the
+    configured quota. Pinned entries (jobs being downloaded or processed in this process)
+    are never evicted. Each entry's size and sha256 are checked before it is reused.
+    """
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir: str = "downloads/media", max_size_mb: int = 4096, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.enabled = enabled
+        self.index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        self._lock = threading.RLock()
+        self._pins: Dict[str, int] = {}
+        # Entries whose checksum was verified by this process (key -> sha256)
+        self._verified: Dict[str, str] = {}
+
+    def entry_path(self, url: str) -> str:
+        digest = hashlib.sha256(media_key(url).encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f"{digest}.mp3")
+
+    def holds(self, path: str) -> bool:
+        """True if path is an entry file of this cache."""
+        return os.path.dirname(os.path.abspath(path)) == os.path.abspath(self.cache_dir)
+
+    def _load_index(self) -> Dict[str, Any]:
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+            if isinstance(data, dict) and isinstance(data.get("entries"), dict):
+                return data
+        except (ValueError, TypeError, IOError):
+            pass
+        return {"entries": {}}
+
+    def _save_index(self, index: Dict[str, Any]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(index, f, indent=4)
+            os.replace(tmp_path, self.index_path)
+        except IOError as e:
+            logger.error(f"Error saving media cache index: {e}")
+
+    def _drop_entry(self, index: Dict[str, Any], key: str):
+        entry = index["entries"].pop(key, None)
+        self._verified.pop(key, None)
+        if entry:
+            try:
+                os.remove(os.path.join(self.cache_dir, entry["file"]))
+            except OSError:
+                pass
+
+    @staticmethod
+    def _sha256(path: str) -> str:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def _intact(self, key: str, entry: Dict[str, Any]) -> bool:
+        path = os.path.join(self.cache_dir, entry["file"])
+        try:
+            if os.stat(path).st_size != entry.get("size"):
+                return False
+            if self._verified.get(key) != entry.get("sha256"):
+                if self._sha256(path) != entry.get("sha256"):
+                    return False
+                self._verified[key] = entry["sha256"]
+            return True
+        except OSError:
+            return False
+
+    def lookup(self, url: str) -> Optional[str]:
+        """Returns the cached audio path for url and marks it recently used, or None on a miss."""
+        if not self.enabled:
+            return None
+        key = media_key(url)
+        with self._lock:
+            index = self._load_index()
+            entry = index["entries"].get(key)
+            if not entry:
+                return None
+            if not self._intact(key, entry):
+                logger.warning(f"Cached audio for {key} failed integrity check. Discarding.")
+                self._drop_entry(index, key)
+                self._save_index(index)
+                return None
+            entry["last_access"] = time.time()
+            self._save_index(index)
+            return os.path.join(self.cache_dir, entry["file"])
+
+    def put(self, url: str, source_path: str) -> str:
+        """
+        Moves a finished download into the cache and evicts least recently used entries beyond
+        the quota. Returns the cached path, or source_path unchanged if it could not be cached.
+        """
+        if not self.enabled or not os.path.isfile(source_path):
+            return source_path
+        key = media_key(url)
+        target = self.entry_path(url)
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            try:
+                sha256 = self._sha256(source_path)
+                shutil.move(source_path, target)
+            except (IOError, OSError) as e:
+                logger.error(f"Error moving {source_path} into the media cache: {e}")
+                return source_path
+
+            now = time.time()
+            index = self._load_index()
+            index["entries"][key] = {
+                "file": os.path.basename(target),
+                "url": url,
+                "size": os.path.getsize(target),
+                "sha256": sha256,
+                "created": now,
+                "last_access": now,
+            }
+            self._verified[key] = sha256
+            # An entry larger than the quota stays until something newer displaces it
+            self._evict(index, keep=key)
+            self._save_index(index)
+            return target
+
+    def _evict(self, index: Dict[str, Any], keep: Optional[str] = None):
+        entries = index["entries"]
+        total = sum(e.get("size", 0) for e in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k].get("last_access", 0)):
+            if total <= self.max_size_bytes:
+                break
+            if key == keep or self._pins.get(key):
+                continue
+            total -= entries[key].get("size", 0)
+            logger.info(f"Evicting cached audio for {key} ({entries[key].get('size', 0)} bytes)")
+            self._drop_entry(index, key)
+
+    def pin(self, url: str):
+        """Protects url's entry from eviction until a matching unpin."""
+        key = media_key(url)
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, url: str):
+        key = media_key(url)
+        with self._lock:
+            if self._pins.get(key, 0) > 1:
+                self._pins[key] -= 1
+            else:
+                self._pins.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns the number of entries, their total size, the quota and how many are pinned."""
+        with self._lock:
+            entries = self._load_index()["entries"]
+            return {
+                "entries": len(entries),
+                "size_bytes": sum(e.get("size", 0) for e in entries.values()),
+                "max_size_bytes": self.max_size_bytes,
+                "pinned": sum(1 for key in entries if self._pins.get(key)),
+            }
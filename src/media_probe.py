@@ -0,0 +1,75 @@
+import sys
+import json
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from src.downloader import get_cookie_path
+
+logger = logging.getLogger(__name__)
+
+def summarize_info(info: Dict[str, Any]) -> Dict[str, Any]:
+    """Keeps the parts of a yt-dlp info dict used for scheduling, disk budgeting and ETAs."""
+    formats = info.get("formats") or []
+    audio_formats = [
+        {
+            "format_id": f.get("format_id"),
+            "ext": f.get("ext"),
+            "acodec": f.get("acodec"),
+            "abr": f.get("abr"),
+            "filesize": f.get("filesize") or f.get("filesize_approx"),
+        }
+        for f in formats
+        if f.get("acodec") not in (None, "none")
+    ]
+    sizes = [f["filesize"] for f in audio_formats if f["filesize"]]
+    duration = info.get("duration")
+    return {
+        "title": info.get("title"),
+        "duration": float(duration) if duration else None,
+        "audio_formats": audio_formats,
+        # Smallest audio-bearing format: what the downloader's format ladder usually lands near
+        "filesize_estimate": min(sizes) if sizes else (info.get("filesize") or info.get("filesize_approx")),
+        "chapters": [
+            {"title": c.get("title"), "start_time": c.get("start_time"), "end_time": c.get("end_time")}
+            for c in info.get("chapters") or []
+        ],
+    }
+
+def probe_url(url: str, user_agent: Optional[str] = None, timeout: float = 60) -> Optional[Dict[str, Any]]:
+    """Extracts metadata for url with yt-dlp without downloading. Returns None if it can't."""
+    if "edgecoursebd" in url:
+        # The media URL is only known after running the scraper at download time
+        return None
+    cmd = [sys.executable, "-m", "yt_dlp", "--dump-single-json", "--skip-download", "--no-playlist", "--no-warnings"]
+    cookie_file = get_cookie_path()
+    if cookie_file:
+        cmd.extend(["--cookies", cookie_file])
+    if user_agent:
+        cmd.extend(["--add-header", f"User-Agent: {user_agent}"])
+    if "mediadelivery.net" in url:
+        cmd.extend(["--add-header", "Referer: https://academic.aparsclassroom.com/"])
+    cmd.append(url)
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except (subprocess.TimeoutExpired, OSError) as e:
+        logger.warning(f"Metadata probe failed for {url}: {e}")
+        return None
+    if result.returncode != 0:
+        logger.warning(f"Metadata probe failed for {url}: {result.stderr.strip()[-300:]}")
+        return None
+    try:
+        return summarize_info(json.loads(result.stdout))
+    except (json.JSONDecodeError, TypeError) as e:
+        logger.warning(f"Metadata probe returned unreadable output for {url}: {e}")
+        return None
+
+def probe_jobs(jobs: Iterable[Dict[str, Any]], max_workers: int = 4,
+               probe: Callable[[str], Optional[Dict[str, Any]]] = probe_url) -> Dict[str, Dict[str, Any]]:
+    """Probes the jobs' URLs, at most max_workers at a time. Returns metadata by job id for the probes that worked."""
+    jobs: List[Dict[str, Any]] = list(jobs)
+    if not jobs:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="media-probe") as pool:
+        results = pool.map(lambda job: probe(job['url']), jobs)
+        return {job['id']: meta for job, meta in zip(jobs, results) if meta}
@@ -0,0 +1,72 @@
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class ModelRouter:
+    """
+    Routes a task to the first model of its fallback chain that is not cooling down.
+    A model cools down for `cooldown_seconds` after `rate_limit_count` 429s within
+    `window_seconds`, so batches keep moving on the next model instead of waiting
+    for the quota to reset.
+    """
+    DEFAULT_POLICY = {"rate_limit_count": 3, "window_seconds": 120, "cooldown_seconds": 300}
+
+    def __init__(self, fallbacks: Optional[Dict[str, List[str]]] = None, policy: Optional[Dict[str, Any]] = None):
+        self.fallbacks = fallbacks or {}
+        self.policy = {**self.DEFAULT_POLICY, **(policy or {})}
+        self.lock = threading.Lock()
+        self.rate_limits: Dict[str, List[float]] = {}
+        self.cooldown_until: Dict[str, float] = {}
+
+    def chain(self, task: str, primary: str) -> List[str]:
+        """Returns the configured model followed by the task's fallbacks, without duplicates."""
+        models = [primary]
+        for model in self.fallbacks.get(task, []):
+            if model not in models:
+                models.append(model)
+        return models
+
+    def is_cooling_down(self, model_name: str) -> bool:
+        return time.time() < self.cooldown_until.get(model_name, 0)
+
+    def select(self, task: str, primary: str) -> str:
+        """
+        Returns the first model of the chain that is not cooling down. If every model is,
+        returns the one whose cooldown ends first.
+        """
+        chain = self.chain(task, primary)
+        with self.lock:
+            for model in chain:
+                if not self.is_cooling_down(model):
+                    return model
+            return min(chain, key=lambda m: self.cooldown_until.get(m, 0))
+
+    def has_fallback(self, task: str, primary: str, model_name: str) -> bool:
+        """True if a model after model_name in the chain is currently usable."""
+        chain = self.chain(task, primary)
+        if model_name not in chain:
+            return False
+        with self.lock:
+            return any(not self.is_cooling_down(m) for m in chain[chain.index(model_name) + 1:])
+
+    def record_rate_limit(self, model_name: str) -> bool:
+        """Records a 429 for model_name. Returns True if this put the model into cooldown."""
+        now = time.time()
+        with self.lock:
+            window = [t for t in self.rate_limits.get(model_name, []) if now - t < self.policy["window_seconds"]]
+            window.append(now)
+            self.rate_limits[model_name] = window
+            if len(window) < self.policy["rate_limit_count"] or self.is_cooling_down(model_name):
+                return False
+            self.cooldown_until[model_name] = now + self.policy["cooldown_seconds"]
+            self.rate_limits[model_name] = []
+        logger.warning(f"{model_name} hit {len(window)} rate limits in {self.policy['window_seconds']}s. Routing to fallback models for {self.policy['cooldown_seconds']}s.")
+        return True
+
+    def get_status(self) -> Dict[str, float]:
+        """Returns the remaining cooldown seconds of every model that is cooling down."""
+        now = time.time()
+        return {m: until - now for m, until in self.cooldown_until.items() if until > now}
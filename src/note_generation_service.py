@@ -4,10 +4,11 @@ from src.prompts import NOTE_GENERATION_PROMPT
 
 class NoteGenerationService:
     @staticmethod
-    def generate(transcript_path: str, output_path: str, prompt_text: str = None) -> bool:
+    def generate(transcript_path: str, output_path: str, prompt_text: str = None, use_cache: bool = True, api: GeminiAPIWrapper = None) -> bool:
         """
         Generates notes from a transcript file.
         Saves the notes to output_path.
+        Identical transcript/prompt pairs are served from the response cache unless use_cache is False.
         """
         if not os.path.exists(transcript_path):
             print(f"      ❌ Transcript file not found: {transcript_path}")
@@ -20,11 +21,12 @@ class NoteGenerationService:
             with open(transcript_path, 'r', encoding='utf-8') as f:
                 transcript_content = f.read()
             
-            api = GeminiAPIWrapper()
+            api = api or GeminiAPIWrapper()
             notes = api.generate_content(
                 prompt=f"TRANSCRIPT:\n{transcript_content}",
                 model_type="note",
-                system_instruction=prompt_text
+                system_instruction=prompt_text,
+                use_cache=use_cache
             )
             
             if notes:
@@ -1,7 +1,7 @@
 import os
 import time
 import shutil
-from src.downloader import download_audio, get_expected_audio_path
+from src.downloader import download_audio, get_expected_audio_path, get_media_cache
 from src.audio_processor import AudioProcessor
 from src.note_generation_service import NoteGenerationService
 from src.cleanup_service import FileCleanupService
@@ -10,6 +10,7 @@ from src.prompts import TRANSCRIPTION_PROMPT
 from src.job_manager import JobManager
 from src.notion_service import NotionService
 from src.notion_config_manager import NotionConfigManager
+from src.ytdlp_engine import YtDlpEngine, progress_details
 
 class ProcessingPipeline:
     def __init__(self, config_manager, api_wrapper=None, job_manager=None):
@@ -17,11 +18,65 @@ class ProcessingPipeline:
         self.manager = job_manager or JobManager()
         self.api = api_wrapper or GeminiAPIWrapper()
         self.notion_config = NotionConfigManager()
+        self.media_cache = get_media_cache(self.config)
+        # In-process yt-dlp reuses extractors and cookies across jobs; "subprocess" runs python -m yt_dlp per job
+        self.download_engine = None
+        if self.config.get("download_engine", "inprocess") == "inprocess":
+            self.download_engine = YtDlpEngine(on_progress=self._report_download_progress)
+        # Why the last execute_job failed; kind is 'permanent' when retrying cannot help,
+        # None to let the runner classify the message
+        self.last_error = None
+        self.last_error_kind = None
+
+    def _report_download_progress(self, job, status):
+        details = progress_details(status)
+        self.manager.update_progress(
+            job['id'], 'downloading', details.pop('done'), details.pop('total'), 'MB', **details
+        )
+
+    def _fail(self, job, error, kind=None) -> bool:
+        self.last_error = error
+        self.last_error_kind = kind
+        self.manager.update_job_status(job['id'], 'failed')
+        return False
+
+    def _push_to_notion(self, notes_path) -> bool:
+        notion_secret, database_id = self.notion_config.get_credentials()
+        if not notion_secret or not database_id:
+            print("⚠️ Notion credentials not configured. Skipping Notion push.")
+            return False
+        try:
+            notion_service = NotionService(notion_secret, database_id)
+            
+            # Title: replace underscores with spaces, remove extension
+            title = os.path.splitext(os.path.basename(notes_path))[0].replace("_", " ")
+            
+            with open(notes_path, 'r', encoding='utf-8') as f:
+                markdown_content = f.read()
+            
+            url = notion_service.create_page(title, markdown_content)
+            if url:
+                print(f"✅ Successfully pushed to Notion: {url}")
+                return True
+            print("❌ Notion push failed: No URL returned.")
+        except Exception as e:
+            print(f"❌ Notion push failed with exception: {e}")
+        return False
 
     def execute_job(self, job) -> bool:
         """
         Executes the full pipeline for a single job with resumption support.
+        The job's cached audio is pinned against eviction while it runs.
         """
+        self.media_cache.pin(job['url'])
+        try:
+            return self._run_stages(job)
+        finally:
+            self.media_cache.unpin(job['url'])
+
+    def _run_stages(self, job) -> bool:
+        self.last_error = None
+        self.last_error_kind = None
         
         audio_path = None
         chunks = []
@@ -50,21 +105,35 @@ class ProcessingPipeline:
             if not skip_download:
                 print(f"📥 [1/4] Downloading audio for: {job['name']}...")
                 self.manager.update_job_status(job['id'], 'downloading')
-                audio_path = download_audio(job)
+                self.manager.update_progress(job['id'], 'downloading')
+                started = time.time()
+                audio_path = download_audio(job, engine=self.download_engine)
                 if not audio_path or not os.path.exists(audio_path):
                     print(f"❌ Download failed or file missing for job: {job['name']}")
-                    self.manager.update_job_status(job['id'], 'failed')
-                    return False
+                    return self._fail(job, "Download failed or file missing")
+                self.manager.record_stage('download', os.path.getsize(audio_path) / (1024 * 1024), time.time() - started)
                 self.manager.update_job_status(job['id'], 'DOWNLOADED')
                 job['status'] = 'DOWNLOADED'
 
+            # Known durations let the sjf policy order resumed jobs
+            if not job.get('media_duration'):
+                duration = AudioProcessor.get_duration(audio_path)
+                if duration:
+                    self.manager.record_media_duration(job['id'], duration)
+                    job['media_duration'] = duration
+
             # 2. Audio Processing (Granular steps)
-            base_name = os.path.splitext(os.path.basename(audio_path))[0]
+            # Named after the job, not the audio file: cached audio is named by media id and may be shared
+            base_name = job['name'].replace(" ", "_").replace("/", "-")
             extension = os.path.splitext(audio_path)[1] or ".mp3"
             prepared_path = os.path.join(temp_dir, f"{base_name}_prepared{extension}")
             
+            # Preparation throughput is only learned from runs that do every step
+            prepare_started = time.time() if job.get('status') == 'DOWNLOADED' else None
+
             # 2.1 Silence Removal & Bitrate (Combined for simplicity in state)
             if job.get('status') == 'DOWNLOADED':
+                self.manager.update_progress(job['id'], 'preparing')
                 print(f"✂️ [2/4] Processing audio (silence removal & bitrate): {audio_path}")
                 if not os.path.exists(prepared_path):
                     silence_removed_path = prepared_path + ".nosilence" + extension
@@ -98,14 +167,22 @@ class ProcessingPipeline:
                     print(f"✂️ Splitting audio into chunks based on size...")
                     max_size_mb = self.config.get("max_chunk_size_mb", 15)
                     output_pattern = os.path.join(temp_dir, f"job_{job['id']}_chunk_%03d{extension}")
+
+                    max_segment_time = self.api.chunk_planner.plan_chunk_seconds(self.config.get("transcription_model"))
+                    if max_segment_time:
+                        print(f"      - Token planner: up to {max_segment_time}s of audio per chunk.")
                     
-                    chunks = AudioProcessor.process_for_transcription(prepared_path, max_size_mb=max_size_mb, output_dir=temp_dir, output_pattern=output_pattern)
+                    chunks = AudioProcessor.process_for_transcription(prepared_path, max_size_mb=max_size_mb, output_dir=temp_dir, output_pattern=output_pattern, max_segment_time=max_segment_time)
                     
                     if not chunks:
                         print(f"❌ Error: Size-based chunking failed to produce chunks for job {job['id']}")
-                        self.manager.update_job_status(job['id'], 'failed')
-                        return False
+                        return self._fail(job, "Chunking produced no chunks", kind='permanent')
 
+                    duration = job.get('media_duration')
+                    if duration:
+                        self.manager.record_stage('chunk_audio', len(chunks), duration)
+                        if prepare_started:
+                            self.manager.record_stage('prepare', duration / 3600, time.time() - prepare_started)
                     self.manager.update_job_status(job['id'], 'CHUNKED')
                     job['status'] = 'CHUNKED'
                 else:
@@ -121,8 +198,7 @@ class ProcessingPipeline:
                 chunks = sorted([os.path.join(temp_dir, f) for f in os.listdir(temp_dir) if f.startswith(f"job_{job['id']}_chunk_")])
                 if not chunks:
                     print(f"❌ Error: Status is {job['status']} but no chunks found for job {job['id']}")
-                    self.manager.update_job_status(job['id'], 'failed')
-                    return False
+                    return self._fail(job, f"Status is {job['status']} but no chunks found", kind='permanent')
 
             # 3. Transcription
             print(f"📝 [3/4] Transcribing {len(chunks)} chunks using Gemini...")
@@ -150,12 +226,15 @@ class ProcessingPipeline:
                     print(f"      - Chunk {chunk_index}/{len(chunks)} already transcribed in {transcript_path}. Skipping.")
                     continue
 
-                if any_success: # If we processed at least one chunk (resumed or new)
-                    print(f"      - Waiting 10s before next chunk...")
-                    time.sleep(10)
+                chunk_delay = self.config.get("chunk_delay_seconds", 10)
+                if any_success and chunk_delay: # If we processed at least one chunk (resumed or new)
+                    print(f"      - Waiting {chunk_delay}s before next chunk...")
+                    time.sleep(chunk_delay)
                 
                 print(f"      - Processing chunk {chunk_index}/{len(chunks)}...")
                 self.manager.update_job_status(job['id'], f'TRANSCRIBING_CHUNK_{chunk_index}')
+                self.manager.update_progress(job['id'], 'transcribing', chunk_index - 1, len(chunks), 'chunks')
+                started = time.time()
                 try:
                     text = self.api.generate_content_with_file(
                         file_path=chunk,
@@ -164,23 +243,25 @@ class ProcessingPipeline:
                         system_instruction=TRANSCRIPTION_PROMPT
                     )
                     if text:
+                        model_used = self.api.last_model_used
+                        if model_used and model_used != self.config.get("transcription_model"):
+                            print(f"      - Chunk {chunk_index} transcribed with fallback model {model_used}.")
+                        self.manager.record_chunk_model(job['id'], chunk_index, model_used)
+                        self.manager.record_stage('transcribe', 1, time.time() - started, model_used)
                         with open(transcript_path, 'a', encoding='utf-8') as f:
                             f.write(text)
                             f.write("\n\n")
                         any_success = True
                     else:
                         print(f"      ⚠️ Warning: No text extracted from chunk {chunk_index}")
-                        self.manager.update_job_status(job['id'], 'failed')
-                        return False
+                        return self._fail(job, f"No text extracted from chunk {chunk_index}")
                 except Exception as e:
                     print(f"      ❌ Failed to get transcription for chunk {chunk_index}: {str(e)}")
-                    self.manager.update_job_status(job['id'], 'failed')
-                    return False
+                    return self._fail(job, f"Chunk {chunk_index} transcription failed: {e}")
 
             if not any_success:
                 print(f"❌ Transcription failed for job: {job['name']}")
-                self.manager.update_job_status(job['id'], 'failed')
-                return False
+                return self._fail(job, "Transcription failed")
             print(f"   - Transcription complete: {transcript_path}")
 
             # 4. Note Generation
@@ -192,38 +273,40 @@ class ProcessingPipeline:
             
             final_notes_path = os.path.join(notes_dir, f"{safe_name}.md")
             
-            if not NoteGenerationService.generate(transcript_path, final_notes_path):
+            self.manager.update_progress(job['id'], 'generating_notes', 0, 1, 'notes')
+            started = time.time()
+            if not NoteGenerationService.generate(transcript_path, final_notes_path, api=self.api):
                 print(f"❌ Note generation failed for job: {job['name']}")
-                self.manager.update_job_status(job['id'], 'failed')
-                return False
+                return self._fail(job, "Note generation failed")
+            self.manager.record_stage('notes', 1, time.time() - started, self.api.last_model_used)
             print(f"   - Notes generated: {final_notes_path}")
 
             # 5. Notion Integration (Post-generation)
             pushed_to_notion = False
-            if self.config.get("notion_integration_enabled", False):
+            notion_enabled = self.config.get("notion_integration_enabled", False)
+            if notion_enabled:
                 print(f"🚀 [5/5] Pushing to Notion...")
-                notion_secret, database_id = self.notion_config.get_credentials()
-                
-                if not notion_secret or not database_id:
-                    print("⚠️ Notion credentials not configured. Skipping Notion push.")
+                pushed_to_notion = self._push_to_notion(final_notes_path)
+
+            # 5.1 Fan the notes out to duplicate jobs coalesced into this one
+            follower_notes = []
+            # Notes file -> whether it reached Notion. A duplicate queued under the same name
+            # shares its file (and page) instead of copying the notes onto themselves.
+            shared_notes = {final_notes_path: pushed_to_notion}
+            for follower in self.manager.get_followers(job['id']):
+                follower_name = follower['name'].replace(" ", "_").replace("/", "-")
+                follower_path = os.path.join(notes_dir, f"{follower_name}.md")
+                if follower_path in shared_notes:
+                    follower_pushed = shared_notes[follower_path]
                 else:
-                    try:
-                        notion_service = NotionService(notion_secret, database_id)
-                        
-                        # Title: replace underscores with spaces, remove extension
-                        title = os.path.splitext(os.path.basename(final_notes_path))[0].replace("_", " ")
-                        
-                        with open(final_notes_path, 'r', encoding='utf-8') as f:
-                            markdown_content = f.read()
-                        
-                        url = notion_service.create_page(title, markdown_content)
-                        if url:
-                            print(f"✅ Successfully pushed to Notion: {url}")
-                            pushed_to_notion = True
-                        else:
-                            print("❌ Notion push failed: No URL returned.")
-                    except Exception as e:
-                        print(f"❌ Notion push failed with exception: {e}")
+                    shutil.copy2(final_notes_path, follower_path)
+                    follower_pushed = notion_enabled and self._push_to_notion(follower_path)
+                    shared_notes[follower_path] = follower_pushed
+                    if follower_pushed:
+                        follower_notes.append(follower_path)
+                status = 'completed_local_only' if notion_enabled and not follower_pushed else 'completed'
+                self.manager.update_job_status(follower['id'], status)
+                print(f"   - Notes shared with duplicate job '{follower['name']}': {follower_path}")
 
             # 6. Cleanup
             print(f"🧹 Cleaning up intermediate files...")
@@ -238,7 +321,7 @@ class ProcessingPipeline:
                 self.manager.update_job_status(job['id'], 'completed')
                 print(f"✅ Job '{job['name']}' completed and pushed to Notion!")
             else:
-                if self.config.get("notion_integration_enabled", False):
+                if notion_enabled:
                     # If enabled but failed, keep local file and mark specially
                     self.manager.update_job_status(job['id'], 'completed_local_only')
                     print(f"✅ Job '{job['name']}' completed locally (Notion push failed). Notes: {final_notes_path}")
@@ -246,10 +329,9 @@ class ProcessingPipeline:
                     self.manager.update_job_status(job['id'], 'completed')
                     print(f"✅ Job '{job['name']}' completed successfully! Notes: {final_notes_path}")
 
-            FileCleanupService.cleanup_job_files(files_to_cleanup)
+            FileCleanupService.cleanup_job_files(files_to_cleanup + follower_notes)
             return True
 
         except Exception as e:
             print(f"❌ Exception in pipeline for job {job['id']}: {e}")
-            self.manager.update_job_status(job['id'], 'failed')
-            return False
+            return self._fail(job, str(e))
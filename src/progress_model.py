@@ -0,0 +1,92 @@
+import math
+import time
+from typing import Any, Dict, Optional
+
+# Status order up to transcription; TRANSCRIBING_CHUNK_n statuses come after CHUNKED
+STAGE_ORDER = ['queue', 'downloading', 'DOWNLOADED', 'SILENCE_REMOVED', 'BITRATE_MODIFIED', 'CHUNKED']
+CHUNK_STATUS_PREFIX = 'TRANSCRIBING_CHUNK_'
+
+class ProgressModel:
+    """
+    Learns per-stage throughput from finished stages and estimates how long a job has left.
+    Each sample is (units, seconds) for one stage run, stored in the JobStore:
+      download           MB downloaded
+      prepare            audio hours through silence removal, re-encoding and chunking
+      chunk_audio        chunks produced (seconds = audio seconds, i.e. audio per chunk)
+      transcribe:<model> chunks transcribed
+      notes:<model>      jobs whose notes were generated
+    A rate is seconds per unit over the last `window` samples; model-specific rates fall
+    back to all models until min_samples exist for the model.
+    """
+
+    def __init__(self, store, window: int = 50, min_samples: int = 3):
+        self.store = store
+        self.window = window
+        self.min_samples = min_samples
+
+    def record(self, stage: str, units: float, seconds: float, model: Optional[str] = None):
+        if not units or units <= 0 or seconds < 0:
+            return
+        self.store.add_stage_sample(f"{stage}:{model}" if model else stage, units, seconds)
+
+    def rate(self, stage: str, model: Optional[str] = None) -> Optional[float]:
+        """Seconds per unit of stage, or None before anything was learned."""
+        samples = self.store.stage_samples(f"{stage}:{model}", self.window) if model else []
+        if len(samples) < self.min_samples:
+            # Plain stages are stored under their name, per-model ones under "stage:model"
+            samples = self.store.stage_samples(stage, self.window) or self.store.stage_samples(f"{stage}:", self.window, prefix=True)
+        units = sum(u for u, _ in samples)
+        return sum(s for _, s in samples) / units if units else None
+
+    @staticmethod
+    def _position(job: Dict[str, Any]) -> Optional[int]:
+        status = job.get('status', '')
+        if status == 'failed':
+            status = job.get('last_granular_state') or 'queue'
+        if status.startswith(CHUNK_STATUS_PREFIX):
+            return len(STAGE_ORDER)
+        return STAGE_ORDER.index(status) if status in STAGE_ORDER else None
+
+    def estimate_remaining(self, job: Dict[str, Any]) -> Optional[float]:
+        """Seconds the job still needs, or None when a stage it has left has no learned rate or input size."""
+        position = self._position(job)
+        if position is None:
+            return None
+        duration = job.get('media_duration')
+        remaining = 0.0
+
+        if position < STAGE_ORDER.index('DOWNLOADED'):
+            size = (job.get('probe') or {}).get('filesize_estimate')
+            rate = self.rate('download')
+            if not size or rate is None:
+                return None
+            remaining += size / (1024 * 1024) * rate
+
+        if position < STAGE_ORDER.index('CHUNKED'):
+            rate = self.rate('prepare')
+            if not duration or rate is None:
+                return None
+            remaining += duration / 3600 * rate
+
+        progress = job.get('progress') or {}
+        notes_rate = self.rate('notes')
+        if progress.get('stage') == 'generating_notes':
+            return notes_rate
+        if progress.get('stage') == 'transcribing' and progress.get('total'):
+            chunks_left = progress['total'] - (progress.get('done') or 0)
+        else:
+            audio_per_chunk = self.rate('chunk_audio')
+            if not duration or not audio_per_chunk:
+                return None
+            chunks_left = math.ceil(duration / audio_per_chunk)
+        models = list((job.get('chunk_models') or {}).values())
+        rate = self.rate('transcribe', models[-1] if models else None)
+        if rate is None or notes_rate is None:
+            return None
+        return remaining + chunks_left * rate + notes_rate
+
+    def progress_record(self, job: Dict[str, Any], stage: str, done: Optional[int] = None,
+                        total: Optional[int] = None, unit: Optional[str] = None) -> Dict[str, Any]:
+        record = {"stage": stage, "done": done, "total": total, "unit": unit, "updated_at": time.time()}
+        record["eta_seconds"] = self.estimate_remaining({**job, "progress": record})
+        return record
@@ -118,3 +118,8 @@ TRANSCRIPTION RULES:
 3. Accuracy: Ensure technical terms and formulas are captured precisely as spoken.
 4. Strict Output: Output ONLY the transcript text. No greetings, no explanations, and no meta-commentary.
 """
+
+CONTINUATION_PROMPT = r"""Your previous response was cut off by the output length limit.
+Continue exactly where it stopped, starting with the next character.
+Do NOT repeat any text you already wrote and do NOT add any introduction or commentary.
+"""
@@ -0,0 +1,56 @@
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+class RepetitionDetector:
+    """
+    Incremental loop detector for streamed text. Keeps the hashes of the last `window`
+    word n-grams and reports a loop once at least `max_repeat_ratio` of them repeat an
+    n-gram already in the window, which normal prose almost never does.
+    """
+
+    def __init__(self, ngram_size: int = 8, window: int = 200, max_repeat_ratio: float = 0.8):
+        self.ngram_size = ngram_size
+        self.window = window
+        self.max_repeat_ratio = max_repeat_ratio
+        self._words: Deque[str] = deque(maxlen=ngram_size)
+        self._hashes: Deque[int] = deque()
+        self._counts: Dict[int, int] = {}
+        self._tail = ""
+        self.looping = False
+
+    def _add_word(self, word: str):
+        self._words.append(word.lower())
+        if len(self._words) < self.ngram_size:
+            return
+        h = hash(tuple(self._words))
+        self._hashes.append(h)
+        self._counts[h] = self._counts.get(h, 0) + 1
+        if len(self._hashes) > self.window:
+            old = self._hashes.popleft()
+            self._counts[old] -= 1
+            if not self._counts[old]:
+                del self._counts[old]
+
+    def repeat_ratio(self) -> float:
+        """Share of n-grams in the window that duplicate another one in the window."""
+        if not self._hashes:
+            return 0.0
+        return 1 - len(self._counts) / len(self._hashes)
+
+    def feed(self, text: str) -> bool:
+        """Consumes the next piece of streamed text. Returns True once a loop has been detected."""
+        if self.looping or not text:
+            return self.looping
+        words = (self._tail + text).split()
+        # The last word may continue in the next piece
+        self._tail = words.pop() if words and not text[-1].isspace() else ""
+        for word in words:
+            self._add_word(word)
+            if len(self._hashes) >= self.window and self.repeat_ratio() >= self.max_repeat_ratio:
+                self.looping = True
+                break
+        return self.looping
+
+    def stats(self) -> Tuple[int, float]:
+        """Returns (n-grams in window, repeat ratio)."""
+        return len(self._hashes), self.repeat_ratio()
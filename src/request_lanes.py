@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+class LaneScheduler:
+    """
+    Named request lanes (e.g. transcription, note) with their own concurrency limit,
+    account pool and priority. When the global limit is the bottleneck, a freed slot goes
+    to the highest-priority lane that has waiters and room under its own limit. Per-lane
+    limits keep one lane from taking every slot, so neither lane can starve the other.
+    A concurrency of 0 means unlimited. An empty account list means every account.
+    Shared per process so wrappers running on different threads and event loops coordinate.
+    """
+    DEFAULT_LANES = {
+        "transcription": {"concurrency": 0, "priority": 10, "accounts": []},
+        "note": {"concurrency": 0, "priority": 5, "accounts": []},
+    }
+    _shared: Optional["LaneScheduler"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, lanes: Optional[Dict[str, Dict[str, Any]]] = None, max_concurrent: int = 0):
+        self.lanes = {name: dict(spec) for name, spec in self.DEFAULT_LANES.items()}
+        for name, spec in (lanes or {}).items():
+            self.lanes.setdefault(name, {"concurrency": 0, "priority": 0, "accounts": []}).update(spec)
+        self.max_concurrent = max_concurrent or 0
+        self.cond = threading.Condition()
+        self.active: Dict[str, int] = {}
+        self.waiting: Dict[str, int] = {}
+
+    @classmethod
+    def shared(cls, lanes: Optional[Dict[str, Dict[str, Any]]] = None, max_concurrent: int = 0) -> "LaneScheduler":
+        """Returns the process-wide scheduler, creating it from the given settings on first use."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(lanes, max_concurrent)
+            return cls._shared
+
+    def lane(self, name: str) -> Dict[str, Any]:
+        return self.lanes.get(name, {"concurrency": 0, "priority": 0, "accounts": []})
+
+    def _has_room(self, name: str) -> bool:
+        limit = self.lane(name).get("concurrency", 0)
+        return not limit or self.active.get(name, 0) < limit
+
+    def _can_start(self, name: str) -> bool:
+        if not self._has_room(name):
+            return False
+        if not self.max_concurrent:
+            return True
+        if sum(self.active.values()) >= self.max_concurrent:
+            return False
+        # Yield to a higher-priority lane that is waiting and could use the slot
+        priority = self.lane(name).get("priority", 0)
+        return not any(
+            count and other != name and self.lane(other).get("priority", 0) > priority and self._has_room(other)
+            for other, count in self.waiting.items()
+        )
+
+    def acquire(self, name: str, abandoned: Optional[threading.Event] = None) -> bool:
+        """
+        Blocks until the lane may start one more request. Returns False, without taking a
+        slot, if abandoned is set (and the condition notified) before then.
+        """
+        with self.cond:
+            self.waiting[name] = self.waiting.get(name, 0) + 1
+            try:
+                while not self._can_start(name):
+                    if abandoned is not None and abandoned.is_set():
+                        return False
+                    self.cond.wait()
+            finally:
+                self.waiting[name] -= 1
+            self.active[name] = self.active.get(name, 0) + 1
+            return True
+
+    def try_acquire(self, name: str) -> bool:
+        """Takes a slot of the lane if one is free right now."""
+        with self.cond:
+            if not self._can_start(name):
+                return False
+            self.active[name] = self.active.get(name, 0) + 1
+            return True
+
+    def release(self, name: str):
+        with self.cond:
+            self.active[name] -= 1
+            self.cond.notify_all()
+
+    @asynccontextmanager
+    async def slot(self, name: str):
+        """Holds a slot of the lane for the duration of one request, waiting in a worker thread."""
+        if not self.try_acquire(name):
+            logger.info(f"Waiting for a free '{name}' lane slot...")
+            abandoned = threading.Event()
+            waiter = asyncio.get_running_loop().run_in_executor(None, self.acquire, name, abandoned)
+            try:
+                await asyncio.shield(waiter)
+            except asyncio.CancelledError:
+                # Stop the worker thread; if it already took the slot, give it back
+                abandoned.set()
+                with self.cond:
+                    self.cond.notify_all()
+                def give_back(f):
+                    if not f.cancelled() and f.exception() is None and f.result():
+                        self.release(name)
+                waiter.add_done_callback(give_back)
+                raise
+        try:
+            yield
+        finally:
+            self.release(name)
+
+    def excluded_accounts(self, name: str, emails: Iterable[str]) -> Set[str]:
+        """Returns the emails outside the lane's account pool."""
+        pool = self.lane(name).get("accounts") or []
+        if not pool:
+            return set()
+        return {email for email in emails if email not in pool}
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        with self.cond:
+            return {name: {"active": self.active.get(name, 0), "waiting": self.waiting.get(name, 0)} for name in self.lanes}
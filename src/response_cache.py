@@ -0,0 +1,152 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """
+    Content-addressed on-disk cache for Gemini responses.
+    Entries are keyed by a hash of (model, system instruction, prompt, audio bytes)
+    and evicted in LRU order once the total size exceeds the configured cap.
+    """
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir: str = "cache/responses", max_size_mb: int = 200, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.enabled = enabled
+        self.index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+
+    @staticmethod
+    def make_key(model: str, system_instruction: Optional[str], prompt: str, audio_bytes: Optional[bytes] = None) -> str:
+        """Builds the cache key for a request. Each field is length-prefixed to avoid ambiguity."""
+        h = hashlib.sha256()
+        for field in (model or "", system_instruction or "", prompt or ""):
+            data = field.encode("utf-8")
+            h.update(len(data).to_bytes(8, "big"))
+            h.update(data)
+        audio = audio_bytes or b""
+        h.update(len(audio).to_bytes(8, "big"))
+        h.update(audio)
+        return h.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def _load_index(self) -> Dict[str, Any]:
+        index = {"entries": {}, "stats": {"hits": 0, "misses": 0, "bytes_saved": 0}}
+        if not os.path.exists(self.index_path):
+            return index
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+                if isinstance(data, dict):
+                    index["entries"].update(data.get("entries", {}))
+                    index["stats"].update(data.get("stats", {}))
+        except (json.JSONDecodeError, IOError):
+            pass
+        return index
+
+    def _save_index(self, index: Dict[str, Any]):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(index, f, indent=4)
+            os.replace(tmp_path, self.index_path)
+        except IOError as e:
+            logger.error(f"Error saving response cache index: {e}")
+
+    def _drop_entry(self, index: Dict[str, Any], key: str):
+        index["entries"].pop(key, None)
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    def get(self, key: str, request_bytes: int = 0) -> Optional[str]:
+        """
+        Returns the cached response text for key, or None on a miss.
+        request_bytes is the size of the payload that a hit avoids sending.
+        """
+        if not self.enabled:
+            return None
+
+        index = self._load_index()
+        entry = index["entries"].get(key)
+        text = None
+        if entry:
+            try:
+                with open(self._entry_path(key), 'rb') as f:
+                    data = f.read()
+                if hashlib.sha256(data).hexdigest() == entry.get("sha256"):
+                    text = data.decode("utf-8")
+                else:
+                    logger.warning(f"Response cache entry {key[:12]} failed integrity check. Discarding.")
+                    self._drop_entry(index, key)
+            except (IOError, UnicodeDecodeError):
+                self._drop_entry(index, key)
+
+        if text is None:
+            index["stats"]["misses"] += 1
+        else:
+            entry["last_access"] = time.time()
+            index["stats"]["hits"] += 1
+            index["stats"]["bytes_saved"] += request_bytes
+            logger.info(f"Response cache hit ({key[:12]}) - saved {request_bytes} request bytes")
+        self._save_index(index)
+        return text
+
+    def put(self, key: str, text: str, model: Optional[str] = None):
+        """Stores a response and evicts least recently used entries beyond the size cap."""
+        if not self.enabled or not text:
+            return
+
+        data = text.encode("utf-8")
+        if len(data) > self.max_size_bytes:
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self._entry_path(key) + ".tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._entry_path(key))
+        except IOError as e:
+            logger.error(f"Error writing response cache entry: {e}")
+            return
+
+        now = time.time()
+        index = self._load_index()
+        index["entries"][key] = {
+            "size": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "model": model,
+            "created": now,
+            "last_access": now,
+        }
+        self._evict(index)
+        self._save_index(index)
+
+    def _evict(self, index: Dict[str, Any]):
+        entries = index["entries"]
+        total = sum(e.get("size", 0) for e in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k].get("last_access", 0)):
+            if total <= self.max_size_bytes:
+                break
+            total -= entries[key].get("size", 0)
+            self._drop_entry(index, key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters, hit rate, bytes saved and current cache size."""
+        index = self._load_index()
+        stats = dict(index["stats"])
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["entries"] = len(index["entries"])
+        stats["size_bytes"] = sum(e.get("size", 0) for e in index["entries"].values())
+        return stats
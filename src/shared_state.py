@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    email TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    record TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS usage (
+    email TEXT NOT NULL,
+    model TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (email, model)
+);
+CREATE TABLE IF NOT EXISTS breakers (
+    email TEXT PRIMARY KEY,
+    entry TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+class SharedStateStore:
+    """
+    SQLite (WAL mode) store for state that several local worker processes share: account
+    records, the round-robin position, circuit-breaker entries, usage counters and leases.
+    Every update is a single transaction, so processes never overwrite each other's changes.
+    """
+    _shared: Dict[str, "SharedStateStore"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, db_file: str = "zaknotes_state.db", busy_timeout: float = 30.0):
+        self.db_file = db_file
+        self.busy_timeout = busy_timeout
+        self.owner = f"{os.getpid()}-{os.urandom(4).hex()}"
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @classmethod
+    def shared(cls, db_file: str) -> "SharedStateStore":
+        path = os.path.abspath(db_file)
+        with cls._shared_lock:
+            if path not in cls._shared:
+                cls._shared[path] = cls(db_file)
+            return cls._shared[path]
+
+    @classmethod
+    def from_config(cls, config) -> Optional["SharedStateStore"]:
+        """Returns the store named by the shared_state_db setting, or None to keep per-process JSON files."""
+        db_file = config.get("shared_state_db") if config else None
+        return cls.shared(db_file) if db_file else None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Returns this thread's connection. Connections autocommit outside explicit transactions."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # Accounts
+
+    def load_accounts(self) -> List[Dict[str, Any]]:
+        rows = self._connect().execute("SELECT record FROM accounts ORDER BY position").fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def save_account(self, record: Dict[str, Any]):
+        """Inserts or updates one account record, keeping its position in the rotation."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                """INSERT INTO accounts (email, position, record, updated_at)
+                   VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM accounts), ?, ?)
+                   ON CONFLICT(email) DO UPDATE SET record = excluded.record, updated_at = excluded.updated_at""",
+                (record["email"], json.dumps(record), time.time())
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def import_accounts(self, records: List[Dict[str, Any]]) -> int:
+        """Copies records into an empty account table (migration from gemini_cli_auth.json). Returns the count imported."""
+        if self._connect().execute("SELECT COUNT(*) FROM accounts").fetchone()[0]:
+            return 0
+        for record in records:
+            self.save_account(record)
+        return len(records)
+
+    def next_counter(self, name: str) -> int:
+        """Atomically increments a counter and returns its previous value."""
+        row = self._connect().execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1 RETURNING value",
+            (name,)
+        ).fetchone()
+        return row[0] - 1
+
+    # Usage
+
+    def increment_usage(self, email: str, model_name: str):
+        self._connect().execute(
+            "INSERT INTO usage (email, model, count) VALUES (?, ?, 1) "
+            "ON CONFLICT(email, model) DO UPDATE SET count = count + 1",
+            (email, model_name)
+        )
+
+    def usage_report(self) -> Dict[str, Dict[str, int]]:
+        report: Dict[str, Dict[str, int]] = {}
+        for email, model, count in self._connect().execute("SELECT email, model, count FROM usage"):
+            report.setdefault(email, {})[model] = count
+        return report
+
+    # Circuit breakers
+
+    def load_breakers(self) -> Dict[str, Dict[str, Any]]:
+        return {email: json.loads(entry) for email, entry in self._connect().execute("SELECT email, entry FROM breakers")}
+
+    def update_breaker(self, email: str, change: Callable[[Optional[Dict[str, Any]]], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Passes email's stored entry (None if there is none) to change and stores the entry it
+        returns, in one transaction so concurrent updates from other processes are not lost.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT entry FROM breakers WHERE email = ?", (email,)).fetchone()
+            entry = change(json.loads(row[0]) if row else None)
+            conn.execute(
+                "INSERT INTO breakers (email, entry) VALUES (?, ?) ON CONFLICT(email) DO UPDATE SET entry = excluded.entry",
+                (email, json.dumps(entry))
+            )
+            conn.execute("COMMIT")
+            return entry
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # Leases
+
+    def try_lease(self, name: str, ttl: float) -> bool:
+        """Takes the named lease for ttl seconds if it is free, expired or already ours."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+            if row and row[0] != self.owner and row[1] > now:
+                conn.execute("COMMIT")
+                return False
+            conn.execute(
+                "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at",
+                (name, self.owner, now + ttl)
+            )
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release_lease(self, name: str):
+        self._connect().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, self.owner))
@@ -0,0 +1,90 @@
+import re
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+
+# Query parameters that never change which media a URL points to
+TRACKING_PARAMS = {"fbclid", "gclid", "si", "feature", "ref", "ref_src", "mibextid", "rdid", "share_url"}
+
+YOUTUBE_HOSTS = ("youtube.com", "youtu.be", "youtube-nocookie.com")
+YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+FACEBOOK_HOSTS = ("facebook.com", "fb.watch", "fb.com")
+
+def _host(parsed) -> str:
+    host = (parsed.hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+def _matches(host: str, domains) -> bool:
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+def _youtube(parsed, host: str) -> Optional[Tuple[str, str]]:
+    video_id = None
+    parts = [p for p in parsed.path.split("/") if p]
+    if host == "youtu.be" and parts:
+        video_id = parts[0]
+    elif parts[:1] == ["watch"]:
+        video_id = parse_qs(parsed.query).get("v", [None])[0]
+    elif len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v", "e"):
+        video_id = parts[1]
+    if not video_id or not YOUTUBE_ID.match(video_id):
+        return None
+    return f"https://www.youtube.com/watch?v={video_id}", f"youtube:{video_id}"
+
+def _facebook(parsed, host: str) -> Optional[Tuple[str, str]]:
+    parts = [p for p in parsed.path.split("/") if p]
+    if host == "fb.watch" and parts:
+        # Short links can't be resolved offline; the code itself identifies the video
+        return f"https://fb.watch/{parts[0]}/", f"fb.watch:{parts[0]}"
+    video_id = parse_qs(parsed.query).get("v", [None])[0]
+    if not video_id:
+        for marker in ("videos", "reel", "reels"):
+            if marker in parts[:-1]:
+                video_id = parts[parts.index(marker) + 1]
+                break
+    if not video_id or not video_id.isdigit():
+        return None
+    return f"https://www.facebook.com/watch/?v={video_id}", f"facebook:{video_id}"
+
+def _mediadelivery(parsed) -> Optional[Tuple[str, str]]:
+    # iframe.mediadelivery.net/{embed|play}/{library_id}/{video_id}
+    parts = [p for p in parsed.path.split("/") if p]
+    if len(parts) < 3 or parts[0] not in ("embed", "play"):
+        return None
+    library_id, video_id = parts[1], parts[2].lower()
+    # Keep the query: signed embeds carry their token there
+    canonical = urlunparse(("https", "iframe.mediadelivery.net", f"/embed/{library_id}/{video_id}", "", parsed.query, ""))
+    return canonical, f"mediadelivery:{library_id}/{video_id}"
+
+def _generic(parsed, prefix: str) -> Tuple[str, str]:
+    query = sorted(
+        (k, v) for k, vs in parse_qs(parsed.query, keep_blank_values=True).items()
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")
+        for v in vs
+    )
+    path = parsed.path.rstrip("/") or "/"
+    netloc = _host(parsed) + (f":{parsed.port}" if parsed.port else "")
+    canonical = urlunparse(((parsed.scheme or "https").lower(), netloc, path, "", urlencode(query), ""))
+    return canonical, f"{prefix}:{canonical.split('://', 1)[-1]}"
+
+def canonicalize(url: str) -> Tuple[str, str]:
+    """
+    Returns (canonical URL, media key) for a job URL. URLs that point to the same media
+    (youtu.be/x, youtube.com/watch?v=x&t=30, ...) get the same key. Hosts without
+    special rules are normalized generically (case, fragment, tracking parameters).
+    """
+    url = url.strip()
+    parsed = urlparse(url if "://" in url else "https://" + url)
+    host = _host(parsed)
+    result = None
+    if _matches(host, YOUTUBE_HOSTS):
+        result = _youtube(parsed, host)
+    elif _matches(host, FACEBOOK_HOSTS):
+        result = _facebook(parsed, host)
+    elif _matches(host, ("mediadelivery.net",)):
+        result = _mediadelivery(parsed)
+    if result:
+        return result
+    prefix = "edgecoursebd" if "edgecoursebd" in host else "url"
+    return _generic(parsed, prefix)
+
+def media_key(url: str) -> str:
+    return canonicalize(url)[1]
@@ -6,11 +6,15 @@ from typing import Dict
 logger = logging.getLogger(__name__)
 
 class UsageTracker:
-    def __init__(self, usage_file: str = "usage_stats.json"):
+    def __init__(self, usage_file: str = "usage_stats.json", store=None):
         self.usage_file = usage_file
+        # Optional SharedStateStore; when set, counters are incremented atomically in the shared store
+        self.store = store
         self.stats = self._load_stats()
 
     def _load_stats(self) -> Dict[str, Dict[str, int]]:
+        if self.store:
+            return self.store.usage_report()
         if not os.path.exists(self.usage_file):
             return {}
         try:
@@ -28,6 +32,10 @@ class UsageTracker:
 
     def record_usage(self, email: str, model_name: str):
         """Records a single request for a given email and model."""
+        if self.store:
+            self.store.increment_usage(email, model_name)
+            self.stats = self.store.usage_report()
+            return
         if email not in self.stats:
             self.stats[email] = {}
         
@@ -39,4 +47,6 @@ class UsageTracker:
 
     def get_usage_report(self) -> Dict[str, Dict[str, int]]:
         """Returns the full usage statistics."""
+        if self.store:
+            self.stats = self.store.usage_report()
         return self.stats
@@ -0,0 +1,91 @@
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class YtDlpEngine:
+    """
+    Runs yt-dlp inside this process instead of starting `python -m yt_dlp` per job.
+    Command-line arguments are turned into options with yt_dlp.parse_options, so the
+    downloader's per-site argument lists apply unchanged. One YoutubeDL instance is kept
+    per option set and thread and reused across jobs. Extractors, the cookie jar and the
+    JS runtime are therefore loaded once. YoutubeDL is not thread-safe, so every worker
+    thread gets its own instances. Progress hooks pass download speed and ETA to
+    on_progress(job, status), at most once per progress_interval seconds per thread.
+    """
+
+    def __init__(self, on_progress: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None,
+                 progress_interval: float = 2.0):
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self._local = threading.local()
+
+    @staticmethod
+    def _cache_key(args: List[str], urls: List[str]) -> tuple:
+        # Everything but the URL and the per-job output template
+        key, skip = [], False
+        for arg in args:
+            if skip:
+                skip = False
+            elif arg in ("-o", "--output"):
+                skip = True
+            elif arg not in urls:
+                key.append(arg)
+        return tuple(key)
+
+    def _instance(self, args: List[str]):
+        import yt_dlp
+
+        parsed = yt_dlp.parse_options(args)
+        instances = getattr(self._local, "instances", None)
+        if instances is None:
+            instances = self._local.instances = {}
+        key = self._cache_key(args, parsed.urls)
+        ydl = instances.get(key)
+        if ydl is None:
+            # parse_options defaults ignoreerrors to "only_download", which only logs failed
+            # downloads; the pipeline needs the error to classify it (e.g. "Private video")
+            opts = dict(parsed.ydl_opts, quiet=True, noprogress=True, logger=logger, ignoreerrors=False)
+            ydl = yt_dlp.YoutubeDL(opts)
+            ydl.add_progress_hook(self._hook)
+            instances[key] = ydl
+        ydl.params["outtmpl"] = dict(parsed.ydl_opts["outtmpl"])
+        return ydl, parsed.urls
+
+    def _hook(self, status: Dict[str, Any]):
+        job = getattr(self._local, "job", None)
+        if not self.on_progress or job is None:
+            return
+        now = time.time()
+        if status.get("status") == "downloading" and now - getattr(self._local, "last_report", 0) < self.progress_interval:
+            return
+        self._local.last_report = now
+        try:
+            self.on_progress(job, status)
+        except Exception as e:
+            logger.debug(f"Download progress callback failed: {e}")
+
+    def run(self, args: List[str], job: Optional[Dict[str, Any]] = None):
+        """Downloads the URLs in args (yt-dlp command-line arguments). Raises yt_dlp's DownloadError on failure."""
+        ydl, urls = self._instance(args)
+        self._local.job = job
+        self._local.last_report = 0
+        try:
+            for url in urls:
+                ydl.extract_info(url, download=True)
+        finally:
+            self._local.job = None
+
+def progress_details(status: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarizes a yt-dlp progress hook status as done/total MB, speed (MB/s) and ETA (s)."""
+    mb = 1024 * 1024
+    total = status.get("total_bytes") or status.get("total_bytes_estimate")
+    speed = status.get("speed")
+    return {
+        "done": round((status.get("downloaded_bytes") or 0) / mb, 1),
+        "total": round(total / mb, 1) if total else None,
+        "speed_mb_s": round(speed / mb, 2) if speed else None,
+        "download_eta": status.get("eta"),
+    }
@@ -0,0 +1,87 @@
+import os
+import sys
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.batch_runner import BatchRunner, classify_failure
+from src.job_manager import JobManager
+
+class FakePipeline:
+    """Fails each job with the queued errors, then completes it."""
+    def __init__(self, manager, errors):
+        self.manager = manager
+        self.errors = errors
+        self.calls = []
+        self.last_error = None
+        self.last_error_kind = None
+
+    def execute_job(self, job):
+        self.calls.append(job['name'])
+        queued = self.errors.get(job['name'])
+        if queued:
+            self.last_error = queued.pop(0)
+            self.manager.update_job_status(job['id'], 'failed')
+            return False
+        self.manager.update_job_status(job['id'], 'completed')
+        return True
+
+@pytest.fixture
+def manager(tmp_path):
+    return JobManager(db_file=str(tmp_path / "jobs.db"))
+
+def test_classify_failure():
+    assert classify_failure("ERROR: [youtube] x: Video unavailable") == "permanent"
+    assert classify_failure("HTTP Error 404: Not Found") == "permanent"
+    assert classify_failure("Read timed out") == "transient"
+    assert classify_failure(None) == "transient"
+
+def test_failures_do_not_stop_the_batch(manager):
+    manager.add_jobs("Flaky|Gone|Fine|Broken", "http://a|http://b|http://c|http://d")
+    pipeline = FakePipeline(manager, {
+        "Flaky": ["Connection reset"],
+        "Gone": ["ERROR: Private video"],
+        "Broken": ["Timeout", "Timeout", "Timeout"],
+    })
+    now = [0.0]
+    def sleep(seconds):
+        now[0] += seconds
+    runner = BatchRunner(manager, pipeline, max_attempts=3, base_delay=30, sleep=sleep, clock=lambda: now[0])
+    results = {r["name"]: r for r in runner.run()}
+
+    assert results["Flaky"]["outcome"] == "completed" and results["Flaky"]["attempts"] == 2
+    assert results["Gone"]["outcome"] == "failed_permanent" and results["Gone"]["attempts"] == 1
+    assert results["Fine"]["outcome"] == "completed"
+    assert results["Broken"]["outcome"] == "failed" and results["Broken"]["attempts"] == 3
+    # Other jobs ran before the first retry
+    assert pipeline.calls[:4] == ["Flaky", "Gone", "Fine", "Broken"]
+    # Broken waited 30s, then 60s
+    assert now[0] == 90
+
+    # Permanent failures leave the queue; transient ones stay for a later run
+    assert [j["name"] for j in manager.get_pending_from_last_150()] == ["Broken"]
+    assert manager.history[1]["last_error"] == "ERROR: Private video"
+
+def test_failure_cap_spans_runs(manager):
+    manager.add_jobs("Broken", "http://a")
+    pipeline = FakePipeline(manager, {"Broken": ["Timeout"] * 6})
+    now = [0.0]
+    def sleep(seconds):
+        now[0] += seconds
+
+    def run():
+        return BatchRunner(manager, pipeline, max_attempts=2, max_failures=3, base_delay=1,
+                           sleep=sleep, clock=lambda: now[0]).run()
+
+    assert run()[0]["outcome"] == "failed"
+    result = run()[0]
+    assert result["outcome"] == "failed_permanent" and result["attempts"] == 1
+    assert manager.store.get(manager.history[0]["id"])["failures"] == 3
+    # Leases are released once the failure is recorded
+    assert manager.store.leased_by_others("another-worker") == []
+    assert manager.get_pending_from_last_150() == []
+
+def test_retry_delay_backs_off_exponentially(manager):
+    runner = BatchRunner(manager, None, base_delay=30, max_delay=100)
+    assert [runner.retry_delay(a) for a in (1, 2, 3)] == [30, 60, 100]
@@ -0,0 +1,47 @@
+import os
+import sys
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.chunk_planner import ChunkPlanner
+
+LIMITS = {"small-model": {"max_output_tokens": 8192, "context_tokens": 1048576}}
+
+@pytest.fixture
+def planner(tmp_path):
+    return ChunkPlanner(stats_file=str(tmp_path / "token_stats.json"), model_limits=LIMITS)
+
+def usage(prompt, output):
+    return {"promptTokenCount": prompt, "candidatesTokenCount": output, "totalTokenCount": prompt + output}
+
+def test_no_plan_without_samples(planner):
+    planner.record("small-model", usage(19200, 1000), "STOP", audio_seconds=600)
+    assert planner.plan_chunk_seconds("small-model") is None
+
+def test_plan_respects_output_limit(planner):
+    # 32 prompt tokens per second, 200 output tokens per audio minute
+    for _ in range(3):
+        planner.record("small-model", usage(19200, 2000), "STOP", audio_seconds=600)
+
+    rates = planner.rates("small-model")
+    assert rates["prompt_tokens_per_audio_second"] == 32
+    assert rates["output_tokens_per_audio_minute"] == 200
+
+    # 8192 * 0.8 / 200 minutes
+    assert planner.plan_chunk_seconds("small-model") == int(8192 * 0.8 / 200 * 60)
+
+def test_truncated_and_text_only_requests_are_ignored(planner):
+    for _ in range(3):
+        planner.record("small-model", usage(19200, 8192), "MAX_TOKENS", audio_seconds=600)
+        planner.record("small-model", usage(5000, 3000), "STOP")
+    assert planner.rates("small-model") is None
+    assert len(planner.requests) == 6
+
+def test_unknown_model_uses_default_limits_and_persists(planner):
+    for _ in range(3):
+        planner.record("other", usage(32000, 100), "STOP", audio_seconds=1000)
+    reloaded = ChunkPlanner(stats_file=planner.stats_file)
+    assert reloaded.get_limits("other") == ChunkPlanner.DEFAULT_LIMITS
+    assert reloaded.plan_chunk_seconds("other") is not None
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.circuit_breaker import CircuitBreaker
+from src.gemini_auth_service import GeminiAuthService
+
+@pytest.fixture
+def breaker(tmp_path):
+    return CircuitBreaker(health_file=str(tmp_path / "account_health.json"))
+
+def test_classify():
+    assert CircuitBreaker.classify(429) == "rate_limit"
+    assert CircuitBreaker.classify(401) == "auth"
+    assert CircuitBreaker.classify(503) == "server"
+    assert CircuitBreaker.classify(None) == "timeout"
+    assert CircuitBreaker.classify(400) == "other"
+
+def test_rate_limit_opens_immediately(breaker):
+    breaker.record_failure("a", "rate_limit")
+    assert breaker.get_state("a") == CircuitBreaker.OPEN
+    assert not breaker.allow("a")
+    assert breaker.seconds_until_available(["a"]) > 0
+
+def test_server_errors_need_threshold(breaker):
+    breaker.record_failure("a", "server")
+    breaker.record_failure("a", "server")
+    assert breaker.allow("a")
+    breaker.record_failure("a", "server")
+    assert not breaker.allow("a")
+
+def test_half_open_and_recovery(breaker):
+    breaker.record_failure("a", "rate_limit")
+    breaker.accounts["a"]["open_until"] = time.time() - 1
+    assert breaker.get_state("a") == CircuitBreaker.HALF_OPEN
+
+    # Failed trial doubles the cooldown
+    breaker.record_failure("a", "rate_limit")
+    assert breaker.get_state("a") == CircuitBreaker.OPEN
+    assert breaker.accounts["a"]["open_until"] - time.time() > 50
+
+    breaker.accounts["a"]["open_until"] = time.time() - 1
+    breaker.record_success("a")
+    assert breaker.get_state("a") == CircuitBreaker.CLOSED
+    assert breaker.accounts["a"]["opened_count"] == 0
+
+def test_retry_after_extends_cooldown(breaker):
+    breaker.record_failure("a", "rate_limit", retry_after=500)
+    assert breaker.accounts["a"]["open_until"] - time.time() > 400
+
+def test_state_persists(breaker):
+    breaker.record_failure("a", "auth")
+    reloaded = CircuitBreaker(health_file=breaker.health_file)
+    assert not reloaded.allow("a")
+    assert reloaded.health("a") < 1.0
+
+def test_account_selection_skips_open_and_degraded(tmp_path, breaker):
+    service = GeminiAuthService(auth_file=str(tmp_path / "auth.json"), breaker=breaker)
+    service.accounts = [
+        {"email": "u1", "status": "valid"},
+        {"email": "u2", "status": "valid"},
+        {"email": "u3", "status": "valid"},
+    ]
+    breaker.record_failure("u1", "rate_limit")
+    for _ in range(4):
+        breaker.record_failure("u2", "other")
+
+    # u1 is open, u2 is degraded but still allowed
+    assert breaker.allow("u2")
+    picks = {service.get_next_account()["email"] for _ in range(4)}
+    assert picks == {"u3"}
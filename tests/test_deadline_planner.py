@@ -0,0 +1,42 @@
+import os
+import sys
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.deadline_planner import DeadlinePlanner
+from src.latency_tracker import LatencyTracker
+from src.chunk_planner import ChunkPlanner
+
+MODEL = "flash"
+
+@pytest.fixture
+def planner(tmp_path):
+    latency = LatencyTracker(stats_file=str(tmp_path / "latency.json"))
+    chunks = ChunkPlanner(stats_file=str(tmp_path / "tokens.json"), model_limits={MODEL: {"max_output_tokens": 8192}})
+    return DeadlinePlanner(latency, chunks, api_timeout=300, idle_timeout=60, max_total=1800)
+
+def test_fixed_budgets_without_samples(planner):
+    assert planner.plan(MODEL, audio_seconds=600) == {"connect": 10, "first_byte": 300, "idle": 60, "total": 1800}
+
+def test_budgets_scale_with_audio_duration(planner):
+    for _ in range(5):
+        planner.latency_tracker.record(MODEL, "first_byte", 4.0)
+        planner.record_throughput(MODEL, 1000, 10.0) # 100 tokens/s
+        usage = {"promptTokenCount": 19200, "candidatesTokenCount": 1000, "totalTokenCount": 20200}
+        planner.chunk_planner.record(MODEL, usage, "STOP", audio_seconds=600) # 100 output tokens per minute
+
+    short = planner.plan(MODEL, audio_seconds=60)
+    long = planner.plan(MODEL, audio_seconds=3000)
+    assert short["first_byte"] == 15.0 # 2 x 4s, raised to the floor
+    assert short["total"] == 60.0 # floor
+    # 5000 tokens at 100 tokens/s, doubled, after the first byte
+    assert long["total"] == pytest.approx(15.0 + 100.0)
+
+def test_output_capped_at_model_limit(planner):
+    for _ in range(5):
+        usage = {"promptTokenCount": 1000, "candidatesTokenCount": 4000, "totalTokenCount": 5000}
+        planner.chunk_planner.record(MODEL, usage, "STOP")
+    assert planner.expected_output_tokens(MODEL, prompt_chars=4000 * 10) == 8192
+    assert planner.expected_output_tokens(MODEL, prompt_chars=400) == 400
@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+import threading
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.batch_runner import BatchRunner
+from src.download_stage import DownloadStage, host_key
+from src.downloader import get_expected_audio_path
+from src.job_manager import JobManager
+
+class FakeDownloads:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.active = {}
+        self.peak = {}
+        self.peak_total = 0
+
+    def __call__(self, job):
+        host = host_key(job['url'])
+        with self.lock:
+            self.active[host] = self.active.get(host, 0) + 1
+            self.peak[host] = max(self.peak.get(host, 0), self.active[host])
+            self.peak_total = max(self.peak_total, sum(self.active.values()))
+        time.sleep(self.delay)
+        path = get_expected_audio_path(job)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b"x" * 1024)
+        with self.lock:
+            self.active[host] -= 1
+        return path
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return JobManager(db_file=str(tmp_path / "jobs.db"))
+
+def test_host_key_groups_sites():
+    assert host_key("https://youtu.be/dQw4w9WgXcQ") == host_key("https://www.youtube.com/watch?v=aaaaaaaaaaa") == "youtube"
+    assert host_key("https://www.example.com/a") == "example.com"
+
+def test_limits_downloads_per_host_and_globally(manager):
+    manager.add_jobs(
+        "A|B|C|D|E",
+        "https://youtu.be/aaaaaaaaaaa|https://youtu.be/bbbbbbbbbbb|https://a.example/1|https://b.example/2|https://c.example/3"
+    )
+    fake = FakeDownloads()
+    stage = DownloadStage(manager, max_concurrent=3, per_host=1, max_ready=5, download=fake)
+    stage.submit(manager.history)
+    while stage.in_flight():
+        stage.wait(timeout=5)
+    stage.shutdown()
+
+    assert fake.peak["youtube"] == 1
+    assert fake.peak_total == 3
+    assert len(stage.ready_ids()) == 5
+    assert {j["status"] for j in JobManager(db_file=manager.store.db_file).history} == {"DOWNLOADED"}
+
+def test_runner_processes_downloaded_jobs(manager):
+    manager.add_jobs("A|B|C", "https://a.example/1|https://b.example/2|https://c.example/3")
+    seen = []
+
+    class Pipeline:
+        last_error = None
+        last_error_kind = None
+
+        def execute_job(self, job):
+            seen.append((job['name'], job['status']))
+            manager.update_job_status(job['id'], 'completed')
+            return True
+
+    stage = DownloadStage(manager, max_concurrent=2, download=FakeDownloads())
+    results = BatchRunner(manager, Pipeline(), downloads=stage).run()
+    assert [r["outcome"] for r in results] == ["completed"] * 3
+    assert sorted(seen) == [("A", "DOWNLOADED"), ("B", "DOWNLOADED"), ("C", "DOWNLOADED")]
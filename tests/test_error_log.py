@@ -0,0 +1,50 @@
+import os
+import sys
+import json
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.error_log import ErrorLogSink, summarize_payload
+
+def test_summarize_payload_replaces_large_strings():
+    audio = "A" * 5000
+    request = {"request": {"contents": [{"parts": [{"inline_data": {"data": audio}}, {"text": "short"}]}]}}
+
+    summary = summarize_payload(request)
+    part = summary["request"]["contents"][0]["parts"][0]["inline_data"]["data"]
+    assert part["length"] == 5000
+    assert len(part["sha256"]) == 16
+    assert summary["request"]["contents"][0]["parts"][1]["text"] == "short"
+    # Original is untouched
+    assert request["request"]["contents"][0]["parts"][0]["inline_data"]["data"] is audio
+
+def test_sink_writes_json_lines(tmp_path):
+    sink = ErrorLogSink(str(tmp_path / "error.jsonl"))
+    sink.log({"model": "m", "data": "x" * 1000}, {"error": {"code": 429}})
+    sink.log({"model": "m"}, "TimeoutException: ")
+    sink.flush()
+
+    with open(sink.log_file, 'r') as f:
+        entries = [json.loads(line) for line in f]
+    assert len(entries) == 2
+    assert entries[0]["request"]["data"]["length"] == 1000
+    assert entries[0]["response"]["error"]["code"] == 429
+    assert entries[1]["response"] == "TimeoutException: "
+
+def test_sink_rotates_by_size(tmp_path):
+    sink = ErrorLogSink(str(tmp_path / "error.jsonl"), max_bytes=300, backup_count=2)
+    for i in range(10):
+        sink.log({"i": i, "pad": "p" * 100}, "err")
+    sink.flush()
+
+    assert os.path.exists(sink.log_file)
+    assert os.path.exists(sink.log_file + ".1")
+    assert os.path.exists(sink.log_file + ".2")
+    assert not os.path.exists(sink.log_file + ".3")
+    assert os.path.getsize(sink.log_file) <= 300
+
+def test_shared_sink_per_file(tmp_path):
+    path = str(tmp_path / "shared.jsonl")
+    assert ErrorLogSink.shared(path) is ErrorLogSink.shared(path)
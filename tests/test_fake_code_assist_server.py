@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import httpx
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.fake_code_assist_server import FakeCodeAssistServer, percentile
+from src.config_manager import ConfigManager
+from src.gemini_api_wrapper import GeminiAPIWrapper
+from src.gemini_auth_service import GeminiAuthService
+from src.circuit_breaker import CircuitBreaker
+from src.response_cache import ResponseCache
+from src.latency_tracker import LatencyTracker
+from src.usage_tracker import UsageTracker
+from src.chunk_planner import ChunkPlanner
+from src.load_test import run_load_test
+
+FAST = {"first_byte_latency": {"distribution": "fixed", "value": 0.01}, "chunk_interval": 0, "sse_chunks": 3, "seed": 1}
+
+@pytest.fixture
+def server():
+    server = FakeCodeAssistServer(FAST).start()
+    yield server
+    server.stop()
+
+def make_wrapper(tmp_path, server_url):
+    auth_file = tmp_path / "auth.json"
+    auth_file.write_text(json.dumps([{
+        "access": "", "refresh": "r1", "expires": 0, "projectId": "p1",
+        "clientId": "c1", "clientSecret": None, "email": "u1@example.com", "status": "valid"
+    }]))
+    config = ConfigManager(config_file=str(tmp_path / "config.json"))
+    config.set("code_assist_endpoint", server_url)
+    auth = GeminiAuthService(auth_file=str(auth_file), breaker=CircuitBreaker(str(tmp_path / "health.json")), token_url=f"{server_url}/token")
+    return GeminiAPIWrapper(
+        config=config, auth_service=auth,
+        usage_tracker=UsageTracker(str(tmp_path / "usage.json")),
+        response_cache=ResponseCache(cache_dir=str(tmp_path / "cache")),
+        latency_tracker=LatencyTracker(str(tmp_path / "latency.json")),
+        chunk_planner=ChunkPlanner(str(tmp_path / "token_stats.json")),
+    )
+
+def test_percentile():
+    assert percentile([], 50) is None
+    assert percentile([1, 2, 3, 4], 50) == 2
+    assert percentile([1, 2, 3, 4], 99) == 4
+
+def test_wrapper_against_fake_server(tmp_path, server):
+    wrapper = make_wrapper(tmp_path, server.url)
+    text = asyncio.run(wrapper.generate_content_async("Hello"))
+
+    assert len(text.split()) == 3 * server.settings["words_per_chunk"]
+    stats = server.get_stats()
+    assert stats["by_status"] == {"200": 1}
+    assert stats["token_requests"] == 1
+    # usageMetadata from the final SSE event is recorded
+    recorded = wrapper.chunk_planner.requests[-1]
+    assert recorded["output_tokens"] == 3 * server.settings["words_per_chunk"]
+    assert recorded["finish_reason"] == "STOP"
+
+def test_error_injection_and_quota():
+    server = FakeCodeAssistServer({**FAST, "error_rates": {"503": 1.0}}).start()
+    try:
+        resp = httpx.post(f"{server.url}/v1internal:streamGenerateContent?alt=sse", json={"project": "p"})
+        assert resp.status_code == 503
+    finally:
+        server.stop()
+
+    server = FakeCodeAssistServer({**FAST, "account_quota": {"requests": 1, "window_seconds": 60}}).start()
+    try:
+        first = httpx.post(f"{server.url}/v1internal:streamGenerateContent?alt=sse", json={"project": "p"})
+        second = httpx.post(f"{server.url}/v1internal:streamGenerateContent?alt=sse", json={"project": "p"})
+        other = httpx.post(f"{server.url}/v1internal:streamGenerateContent?alt=sse", json={"project": "q"})
+        assert first.status_code == 200
+        assert second.status_code == 429
+        assert second.json()["error"]["details"][0]["retryDelay"] == "60s"
+        assert other.status_code == 200
+    finally:
+        server.stop()
+
+def test_load_test_driver():
+    cwd = os.getcwd()
+    report = run_load_test(jobs=2, chunks_per_job=2, chunk_kb=4, accounts=2, settings=FAST)
+    assert os.getcwd() == cwd
+    assert report["jobs_succeeded"] == 2
+    # 2 chunks + 1 note request per job
+    assert report["requests"] == 6
+    assert report["retries"] == 0
+    assert report["latency"]["p50"] is not None
@@ -59,3 +59,74 @@ def test_account_cycling(auth_service):
     assert auth_service.get_next_account()["email"] == "u1"
     assert auth_service.get_next_account()["email"] == "u2"
     assert auth_service.get_next_account()["email"] == "u1"
+
+@pytest.mark.anyio
+async def test_concurrent_refreshes_are_single_flight(auth_service):
+    import asyncio
+    record = {"email": "u1", "status": "valid", "access": "old", "refresh": "r1", "expires": 0, "projectId": "p1", "clientId": "c1", "clientSecret": None}
+    auth_service.accounts = [record]
+    calls = []
+
+    async def fake_refresh(rec, save=True):
+        calls.append(rec["email"])
+        await asyncio.sleep(0.05)
+        rec["access"] = "new"
+        rec["expires"] = int(time.time() * 1000) + 3600000
+        return rec
+
+    with patch.object(auth_service, "refresh_token", side_effect=fake_refresh):
+        results = await asyncio.gather(*(auth_service.get_valid_account(record) for _ in range(5)))
+
+    assert calls == ["u1"]
+    assert all(r["access"] == "new" for r in results)
+
+@pytest.mark.anyio
+async def test_cancelled_leader_does_not_strand_followers(auth_service):
+    import asyncio
+    record = {"email": "u1", "status": "valid", "access": "old", "refresh": "r1", "expires": 0, "projectId": "p1", "clientId": "c1", "clientSecret": None}
+    calls = []
+
+    async def fake_refresh(rec, save=True):
+        calls.append(rec["email"])
+        await asyncio.sleep(0.05)
+        rec["access"] = "new"
+        return rec
+
+    with patch.object(auth_service, "refresh_token", side_effect=fake_refresh):
+        leader = asyncio.ensure_future(auth_service.refresh_single_flight(record))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(auth_service.refresh_single_flight(record))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await asyncio.wait_for(follower, timeout=2)
+
+    assert leader.cancelled()
+    assert result["access"] == "new"
+    assert calls == ["u1", "u1"]
+    assert auth_service._inflight_refreshes == {}
+
+def test_shared_service_is_one_per_auth_file(tmp_path):
+    auth_file = str(tmp_path / "auth.json")
+    first = GeminiAuthService.shared(auth_file)
+    assert GeminiAuthService.shared(auth_file) is first
+    assert GeminiAuthService.shared(str(tmp_path / "other.json")) is not first
+
+@pytest.mark.anyio
+async def test_refresh_due_accounts_saves_once(auth_service):
+    now_ms = int(time.time() * 1000)
+    soon = {"email": "u1", "status": "valid", "access": "a1", "refresh": "r1", "expires": now_ms + 60000, "projectId": "p1", "clientId": "c1", "clientSecret": None}
+    expired = dict(soon, email="u2", expires=0)
+    later = dict(soon, email="u3", expires=now_ms + 3600000)
+    invalid = dict(soon, email="u4", status="invalid", expires=0)
+    auth_service.accounts = [soon, expired, later, invalid]
+
+    async def fake_refresh(rec, save=True):
+        assert save is False
+        return rec
+
+    with patch.object(auth_service, "refresh_token", side_effect=fake_refresh) as refresh, \
+         patch.object(auth_service, "_save_accounts") as save:
+        assert await auth_service.refresh_due_accounts(lead_seconds=300) == 2
+
+    assert sorted(c.args[0]["email"] for c in refresh.call_args_list) == ["u1", "u2"]
+    save.assert_called_once()
@@ -9,10 +9,10 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.job_manager import JobManager, HISTORY_FILE
 
 @pytest.fixture
-def job_manager():
+def job_manager(tmp_path):
     if os.path.exists(HISTORY_FILE):
         os.remove(HISTORY_FILE)
-    manager = JobManager()
+    manager = JobManager(db_file=str(tmp_path / "jobs.db"))
     yield manager
     if os.path.exists(HISTORY_FILE):
         os.remove(HISTORY_FILE)
@@ -46,7 +46,7 @@ def test_failure_state_preservation(job_manager):
 
     # Test fail_pending preservation
     job_id_2 = "test_fail_2"
-    job_manager.history.append({"id": job_id_2, "status": "TRANSCRIBING_CHUNK_2"})
+    job_manager.history = job_manager.history + [{"id": job_id_2, "status": "TRANSCRIBING_CHUNK_2"}]
     job_manager.fail_pending()
     
     job2 = job_manager.get_job(job_id_2)
@@ -0,0 +1,40 @@
+import os
+import sys
+from datetime import datetime, timedelta
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.job_archive import JobArchive
+from src.job_manager import JobManager
+
+def test_archive_partitions_by_month_and_filters(tmp_path):
+    archive = JobArchive(str(tmp_path / "archive"))
+    archive.append([
+        ({"id": "1", "name": "Lecture One", "url": "u1", "status": "completed"}, datetime(2026, 1, 10)),
+        ({"id": "2", "name": "Lecture Two", "url": "u2", "status": "cancelled"}, datetime(2026, 2, 5)),
+    ])
+    archive.append([({"id": "3", "name": "Other", "url": "u3", "status": "completed"}, datetime(2026, 2, 20))])
+
+    assert [m for m, _ in archive.segments()] == ["2026-01", "2026-02"]
+    assert [j["id"] for j in archive.query(status="completed")] == ["1", "3"]
+    assert [j["id"] for j in archive.query(since=datetime(2026, 2, 1))] == ["2", "3"]
+    assert [j["id"] for j in archive.query(name_contains="lecture", until=datetime(2026, 1, 31))] == ["1"]
+    assert [j["id"] for j in archive.query(url="u2")] == ["2"]
+
+def test_archive_old_jobs_moves_only_old_finished_jobs(tmp_path):
+    db_file = str(tmp_path / "jobs.db")
+    manager = JobManager(db_file=db_file)
+    old = str(datetime.now() - timedelta(days=60))
+    manager.history = [
+        {"id": "old-done", "name": "a", "url": "u1", "status": "completed", "added_at": old},
+        {"id": "old-queued", "name": "b", "url": "u2", "status": "queue", "added_at": old},
+        {"id": "new-done", "name": "c", "url": "u3", "status": "completed", "added_at": str(datetime.now())},
+    ]
+
+    assert manager.archive_old_jobs(30) == 1
+    assert [j["id"] for j in manager.history] == ["old-queued", "new-done"]
+    assert [j["id"] for j in manager.query_archive(status="completed")] == ["old-done"]
+    # Archived jobs stay out of the store on the next load
+    assert [j["id"] for j in JobManager(db_file=db_file).history] == ["old-queued", "new-done"]
@@ -9,10 +9,10 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from src.job_manager import JobManager, HISTORY_FILE
 
 @pytest.fixture
-def job_manager():
+def job_manager(tmp_path):
     if os.path.exists(HISTORY_FILE):
         os.remove(HISTORY_FILE)
-    manager = JobManager()
+    manager = JobManager(db_file=str(tmp_path / "jobs.db"))
     yield manager
     if os.path.exists(HISTORY_FILE):
         os.remove(HISTORY_FILE)
@@ -46,6 +46,119 @@ def test_fail_pending(job_manager):
     assert job_manager.history[3]["status"] == "failed"
     
     # Check persistence
-    with open(HISTORY_FILE, 'r') as f:
-        data = json.load(f)
-        assert data[0]["status"] == "failed"
+    reloaded = JobManager(db_file=job_manager.store.db_file)
+    assert reloaded.history[0]["status"] == "failed"
+    assert reloaded.get_job("3")["status"] == "completed"
+
+def test_migrates_history_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open(HISTORY_FILE, 'w') as f:
+        json.dump([{"id": "a", "name": "A", "status": "queue"}, {"id": "b", "name": "B", "status": "completed"}], f)
+
+    manager = JobManager()
+    assert [j["id"] for j in manager.history] == ["a", "b"]
+    assert not os.path.exists(HISTORY_FILE)
+    assert os.path.exists(HISTORY_FILE + ".migrated")
+
+    # Status updates are single-row writes visible to a new manager
+    manager.update_job_status("a", "CHUNKED")
+    assert [j["id"] for j in JobManager().get_pending_from_last_150()] == ["a"]
+
+def test_add_jobs_keeps_insertion_order(job_manager):
+    job_manager.add_jobs("First|Second|Third", "http://a|http://b|http://c")
+    job_manager.update_job_status(job_manager.history[0]["id"], "TRANSCRIBING_CHUNK_3")
+    pending = JobManager(db_file=job_manager.store.db_file).get_pending_from_last_150()
+    assert [j["name"] for j in pending] == ["First", "Second", "Third"]
+    assert pending[0]["status"] == "TRANSCRIBING_CHUNK_3"
+
+def test_scheduling_policies_pick_next_job(job_manager):
+    job_manager.history = [
+        {"id": "long", "name": "Long", "status": "queue", "media_duration": 14400, "priority": 0},
+        {"id": "short", "name": "Short", "status": "queue", "media_duration": 1200, "priority": 0,
+         "deadline": "2026-01-02T09:00:00"},
+        {"id": "urgent", "name": "Urgent", "status": "queue", "priority": 5, "deadline": "2026-01-01T09:00:00"},
+    ]
+    pending = job_manager.get_pending_from_last_150()
+    assert [j["id"] for j in job_manager.order_jobs(pending, "fifo")] == ["long", "short", "urgent"]
+    assert [j["id"] for j in job_manager.order_jobs(pending, "priority")] == ["urgent", "long", "short"]
+    assert [j["id"] for j in job_manager.order_jobs(pending, "sjf")] == ["short", "long", "urgent"]
+    assert [j["id"] for j in job_manager.order_jobs(pending, "edf")] == ["urgent", "short", "long"]
+
+    assert job_manager.next_pending_job("sjf", exclude={"short"})["id"] == "long"
+    job_manager.set_job_schedule("long", priority=9)
+    assert JobManager(db_file=job_manager.store.db_file).next_pending_job("priority")["id"] == "long"
+
+def test_workers_claim_different_jobs(job_manager):
+    job_manager.add_jobs("First|Second", "http://a|http://b")
+    other = JobManager(db_file=job_manager.store.db_file)
+
+    mine = job_manager.claim_next_job()
+    theirs = other.claim_next_job()
+    assert mine["name"] == "First" and theirs["name"] == "Second"
+    assert other.claim_next_job(exclude={theirs["id"]}) is None
+
+    # Failing the batch leaves the other worker's job alone
+    job_manager.fail_pending()
+    assert other.get_pending_from_last_150()[1]["status"] == "queue"
+
+    job_manager.update_job_status(mine["id"], "completed")
+    job_manager.release_job(mine["id"])
+    assert other.claim_next_job(exclude={theirs["id"]}) is None
+
+def test_cancel_pending_uses_stored_state(job_manager):
+    job_manager.add_jobs("First|Second", "http://a|http://b")
+    other = JobManager(db_file=job_manager.store.db_file)
+
+    # Another worker finishes a job after this manager loaded it
+    done = other.claim_next_job()
+    other.update_job_status(done["id"], "completed")
+    other.release_job(done["id"])
+    running = other.claim_next_job()
+
+    job_manager.cancel_pending()
+
+    assert job_manager.store.get(done["id"])["status"] == "completed"
+    assert job_manager.store.get(running["id"])["status"] == "queue"
+
+def test_duplicate_media_is_coalesced(job_manager):
+    job_manager.add_jobs("Lecture", "https://youtu.be/dQw4w9WgXcQ")
+    job_manager.add_jobs("Same Lecture|Other", "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=30|https://youtu.be/aaaaaaaaaaa")
+    primary, duplicate, other = job_manager.history
+
+    assert duplicate["status"] == "coalesced" and duplicate["coalesced_into"] == primary["id"]
+    assert [j["id"] for j in job_manager.get_pending_from_last_150()] == [primary["id"], other["id"]]
+    assert [j["id"] for j in job_manager.get_followers(primary["id"])] == [duplicate["id"]]
+
+    # Followers finish with the job they share
+    job_manager.update_job_status(primary["id"], "completed")
+    assert JobManager(db_file=job_manager.store.db_file).get_job(duplicate["id"])["status"] == "completed"
+
+def test_probe_duration_feeds_sjf(job_manager):
+    job_manager.add_jobs("Long|Short", "http://a|http://b")
+    long_job, short_job = job_manager.history
+    job_manager.record_probe(long_job["id"], {"duration": 14400.0, "chapters": []})
+    job_manager.record_probe(short_job["id"], {"duration": 1200.0, "chapters": []})
+    assert job_manager.next_pending_job("sjf")["name"] == "Short"
+    assert JobManager(db_file=job_manager.store.db_file).get_job(long_job["id"])["probe"]["duration"] == 14400.0
+
+def test_concurrent_updates_from_threads(job_manager):
+    from concurrent.futures import ThreadPoolExecutor
+    jobs = job_manager.add_jobs("Job", "|".join(f"http://host/{i}" for i in range(8)))
+
+    def work(job):
+        for done in range(20):
+            job_manager.update_progress(job["id"], "download", done=done, total=20, unit="MB")
+        job_manager.update_job_status(job["id"], "DOWNLOADED")
+
+    # The runner keeps reading and saving the cached jobs while download threads update them
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(work, job) for job in jobs]
+        while not all(f.done() for f in futures):
+            job_manager.get_pending_from_last_150()
+            job_manager.save_history()
+    for f in futures:
+        f.result()
+
+    stored = JobManager(db_file=job_manager.store.db_file).history
+    assert [job["status"] for job in stored] == ["DOWNLOADED"] * 8
+    assert all(job["progress"]["done"] == 19 for job in stored)
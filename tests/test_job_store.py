@@ -0,0 +1,76 @@
+import os
+import sys
+import sqlite3
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.job_store import JobStore
+
+@pytest.fixture
+def db_file(tmp_path):
+    return str(tmp_path / "jobs.db")
+
+def test_status_changes_are_logged(db_file):
+    store = JobStore(db_file)
+    job = {"id": "1", "status": "queue"}
+    store.record_status([job])
+    job["status"] = "DOWNLOADED"
+    store.record_status([job])
+    assert [e["status"] for e in store.events("1")] == ["queue", "DOWNLOADED"]
+    assert store.get("1")["status"] == "DOWNLOADED"
+
+def test_find_by_status_uses_prefixes(db_file):
+    store = JobStore(db_file)
+    store.upsert_many([{"id": "1", "status": "TRANSCRIBING_CHUNK_2"}, {"id": "2", "status": "queue"}, {"id": "3", "status": "completed"}])
+    assert [j["id"] for j in store.find_by_status(["queue"], ["TRANSCRIBING_CHUNK_"])] == ["1", "2"]
+
+def test_compaction_writes_snapshot_and_drops_old_events(db_file):
+    store = JobStore(db_file, durability="full")
+    store.record_status([{"id": "1", "status": "queue"}])
+    store._connect().execute("UPDATE job_events SET at = 0")
+    store.record_status([{"id": "1", "status": "completed"}])
+    store.compact(keep_events_days=1)
+
+    assert os.path.exists(store.snapshot_file)
+    assert [e["status"] for e in store.events("1")] == ["completed"]
+    assert JobStore(store.snapshot_file).get("1")["status"] == "completed"
+
+def test_corrupt_database_is_restored_from_snapshot(db_file):
+    store = JobStore(db_file)
+    store.record_status([{"id": "1", "status": "queue"}])
+    store.compact()
+    store._close()
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+    with open(db_file, 'wb') as f:
+        f.write(b"not a database" * 100)
+
+    restored = JobStore(db_file)
+    assert restored.get("1")["status"] == "queue"
+    assert os.path.exists(db_file + ".corrupt")
+
+def test_leases_block_other_owners_until_expiry(db_file):
+    store = JobStore(db_file)
+    store.upsert({"id": "1", "status": "queue"})
+    assert store.claim("1", "a", ttl=60)
+    assert not store.claim("1", "b", ttl=60)
+    assert store.leased_by_others("b") == ["1"]
+    assert store.renew_leases("a", ttl=-1) == 1
+    # a stopped heartbeating: the expired lease can be taken over
+    assert store.claim("1", "b", ttl=60)
+    store.release("1", "a")
+    assert store.leased_by_others("a") == ["1"]
+    store.release("1", "b")
+    assert store.leased_by_others("a") == []
+
+def test_adds_lease_columns_to_old_databases(db_file):
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE jobs (seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE, status TEXT, data TEXT NOT NULL)")
+    conn.commit()
+    conn.close()
+    store = JobStore(db_file)
+    store.upsert({"id": "1", "status": "queue"})
+    assert store.claim("1", "a", ttl=60)
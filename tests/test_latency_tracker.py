@@ -0,0 +1,28 @@
+import os
+import sys
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.latency_tracker import LatencyTracker
+
+@pytest.fixture
+def tracker(tmp_path):
+    return LatencyTracker(stats_file=str(tmp_path / "latency_stats.json"), window=10)
+
+def test_percentile(tracker):
+    assert tracker.percentile("m", "first_byte", 95) is None
+    for v in range(1, 11):
+        tracker.record("m", "first_byte", float(v))
+    assert tracker.count("m", "first_byte") == 10
+    assert tracker.percentile("m", "first_byte", 50) == 5.0
+    assert tracker.percentile("m", "first_byte", 95) == 10.0
+
+def test_rolling_window_and_persistence(tracker):
+    for v in range(20):
+        tracker.record("m", "first_byte", float(v))
+    assert tracker.count("m", "first_byte") == 10
+
+    reloaded = LatencyTracker(stats_file=tracker.stats_file, window=10)
+    assert reloaded.percentile("m", "first_byte", 0) == 10.0
@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import src.downloader as downloader
+from src.media_cache import MediaCache
+
+MB = 1024 * 1024
+
+@pytest.fixture
+def cache(tmp_path):
+    return MediaCache(cache_dir=str(tmp_path / "media"), max_size_mb=2)
+
+def make_download(tmp_path, name, size=MB):
+    path = tmp_path / f"{name}.mp3"
+    path.write_bytes(os.urandom(size))
+    return str(path)
+
+def test_put_and_lookup_share_entry_across_url_forms(cache, tmp_path):
+    source = make_download(tmp_path, "Lecture_1")
+    cached = cache.put("https://youtu.be/dQw4w9WgXcQ", source)
+
+    assert not os.path.exists(source)
+    assert cache.holds(cached)
+    assert cache.lookup("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=30") == cached
+    assert cache.lookup("https://youtu.be/aaaaaaaaaaa") is None
+
+def test_evicts_least_recently_used_beyond_quota(cache, tmp_path):
+    first = cache.put("https://example.com/a", make_download(tmp_path, "a"))
+    cache.put("https://example.com/b", make_download(tmp_path, "b"))
+    # Using a makes b the least recently used
+    cache.lookup("https://example.com/a")
+    cache.put("https://example.com/c", make_download(tmp_path, "c"))
+
+    assert cache.lookup("https://example.com/b") is None
+    assert cache.lookup("https://example.com/a") == first
+    assert cache.get_stats()["entries"] == 2
+
+def test_pinned_entries_are_not_evicted(cache, tmp_path):
+    a = cache.put("https://example.com/a", make_download(tmp_path, "a"))
+    b = cache.put("https://example.com/b", make_download(tmp_path, "b"))
+    cache.pin("https://example.com/a")
+    cache.put("https://example.com/c", make_download(tmp_path, "c"))
+
+    assert os.path.exists(a)
+    assert not os.path.exists(b)
+
+    cache.unpin("https://example.com/a")
+    cache.put("https://example.com/d", make_download(tmp_path, "d"))
+    assert not os.path.exists(a)
+
+def test_integrity_check_discards_corrupt_entry(tmp_path):
+    url = "https://example.com/a"
+    cached = MediaCache(cache_dir=str(tmp_path / "media")).put(url, make_download(tmp_path, "a", size=1024))
+    with open(cached, 'r+b') as f:
+        f.write(b"tampered")
+
+    # A new process has not verified the entry yet
+    cache = MediaCache(cache_dir=str(tmp_path / "media"))
+    assert cache.lookup(url) is None
+    assert not os.path.exists(cached)
+    with open(cache.index_path) as f:
+        assert json.load(f)["entries"] == {}
+
+def test_disabled_cache_leaves_downloads_alone(tmp_path):
+    cache = MediaCache(cache_dir=str(tmp_path / "media"), enabled=False)
+    source = make_download(tmp_path, "a", size=10)
+    assert cache.put("https://example.com/a", source) == source
+    assert cache.lookup("https://example.com/a") is None
+
+def test_expected_audio_path_adopts_named_download(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("downloads")
+    cache = MediaCache(cache_dir=os.path.join("downloads", "media"))
+    monkeypatch.setattr(downloader, "_media_cache", cache)
+    job = {"id": "1", "name": "Old Lecture", "url": "https://youtu.be/dQw4w9WgXcQ"}
+
+    assert downloader.get_expected_audio_path(job) == os.path.join("downloads", "Old_Lecture.mp3")
+
+    with open(os.path.join("downloads", "Old_Lecture.mp3"), 'wb') as f:
+        f.write(b"audio")
+    cached = downloader.get_expected_audio_path(job)
+    assert cache.holds(cached)
+    # A job with another name for the same video reuses the audio
+    assert downloader.get_expected_audio_path({**job, "id": "2", "name": "Rerun"}) == cached
+
+def test_cleanup_keeps_cached_audio(tmp_path, monkeypatch):
+    from src.cleanup_service import FileCleanupService
+    cache = MediaCache(cache_dir=str(tmp_path / "media"))
+    monkeypatch.setattr(downloader, "_media_cache", cache)
+    cached = cache.put("https://example.com/a", make_download(tmp_path, "a", size=10))
+    transcript = tmp_path / "a_transcript.txt"
+    transcript.write_text("t")
+
+    FileCleanupService.cleanup_job_files([cached, str(transcript)])
+
+    assert os.path.exists(cached)
+    assert not transcript.exists()
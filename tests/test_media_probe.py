@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+import threading
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.media_probe import probe_jobs, summarize_info
+
+def test_summarize_info_keeps_audio_formats_and_chapters():
+    info = {
+        "title": "Lecture",
+        "duration": 3600,
+        "formats": [
+            {"format_id": "140", "ext": "m4a", "acodec": "mp4a.40.2", "abr": 128, "filesize": 58_000_000},
+            {"format_id": "251", "ext": "webm", "acodec": "opus", "abr": 70, "filesize_approx": 31_000_000},
+            {"format_id": "160", "ext": "mp4", "acodec": "none", "filesize": 10_000_000},
+        ],
+        "chapters": [{"title": "Intro", "start_time": 0, "end_time": 60}],
+    }
+    summary = summarize_info(info)
+    assert summary["duration"] == 3600.0
+    assert [f["format_id"] for f in summary["audio_formats"]] == ["140", "251"]
+    assert summary["filesize_estimate"] == 31_000_000
+    assert summary["chapters"] == [{"title": "Intro", "start_time": 0, "end_time": 60}]
+
+def test_probe_jobs_bounds_concurrency_and_skips_failures():
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def probe(url):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return None if url == "bad" else {"duration": 60.0}
+
+    jobs = [{"id": str(i), "url": "bad" if i == 3 else f"u{i}"} for i in range(8)]
+    results = probe_jobs(jobs, max_workers=3, probe=probe)
+    assert peak[0] <= 3
+    assert sorted(results) == ["0", "1", "2", "4", "5", "6", "7"]
@@ -0,0 +1,37 @@
+import os
+import sys
+import time
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.model_router import ModelRouter
+
+FALLBACKS = {"transcription": ["flash", "flash-lite", "flash-old"]}
+
+def test_chain_starts_with_configured_model():
+    router = ModelRouter(FALLBACKS)
+    assert router.chain("transcription", "pro") == ["pro", "flash", "flash-lite", "flash-old"]
+    assert router.chain("transcription", "flash-lite") == ["flash-lite", "flash", "flash-old"]
+    assert router.chain("note", "pro") == ["pro"]
+
+def test_cooldown_after_k_rate_limits():
+    router = ModelRouter(FALLBACKS, {"rate_limit_count": 2, "window_seconds": 60, "cooldown_seconds": 60})
+    assert router.record_rate_limit("flash") is False
+    assert router.select("transcription", "flash") == "flash"
+    assert router.record_rate_limit("flash") is True
+    assert router.select("transcription", "flash") == "flash-lite"
+    assert router.has_fallback("transcription", "flash", "flash-lite")
+    assert "flash" in router.get_status()
+
+def test_old_rate_limits_fall_out_of_window():
+    router = ModelRouter(FALLBACKS, {"rate_limit_count": 2, "window_seconds": 60})
+    router.rate_limits["flash"] = [time.time() - 120]
+    assert router.record_rate_limit("flash") is False
+
+def test_all_cooling_down_picks_soonest_available():
+    router = ModelRouter(FALLBACKS)
+    now = time.time()
+    router.cooldown_until = {"flash": now + 100, "flash-lite": now + 10, "flash-old": now + 50}
+    assert router.select("transcription", "flash") == "flash-lite"
+    assert not router.has_fallback("transcription", "flash", "flash")
@@ -96,6 +96,39 @@ def test_execute_job_success(mock_job_manager_class, mock_shutil, mock_os, mock_
         # Verify notes generation
         mock_notes.assert_called_once()
 
+@patch('src.pipeline.download_audio')
+@patch('src.pipeline.AudioProcessor')
+@patch('src.pipeline.GeminiAPIWrapper')
+@patch('src.pipeline.NoteGenerationService.generate')
+@patch('src.pipeline.os')
+@patch('src.pipeline.shutil')
+@patch('src.pipeline.JobManager')
+def test_same_name_duplicate_shares_notes(mock_job_manager_class, mock_shutil, mock_os, mock_notes, mock_api_class, mock_audio_class, mock_down, mock_config, job):
+    """A duplicate queued under the same name shares the notes file instead of copying it onto itself."""
+    mock_manager = mock_job_manager_class.return_value
+    mock_manager.get_followers.return_value = [
+        {"id": "456", "name": "Test Job", "url": "http://example.com", "status": "coalesced"},
+        {"id": "789", "name": "Other Name", "url": "http://example.com", "status": "coalesced"},
+    ]
+    mock_audio_class.process_for_transcription.return_value = ["temp/job_123_chunk_001.mp3"]
+    mock_os.path.exists.side_effect = lambda path: path == "downloads/Test_Job.mp3" or "chunk" in path
+    mock_os.listdir.return_value = []
+    mock_os.path.join = os.path.join
+    mock_os.path.basename = os.path.basename
+    mock_os.path.dirname = os.path.dirname
+    mock_os.path.splitext = os.path.splitext
+    mock_api_class.return_value.generate_content_with_file.return_value = "Transcript text"
+    mock_notes.return_value = True
+
+    pipeline = ProcessingPipeline(mock_config, job_manager=mock_manager)
+    with patch('builtins.open', MagicMock()):
+        assert pipeline.execute_job(job) is True
+
+    copies = [c.args for c in mock_shutil.copy2.call_args_list if c.args[0] == os.path.join("notes", "Test_Job.md")]
+    assert copies == [(os.path.join("notes", "Test_Job.md"), os.path.join("notes", "Other_Name.md"))]
+    mock_manager.update_job_status.assert_any_call('456', 'completed')
+    mock_manager.update_job_status.assert_any_call('789', 'completed')
+
 @patch('src.pipeline.download_audio')
 @patch('src.pipeline.AudioProcessor')
 @patch('src.pipeline.GeminiAPIWrapper')
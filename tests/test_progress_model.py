@@ -0,0 +1,46 @@
+import os
+import sys
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.job_store import JobStore
+from src.progress_model import ProgressModel
+
+@pytest.fixture
+def model(tmp_path):
+    return ProgressModel(JobStore(str(tmp_path / "jobs.db")), min_samples=2)
+
+def learn(model):
+    model.record("download", 50, 25)          # 0.5 s/MB
+    model.record("prepare", 1, 120)           # 120 s per audio hour
+    model.record("chunk_audio", 2, 3600)      # 1800 audio seconds per chunk
+    model.record("transcribe", 1, 60, "flash")
+    model.record("transcribe", 1, 80, "flash")
+    model.record("transcribe", 1, 300, "pro")
+    model.record("notes", 1, 90, "pro")
+
+def test_nothing_learned_means_no_estimate(model):
+    assert model.rate("download") is None
+    assert model.estimate_remaining({"status": "queue", "media_duration": 3600}) is None
+
+def test_model_rates_fall_back_to_all_models(model):
+    learn(model)
+    assert model.rate("transcribe", "flash") == 70
+    # Only one sample for pro: use every model's samples
+    assert model.rate("transcribe", "pro") == pytest.approx(440 / 3)
+
+def test_estimates_remaining_stages(model):
+    learn(model)
+    queued = {"status": "queue", "media_duration": 7200, "probe": {"filesize_estimate": 100 * 1024 * 1024}}
+    transcribe = 440 / 3
+    assert model.estimate_remaining(queued) == pytest.approx(50 + 240 + 4 * transcribe + 90)
+
+    midway = {
+        "status": "TRANSCRIBING_CHUNK_3", "media_duration": 7200, "chunk_models": {"1": "flash", "2": "flash"},
+        "progress": {"stage": "transcribing", "done": 2, "total": 4},
+    }
+    assert model.estimate_remaining(midway) == pytest.approx(2 * 70 + 90)
+    record = model.progress_record({"status": "TRANSCRIBING_CHUNK_4"}, "generating_notes", 0, 1, "notes")
+    assert record["eta_seconds"] == 90
@@ -0,0 +1,33 @@
+import os
+import sys
+import random
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.repetition_detector import RepetitionDetector
+
+def test_detects_repeated_line_early():
+    detector = RepetitionDetector(ngram_size=8, window=200)
+    line = "and then the professor said that the answer is correct.\n"
+    fed = 0
+    while not detector.feed(line):
+        fed += 1
+        assert fed < 100
+    # Caught within a few hundred words, long before max output tokens
+    assert fed * len(line.split()) < 300
+    assert detector.repeat_ratio() >= 0.8
+
+def test_normal_text_is_not_flagged():
+    rng = random.Random(0)
+    vocabulary = "cell energy protein force matrix theorem vector proof gene atom circuit voltage".split()
+    detector = RepetitionDetector()
+    for _ in range(500):
+        assert not detector.feed(" ".join(rng.choice(vocabulary) for _ in range(10)) + " ")
+
+def test_words_split_across_pieces():
+    detector = RepetitionDetector(ngram_size=2, window=4)
+    for piece in ["hel", "lo wor", "ld ", "foo bar baz "]:
+        detector.feed(piece)
+    assert not detector.looping
+    assert detector.stats() == (4, 0.0)
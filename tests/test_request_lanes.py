@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.request_lanes import LaneScheduler
+
+def test_lane_concurrency_limit():
+    lanes = LaneScheduler({"note": {"concurrency": 1}})
+    lanes.acquire("note")
+    started = threading.Event()
+    worker = threading.Thread(target=lambda: (lanes.acquire("note"), started.set()))
+    worker.start()
+    assert not started.wait(0.1)
+    # Another lane is unaffected
+    lanes.acquire("transcription")
+    lanes.release("note")
+    assert started.wait(1)
+    worker.join()
+    assert lanes.get_stats()["note"] == {"active": 1, "waiting": 0}
+
+def test_freed_global_slot_goes_to_higher_priority_lane():
+    lanes = LaneScheduler({"transcription": {"priority": 10}, "note": {"priority": 5}}, max_concurrent=1)
+    lanes.acquire("note")
+    order = []
+    def run(name):
+        lanes.acquire(name)
+        order.append(name)
+        lanes.release(name)
+
+    low = threading.Thread(target=run, args=("note",))
+    low.start()
+    time.sleep(0.05)
+    high = threading.Thread(target=run, args=("transcription",))
+    high.start()
+    time.sleep(0.05)
+    lanes.release("note")
+    low.join(1)
+    high.join(1)
+    assert order == ["transcription", "note"]
+
+def test_account_pool_exclusions():
+    lanes = LaneScheduler({"note": {"accounts": ["a@example.com"]}})
+    emails = ["a@example.com", "b@example.com"]
+    assert lanes.excluded_accounts("note", emails) == {"b@example.com"}
+    assert lanes.excluded_accounts("transcription", emails) == set()
+
+@pytest.mark.anyio
+async def test_async_slot_waits_without_blocking_the_loop():
+    lanes = LaneScheduler({"note": {"concurrency": 1}})
+    events = []
+    async def request(name):
+        async with lanes.slot("note"):
+            events.append(f"start {name}")
+            await asyncio.sleep(0.05)
+            events.append(f"end {name}")
+    await asyncio.gather(request("a"), request("b"))
+    assert events == ["start a", "end a", "start b", "end b"]
+
+@pytest.mark.anyio
+async def test_cancelled_slot_wait_does_not_leak_the_slot():
+    lanes = LaneScheduler({"note": {"concurrency": 1}})
+    lanes.acquire("note")
+
+    async def request():
+        async with lanes.slot("note"):
+            pass
+
+    waiter = asyncio.ensure_future(request())
+    await asyncio.sleep(0.05)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    await asyncio.sleep(0.05)
+    assert lanes.get_stats()["note"] == {"active": 1, "waiting": 0}
+
+    lanes.release("note")
+    await asyncio.sleep(0.05)
+    assert lanes.get_stats()["note"] == {"active": 0, "waiting": 0}
+    assert lanes.try_acquire("note")
@@ -0,0 +1,62 @@
+import os
+import sys
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.response_cache import ResponseCache
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(cache_dir=str(tmp_path / "responses"), max_size_mb=1)
+
+def test_key_depends_on_all_fields():
+    base = ResponseCache.make_key("m", "sys", "prompt", b"audio")
+    assert base == ResponseCache.make_key("m", "sys", "prompt", b"audio")
+    assert base != ResponseCache.make_key("m2", "sys", "prompt", b"audio")
+    assert base != ResponseCache.make_key("m", "sys2", "prompt", b"audio")
+    assert base != ResponseCache.make_key("m", "sys", "prompt2", b"audio")
+    assert base != ResponseCache.make_key("m", "sys", "prompt", b"audio2")
+    # Field boundaries are unambiguous
+    assert ResponseCache.make_key("m", "ab", "c") != ResponseCache.make_key("m", "a", "bc")
+
+def test_put_get_and_stats(cache):
+    key = ResponseCache.make_key("m", None, "p")
+    assert cache.get(key) is None
+    cache.put(key, "hello", model="m")
+    assert cache.get(key, request_bytes=100) == "hello"
+
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+    assert stats["bytes_saved"] == 100
+
+def test_integrity_check_discards_corrupt_entry(cache):
+    key = ResponseCache.make_key("m", None, "p")
+    cache.put(key, "hello")
+    with open(cache._entry_path(key), 'w') as f:
+        f.write("tampered")
+
+    assert cache.get(key) is None
+    assert not os.path.exists(cache._entry_path(key))
+
+def test_lru_eviction(cache):
+    big = "x" * (400 * 1024)
+    keys = [ResponseCache.make_key("m", None, str(i)) for i in range(3)]
+    cache.put(keys[0], big)
+    cache.put(keys[1], big)
+    # Touch the first entry so the second becomes least recently used
+    assert cache.get(keys[0]) == big
+    cache.put(keys[2], big)
+
+    assert cache.get(keys[0]) == big
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) == big
+
+def test_disabled_cache_is_bypassed(tmp_path):
+    cache = ResponseCache(cache_dir=str(tmp_path / "responses"), enabled=False)
+    key = ResponseCache.make_key("m", None, "p")
+    cache.put(key, "hello")
+    assert cache.get(key) is None
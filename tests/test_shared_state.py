@@ -0,0 +1,98 @@
+import os
+import sys
+import json
+import threading
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.shared_state import SharedStateStore
+from src.gemini_auth_service import GeminiAuthService
+from src.usage_tracker import UsageTracker
+from src.circuit_breaker import CircuitBreaker
+
+def make_account(email, access="a"):
+    return {"email": email, "status": "valid", "access": access, "refresh": "r", "expires": 0,
+            "projectId": "p", "clientId": "c", "clientSecret": None}
+
+@pytest.fixture
+def db_file(tmp_path):
+    return str(tmp_path / "state.db")
+
+@pytest.fixture
+def auth_file(tmp_path):
+    path = tmp_path / "gemini_cli_auth.json"
+    path.write_text(json.dumps([make_account("u1"), make_account("u2")]))
+    return str(path)
+
+def test_accounts_imported_once_and_rotation_shared(db_file, auth_file):
+    # Two "workers", each with its own store connection
+    worker_a = GeminiAuthService(auth_file=auth_file, store=SharedStateStore(db_file))
+    worker_b = GeminiAuthService(auth_file=auth_file, store=SharedStateStore(db_file))
+    assert [a["email"] for a in worker_b.accounts] == ["u1", "u2"]
+
+    picks = [worker_a.get_next_account()["email"], worker_b.get_next_account()["email"],
+             worker_a.get_next_account()["email"], worker_b.get_next_account()["email"]]
+    assert picks == ["u1", "u2", "u1", "u2"]
+
+def test_saving_one_record_keeps_other_workers_updates(db_file, auth_file):
+    worker_a = GeminiAuthService(auth_file=auth_file, store=SharedStateStore(db_file))
+    worker_b = GeminiAuthService(auth_file=auth_file, store=SharedStateStore(db_file))
+
+    refreshed = dict(worker_a.accounts[0], access="fresh", expires=10**13)
+    worker_a._update_or_add_account(refreshed)
+    worker_b._update_or_add_account(dict(worker_b.accounts[1], status="invalid"))
+
+    stored = {a["email"]: a for a in SharedStateStore(db_file).load_accounts()}
+    assert stored["u1"]["access"] == "fresh"
+    assert stored["u2"]["status"] == "invalid"
+
+def test_usage_counters_are_atomic(db_file):
+    def work():
+        tracker = UsageTracker(store=SharedStateStore(db_file))
+        for _ in range(25):
+            tracker.record_usage("u1", "flash")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert UsageTracker(store=SharedStateStore(db_file)).get_usage_report() == {"u1": {"flash": 100}}
+
+def test_breaker_state_is_shared(db_file):
+    breaker_a = CircuitBreaker(store=SharedStateStore(db_file))
+    breaker_b = CircuitBreaker(store=SharedStateStore(db_file))
+    breaker_a.record_failure("u1", "rate_limit")
+    assert not breaker_b.allow("u1")
+    breaker_b.record_success("u1")
+    assert breaker_a.allow("u1")
+
+def test_leases(db_file):
+    store_a, store_b = SharedStateStore(db_file), SharedStateStore(db_file)
+    assert store_a.try_lease("refresh:u1", ttl=60)
+    assert store_a.try_lease("refresh:u1", ttl=60)
+    assert not store_b.try_lease("refresh:u1", ttl=60)
+    store_a.release_lease("refresh:u1")
+    assert store_b.try_lease("refresh:u1", ttl=60)
+    assert store_a.try_lease("refresh:u2", ttl=-1)
+    assert store_b.try_lease("refresh:u2", ttl=60) # expired
+
+@pytest.mark.anyio
+async def test_refresh_adopts_token_from_worker_holding_the_lease(db_file, auth_file):
+    import asyncio
+    from unittest.mock import patch
+    store_a = SharedStateStore(db_file)
+    worker_b = GeminiAuthService(auth_file=auth_file, store=SharedStateStore(db_file))
+    record = worker_b.accounts[0]
+    assert store_a.try_lease("refresh:u1", ttl=60)
+
+    async def worker_a_refresh():
+        await asyncio.sleep(0.2)
+        store_a.save_account(dict(record, access="fresh", expires=10**13))
+        store_a.release_lease("refresh:u1")
+
+    with patch.object(worker_b, "refresh_token") as refresh:
+        result, _ = await asyncio.gather(worker_b.refresh_single_flight(record), worker_a_refresh())
+
+    refresh.assert_not_called()
+    assert result["access"] == "fresh"
@@ -0,0 +1,39 @@
+import os
+import sys
+import pytest
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.url_canonicalizer import canonicalize, media_key
+
+@pytest.mark.parametrize("url", [
+    "https://youtu.be/dQw4w9WgXcQ",
+    "https://youtu.be/dQw4w9WgXcQ?si=abc&t=12",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=30",
+    "http://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ",
+    "youtube.com/shorts/dQw4w9WgXcQ",
+    "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ",
+])
+def test_youtube_variants_share_a_key(url):
+    assert canonicalize(url) == ("https://www.youtube.com/watch?v=dQw4w9WgXcQ", "youtube:dQw4w9WgXcQ")
+
+def test_facebook_variants_share_a_key():
+    keys = {media_key(u) for u in [
+        "https://www.facebook.com/watch/?v=1234567890",
+        "https://m.facebook.com/SomePage/videos/1234567890/?mibextid=x",
+        "https://web.facebook.com/reel/1234567890",
+    ]}
+    assert keys == {"facebook:1234567890"}
+
+def test_mediadelivery_keeps_signed_query():
+    url, key = canonicalize("https://iframe.mediadelivery.net/play/123/ABC-def?token=t&expires=1")
+    assert key == "mediadelivery:123/abc-def"
+    assert url == "https://iframe.mediadelivery.net/embed/123/abc-def?token=t&expires=1"
+    assert media_key("https://iframe.mediadelivery.net/embed/123/abc-def") == key
+
+def test_generic_urls_drop_tracking_and_fragment():
+    a = media_key("https://WWW.EdgeCourseBD.com/lesson/42/?utm_source=x#player")
+    b = media_key("https://edgecoursebd.com/lesson/42")
+    assert a == b == "edgecoursebd:edgecoursebd.com/lesson/42"
+    assert media_key("https://example.com/v?id=1") != media_key("https://example.com/v?id=2")
@@ -9,6 +9,36 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.gemini_api_wrapper import GeminiAPIWrapper
+from src.response_cache import ResponseCache
+from src.latency_tracker import LatencyTracker
+from src.config_manager import ConfigManager
+from src.request_lanes import LaneScheduler
+
+class FakeStreamResponse:
+    """Minimal stand-in for the response object yielded by httpx.AsyncClient.stream."""
+    def __init__(self, lines, status_code=200, delay=0):
+        self.status_code = status_code
+        self.lines = lines
+        self.delay = delay
+        self.text = ""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def aread(self):
+        return b""
+
+    def json(self):
+        raise ValueError("no json")
+
+    async def aiter_lines(self):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        for line in self.lines:
+            yield line
 
 @pytest.fixture
 def mock_auth_service():
@@ -27,20 +57,26 @@ def mock_usage_tracker():
     return MagicMock()
 
 @pytest.fixture
-def wrapper(mock_auth_service, mock_usage_tracker):
-    return GeminiAPIWrapper(auth_service=mock_auth_service, usage_tracker=mock_usage_tracker)
+def response_cache(tmp_path):
+    return ResponseCache(cache_dir=str(tmp_path / "cache"))
+
+@pytest.fixture
+def latency_tracker(tmp_path):
+    return LatencyTracker(stats_file=str(tmp_path / "latency_stats.json"))
+
+@pytest.fixture
+def wrapper(mock_auth_service, mock_usage_tracker, response_cache, latency_tracker):
+    return GeminiAPIWrapper(auth_service=mock_auth_service, usage_tracker=mock_usage_tracker, response_cache=response_cache, latency_tracker=latency_tracker)
 
 @pytest.mark.anyio
 async def test_generate_content_async_success(wrapper, mock_auth_service, mock_usage_tracker):
-    # Mock httpx response
-    mock_resp = MagicMock()
-    mock_resp.status_code = 200
-    mock_resp.iter_lines.return_value = [
-        b'data: {"response": {"candidates": [{"content": {"parts": [{"text": "Hello"}]}}]}}',
-        b'data: {"response": {"candidates": [{"content": {"parts": [{"text": " World"}]}}]}}'
-    ]
+    # Mock httpx streaming response
+    mock_resp = FakeStreamResponse([
+        'data: {"response": {"candidates": [{"content": {"parts": [{"text": "Hello"}]}}]}}',
+        'data: {"response": {"candidates": [{"content": {"parts": [{"text": " World"}]}}]}}'
+    ])
     
-    with patch('httpx.AsyncClient.post', return_value=mock_resp):
+    with patch('httpx.AsyncClient.stream', return_value=mock_resp):
         result = await wrapper.generate_content_async("Test prompt")
         
         assert result == "Hello World"
@@ -57,3 +93,179 @@ def test_sync_wrappers(wrapper):
         res = wrapper.generate_content("Prompt", system_instruction="System")
         assert res == "Mocked Response"
         mock_async.assert_called_once()
+
+def test_generate_content_with_file_uses_cache(wrapper, tmp_path):
+    audio = tmp_path / "chunk.mp3"
+    audio.write_bytes(b"fake audio")
+
+    with patch.object(wrapper, 'generate_content_async', new_callable=AsyncMock) as mock_async:
+        mock_async.return_value = "Transcript"
+
+        first = wrapper.generate_content_with_file(str(audio), "Transcribe", system_instruction="System")
+        second = wrapper.generate_content_with_file(str(audio), "Transcribe", system_instruction="System")
+        assert first == second == "Transcript"
+        mock_async.assert_called_once()
+
+        # Bypass flag always goes to the API
+        wrapper.generate_content_with_file(str(audio), "Transcribe", system_instruction="System", use_cache=False)
+        assert mock_async.call_count == 2
+
+    stats = wrapper.response_cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["bytes_saved"] > len(b"fake audio")
+
+@pytest.mark.anyio
+async def test_cancelled_hedged_request_stops_the_primary(tmp_path, mock_auth_service, mock_usage_tracker, response_cache, latency_tracker):
+    config = ConfigManager(config_file=str(tmp_path / "config.json"))
+    config.set("hedging_enabled", True)
+    config.set("hedge_min_samples", 5)
+    config.set("hedge_budget_ratio", 1.0)
+    for _ in range(5):
+        latency_tracker.record("m", "first_byte", 1.0)
+    wrapper = GeminiAPIWrapper(config=config, auth_service=mock_auth_service, usage_tracker=mock_usage_tracker,
+                               response_cache=response_cache, latency_tracker=latency_tracker)
+    cancelled = asyncio.Event()
+
+    async def slow_stream(*args, **kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    record = mock_auth_service.get_next_account.return_value
+    with patch.object(wrapper, "_stream_request", side_effect=slow_stream):
+        # The total deadline fires while waiting for the first byte
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(wrapper._request_with_hedging(None, record, {"model": "m"}, "m"), 0.1)
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("lane_concurrency, expected", [(0, "fast"), (1, "slow")])
+async def test_hedged_request_on_slow_first_byte(tmp_path, mock_usage_tracker, response_cache, latency_tracker, lane_concurrency, expected):
+    accounts = {
+        "slow@example.com": {"email": "slow@example.com", "projectId": "p1", "access": "a1", "status": "valid"},
+        "fast@example.com": {"email": "fast@example.com", "projectId": "p2", "access": "a2", "status": "valid"},
+    }
+    auth_service = MagicMock()
+    auth_service.accounts = list(accounts.values())
+    auth_service.get_next_account.side_effect = lambda exclude=None: next(
+        (a for a in accounts.values() if a["email"] not in (exclude or ())), None
+    )
+    auth_service.get_valid_account = AsyncMock(side_effect=lambda x: x)
+
+    config = ConfigManager(config_file=str(tmp_path / "config.json"))
+    config.set("hedging_enabled", True)
+    config.set("hedge_min_samples", 5)
+    config.set("hedge_budget_ratio", 1.0)
+    for _ in range(5):
+        latency_tracker.record("gemini-3-pro-preview", "first_byte", 0.05)
+    config.set("note_generation_model", "gemini-3-pro-preview")
+
+    # A full lane leaves no slot for the duplicate
+    lanes = LaneScheduler({"note": {"concurrency": lane_concurrency}})
+    wrapper = GeminiAPIWrapper(config=config, auth_service=auth_service, usage_tracker=mock_usage_tracker,
+                               response_cache=response_cache, latency_tracker=latency_tracker, lanes=lanes)
+
+    def fake_stream(method, url, headers=None, json=None):
+        if json["project"] == "p1":
+            return FakeStreamResponse(['data: {"response": {"candidates": [{"content": {"parts": [{"text": "slow"}]}}]}}'], delay=2)
+        return FakeStreamResponse(['data: {"response": {"candidates": [{"content": {"parts": [{"text": "fast"}]}}]}}'])
+
+    with patch('httpx.AsyncClient.stream', side_effect=fake_stream):
+        result = await wrapper.generate_content_async("Test prompt")
+
+    assert result == expected
+    assert wrapper._hedged_requests == (1 if expected == "fast" else 0)
+    mock_usage_tracker.record_usage.assert_called_once_with(f"{expected}@example.com", "gemini-3-pro-preview")
+    assert lanes.get_stats()["note"]["active"] == 0
+
+@pytest.mark.anyio
+async def test_falls_back_to_next_model_after_rate_limits(tmp_path, mock_auth_service, mock_usage_tracker, response_cache, latency_tracker):
+    from src.model_router import ModelRouter
+    mock_auth_service.accounts = [mock_auth_service.get_next_account.return_value]
+    config = ConfigManager(config_file=str(tmp_path / "config.json"))
+    config.set("transcription_model", "gemini-3-flash-preview")
+    router = ModelRouter(
+        fallbacks={"transcription": ["gemini-3-flash-preview", "gemini-2.5-flash"]},
+        policy={"rate_limit_count": 2, "window_seconds": 60, "cooldown_seconds": 60}
+    )
+    wrapper = GeminiAPIWrapper(config=config, auth_service=mock_auth_service, usage_tracker=mock_usage_tracker,
+                               response_cache=response_cache, latency_tracker=latency_tracker, model_router=router,
+                               error_log=MagicMock())
+
+    models = []
+    def fake_stream(method, url, headers=None, json=None):
+        models.append(json["model"])
+        if json["model"] == "gemini-3-flash-preview":
+            return FakeStreamResponse([], status_code=429)
+        return FakeStreamResponse(['data: {"response": {"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}}'])
+
+    with patch('httpx.AsyncClient.stream', side_effect=fake_stream):
+        result = await wrapper.generate_content_async("Test prompt", model_type="transcription")
+
+    assert result == "ok"
+    assert models == ["gemini-3-flash-preview", "gemini-3-flash-preview", "gemini-2.5-flash"]
+    assert wrapper.last_model_used == "gemini-2.5-flash"
+    assert router.is_cooling_down("gemini-3-flash-preview")
+    # The account was not penalized for the model's quota
+    mock_auth_service.breaker.record_failure.assert_not_called()
+
+@pytest.mark.anyio
+async def test_looping_stream_is_aborted_and_retried(wrapper):
+    loop_event = 'data: {"response": {"candidates": [{"content": {"parts": [{"text": "the same sentence again and again\\n"}]}}]}}'
+    bodies = []
+    def fake_stream(method, url, headers=None, json=None):
+        bodies.append(json)
+        if len(bodies) == 1:
+            return FakeStreamResponse([loop_event] * 1000)
+        return FakeStreamResponse(['data: {"response": {"candidates": [{"content": {"parts": [{"text": "clean"}]}}]}}'])
+
+    wrapper.error_log = MagicMock()
+    with patch('httpx.AsyncClient.stream', side_effect=fake_stream):
+        result = await wrapper.generate_content_async("Test prompt")
+
+    assert result == "clean"
+    assert wrapper.loop_aborts == 1
+    assert "generationConfig" not in bodies[0]["request"]
+    assert bodies[1]["request"]["generationConfig"]["temperature"] > 1.0
+
+@pytest.mark.anyio
+async def test_truncated_response_is_continued_and_stitched(wrapper):
+    bodies = []
+    def fake_stream(method, url, headers=None, json=None):
+        bodies.append(json)
+        if len(bodies) == 1:
+            return FakeStreamResponse(['data: {"response": {"candidates": [{"content": {"parts": [{"text": "# Notes\\nThe first half of the notes ends here"}]}, "finishReason": "MAX_TOKENS"}]}}'])
+        return FakeStreamResponse(['data: {"response": {"candidates": [{"content": {"parts": [{"text": "half of the notes ends here and the rest follows."}]}, "finishReason": "STOP"}]}}'])
+
+    with patch('httpx.AsyncClient.stream', side_effect=fake_stream):
+        result = await wrapper.generate_content_async("Test prompt")
+
+    assert result == "# Notes\nThe first half of the notes ends here and the rest follows."
+    assert len(bodies) == 2
+    contents = bodies[1]["request"]["contents"]
+    assert [c["role"] for c in contents] == ["user", "model", "user"]
+    assert contents[0] == bodies[0]["request"]["contents"][0]
+    assert contents[1]["parts"][0]["text"] == "# Notes\nThe first half of the notes ends here"
+
+def test_stitch_keeps_short_coincidental_overlap():
+    assert GeminiAPIWrapper._stitch("ends with a", "a new word") == "ends with aa new word"
+
+@pytest.mark.anyio
+async def test_first_byte_deadline_aborts_and_retries(tmp_path, wrapper):
+    wrapper.api_retry_delay = 0
+    wrapper.deadline_planner = MagicMock()
+    wrapper.deadline_planner.plan.return_value = {"connect": 5, "first_byte": 0.2, "idle": 5, "total": 10}
+    calls = []
+    def fake_stream(method, url, headers=None, json=None):
+        calls.append(json)
+        delay = 2 if len(calls) == 1 else 0
+        return FakeStreamResponse(['data: {"response": {"candidates": [{"content": {"parts": [{"text": "done"}]}}]}}'], delay=delay)
+
+    with patch('httpx.AsyncClient.stream', side_effect=fake_stream):
+        result = await wrapper.generate_content_async("Test prompt")
+
+    assert result == "done"
+    assert len(calls) == 2
+    wrapper.auth_service.breaker.record_failure.assert_called_once_with("test@example.com", "timeout")
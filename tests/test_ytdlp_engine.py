@@ -0,0 +1,66 @@
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ytdlp_engine import YtDlpEngine, progress_details
+from src.downloader import run_yt_dlp
+
+def test_cache_key_ignores_url_and_output_template():
+    base = ["-N", "4", "--extract-audio", "--audio-format", "mp3"]
+    key_a = YtDlpEngine._cache_key(base + ["-o", "downloads/a.%(ext)s", "https://youtu.be/a"], ["https://youtu.be/a"])
+    key_b = YtDlpEngine._cache_key(base + ["-o", "downloads/b.%(ext)s", "https://youtu.be/b"], ["https://youtu.be/b"])
+    assert key_a == key_b == tuple(base)
+
+def test_progress_hook_is_throttled_per_job():
+    reports = []
+    engine = YtDlpEngine(on_progress=lambda job, status: reports.append((job['id'], status['status'])), progress_interval=60)
+    engine._local.job = {'id': 'j1'}
+    engine._local.last_report = 0
+
+    engine._hook({"status": "downloading", "downloaded_bytes": 1})
+    engine._hook({"status": "downloading", "downloaded_bytes": 2})
+    engine._hook({"status": "finished", "downloaded_bytes": 3})
+
+    # The second update falls inside the interval; "finished" is always reported
+    assert reports == [('j1', 'downloading'), ('j1', 'finished')]
+
+def test_progress_hook_without_job_is_ignored():
+    reports = []
+    engine = YtDlpEngine(on_progress=lambda job, status: reports.append(job))
+    engine._hook({"status": "downloading"})
+    assert reports == []
+
+def test_progress_details_converts_to_megabytes():
+    mb = 1024 * 1024
+    details = progress_details({"downloaded_bytes": 5 * mb, "total_bytes_estimate": 20 * mb, "speed": 2 * mb, "eta": 7})
+    assert details == {"done": 5.0, "total": 20.0, "speed_mb_s": 2.0, "download_eta": 7}
+    assert progress_details({"downloaded_bytes": mb})["total"] is None
+
+def test_failed_download_raises_with_reason(tmp_path):
+    import yt_dlp
+
+    engine = YtDlpEngine()
+    with pytest.raises(yt_dlp.utils.DownloadError, match="not a valid URL"):
+        engine.run(["-x", "-o", str(tmp_path / "a.%(ext)s"), "not-a-url-at-all"], {'id': 'j1'})
+
+def test_run_yt_dlp_uses_engine_instead_of_subprocess():
+    calls = []
+
+    class FakeEngine:
+        def run(self, args, job):
+            calls.append((args, job))
+
+    job = {'id': 'j1'}
+    with patch('src.downloader.run_command') as mock_run:
+        run_yt_dlp(["-x", "https://youtu.be/a"], job, FakeEngine())
+    mock_run.assert_not_called()
+    assert calls == [(["-x", "https://youtu.be/a"], job)]
+
+def test_run_yt_dlp_without_engine_runs_module():
+    with patch('src.downloader.run_command') as mock_run:
+        run_yt_dlp(["-x", "https://youtu.be/a"])
+    assert mock_run.call_args[0][0] == [sys.executable, "-m", "yt_dlp", "-x", "https://youtu.be/a"]
@@ -3,7 +3,8 @@ import os
 import sys
 import shutil
 import logging
-import json
+from datetime import datetime
+from functools import partial
 from src.job_manager import JobManager
 
 # Configure logging to show INFO level and above on terminal
@@ -18,12 +19,17 @@ from src.notion_config_manager import NotionConfigManager
 from src.notion_service import NotionService
 from src.config_manager import ConfigManager
 from src.pipeline import ProcessingPipeline
+from src.batch_runner import BatchRunner
+from src.download_stage import DownloadStage
+from src.downloader import download_audio
+from src.media_probe import probe_jobs, probe_url
 from src.cleanup_service import FileCleanupService
 from src.gemini_auth_service import GeminiAuthService
+from src.shared_state import SharedStateStore
 from src.gemini_creds_helper import main as run_creds_helper
 
 def manage_gemini_accounts():
-    auth_service = GeminiAuthService()
+    auth_service = GeminiAuthService(store=SharedStateStore.from_config(ConfigManager()))
     while True:
         accounts = auth_service.accounts
         print("\n--- Manage Gemini CLI Accounts ---")
@@ -33,7 +39,10 @@ def manage_gemini_accounts():
             print("Configured Accounts:")
             for i, acc in enumerate(accounts, 1):
                 status_icon = "✅" if acc.get("status") == "valid" else "❌"
-                print(f"{i}. {acc['email']} [{status_icon} {acc['status']}]")
+                health = auth_service.breaker.health(acc['email'])
+                circuit = auth_service.breaker.get_state(acc['email'])
+                circuit_note = "" if circuit == "closed" else f", circuit {circuit}"
+                print(f"{i}. {acc['email']} [{status_icon} {acc['status']}] (health {health:.0%}{circuit_note})")
         
         print("\n1. Add New Account (Login)")
         print("2. Run Credential Helper (Extract/Manual IDs)")
@@ -48,7 +57,7 @@ def manage_gemini_accounts():
                 continue
             
             import asyncio
-            auth_service = GeminiAuthService() # Reload
+            auth_service = GeminiAuthService(store=auth_service.store) # Reload
             verifier, challenge = auth_service.generate_pkce()
             auth_url = auth_service.build_auth_url(creds['clientId'], challenge, verifier)
             
@@ -199,27 +208,49 @@ def cleanup_stranded_chunks():
 def run_processing_pipeline(manager):
     config = ConfigManager()
     pipeline = ProcessingPipeline(config, job_manager=manager)
+    manager.store.start_compaction(config.get("job_store_compaction_interval", 600))
     
+    policy = config.get("scheduling_policy", "fifo")
     pending_jobs = manager.get_pending_from_last_150()
     if not pending_jobs:
         print("No pending jobs to process.")
         return
 
-    print(f"\n🚀 Starting pipeline for {len(pending_jobs)} jobs...")
+    print(f"\n🚀 Starting pipeline for {len(pending_jobs)} jobs ({policy} order)...")
     
-    for job in pending_jobs:
-        print(f"\n--- Processing Job: {job['name']} ---")
-        success = pipeline.execute_job(job)
-        
-        # Save progress after each job
-        manager.save_history()
-        
-        if not success:
-            print(f"⚠️ Job '{job['name']}' failed. Failing all remaining jobs in batch...")
-            manager.fail_pending()
-            break
+    # Jobs are claimed one at a time in policy order, so several workers can share the queue.
+    # A failed job is retried later or set aside instead of failing the rest of the batch.
+    lease = config.get("job_lease_seconds", 120)
+    # Queued jobs download in the background, a few at a time and one per site by default
+    download_concurrency = config.get("download_concurrency", 3)
+    downloads = None
+    if download_concurrency > 1:
+        downloads = DownloadStage(
+            manager, max_concurrent=download_concurrency,
+            per_host=config.get("download_per_host", 1), lease_seconds=lease,
+            download=partial(download_audio, engine=pipeline.download_engine)
+        )
+    runner = BatchRunner(
+        manager, pipeline, policy=policy, downloads=downloads,
+        lease_seconds=lease,
+        max_attempts=config.get("job_max_attempts", 3),
+        max_failures=config.get("job_max_failures", 10),
+        base_delay=config.get("job_retry_base_delay", 30),
+        max_delay=config.get("job_retry_max_delay", 600)
+    )
+    results = runner.run()
     
     print("\n🏁 Pipeline execution finished.")
+    for r in results:
+        icon = "✅" if r["outcome"].startswith("completed") else "❌"
+        error = f" - {r['error']}" if r["error"] else ""
+        print(f"   {icon} {r['name']}: {r['outcome']} after {r['attempts']} attempt(s){error}")
+    manager.store.compact()
+
+    stats = pipeline.api.response_cache.get_stats()
+    lookups = stats["hits"] + stats["misses"]
+    if lookups:
+        print(f"📦 Response cache: {stats['hits']}/{lookups} hits ({stats['hit_rate']:.0%}), {stats['bytes_saved'] / (1024 * 1024):.1f} MB not re-sent")
 
 def process_old_notes():
     config = ConfigManager()
@@ -272,8 +303,76 @@ def process_old_notes():
     except Exception as e:
         print(f"❌ Failed to initialize Notion service: {e}")
 
+def ask_job_schedule():
+    """Asks for the optional priority and deadline of new jobs. Returns (priority, deadline)."""
+    priority = input("Priority (higher runs first, Enter for 0): ").strip()
+    deadline = input("Deadline (YYYY-MM-DD HH:MM, Enter for none): ").strip()
+    try:
+        priority = int(priority) if priority else 0
+    except ValueError:
+        print("❌ Invalid priority, using 0.")
+        priority = 0
+    try:
+        deadline = datetime.fromisoformat(deadline) if deadline else None
+    except ValueError:
+        print("❌ Invalid deadline, ignoring it.")
+        deadline = None
+    return priority, deadline
+
+def probe_new_jobs(manager, jobs):
+    """Fetches metadata for newly added jobs in parallel and reports the batch's size against free disk space."""
+    config = ConfigManager()
+    jobs = [j for j in jobs if j.get('status') == 'queue']
+    if not jobs or not config.get("probe_enabled", True):
+        return
+    print(f"\n🔎 Probing {len(jobs)} link(s) for duration and size...")
+    ua = config.get("user_agent")
+    results = probe_jobs(jobs, max_workers=config.get("probe_concurrency", 4), probe=lambda url: probe_url(url, user_agent=ua))
+    for job_id, metadata in results.items():
+        manager.record_probe(job_id, metadata)
+
+    hours = sum(m.get('duration') or 0 for m in results.values()) / 3600
+    size_mb = sum(m.get('filesize_estimate') or 0 for m in results.values()) / (1024 * 1024)
+    print(f"   - {len(results)}/{len(jobs)} probed: {hours:.1f} h of media, ~{size_mb:.0f} MB to download.")
+    free_mb = shutil.disk_usage(".").free / (1024 * 1024)
+    if size_mb > free_mb:
+        print(f"⚠️ Only {free_mb:.0f} MB of disk space is free; some downloads may fail.")
+
+def format_duration(seconds):
+    if seconds is None:
+        return "unknown"
+    minutes = int(seconds // 60)
+    return f"{minutes // 60}h {minutes % 60:02d}m" if minutes >= 60 else f"{minutes}m {int(seconds % 60):02d}s"
+
+def show_job_status(manager=None):
+    """Prints each pending job's stage progress and ETA, read from the job store."""
+    manager = manager or JobManager(archive_after_days=None)
+    report = manager.status_report()
+    if not report:
+        print("No pending jobs.")
+        return
+    print(f"\n--- Job Status ({len(report)} pending) ---")
+    total, known = 0.0, True
+    for entry in report:
+        progress = entry["progress"] or {}
+        detail = progress.get("stage") or entry["status"]
+        if progress.get("total"):
+            detail += f" {progress.get('done') or 0}/{progress['total']} {progress.get('unit') or ''}".rstrip()
+        if progress.get("speed_mb_s"):
+            detail += f" at {progress['speed_mb_s']} MB/s"
+        print(f"   {entry['name']}: {detail}, ETA {format_duration(entry['eta_seconds'])}")
+        if entry["eta_seconds"] is None:
+            known = False
+        else:
+            total += entry["eta_seconds"]
+    print(f"Batch ETA: {format_duration(total)}" + ("" if known else " (some jobs have no estimate yet)"))
+
 def start_note_generation():
-    manager = JobManager()
+    config = ConfigManager()
+    manager = JobManager(
+        durability=config.get("job_store_durability", "batched"),
+        archive_after_days=config.get("archive_after_days", 30)
+    )
     
     while True:
         print("\n--- Note Generation Sub-Menu ---")
@@ -282,10 +381,11 @@ def start_note_generation():
         print("3. Cancel All Old Jobs")
         print("4. Process Queued Jobs")
         print("5. Process Old Notes (Push to Notion)")
-        print("6. Back to Main Menu")
+        print("6. Show Job Status")
+        print("7. Back to Main Menu")
         print("--------------------------------")
         
-        sub_choice = input("Enter your choice (1-6): ").strip()
+        sub_choice = input("Enter your choice (1-7): ").strip()
         
         if sub_choice == '1':
             manager.cancel_pending()
@@ -293,7 +393,9 @@ def start_note_generation():
             file_names = input("Give me the file names (separated by comma/pipe/newline): ")
             urls = input("Give the URLS for the files: ")
             if file_names.strip() and urls.strip():
-                manager.add_jobs(file_names, urls)
+                priority, deadline = ask_job_schedule()
+                new_jobs = manager.add_jobs(file_names, urls, priority=priority, deadline=deadline)
+                probe_new_jobs(manager, new_jobs)
                 run_processing_pipeline(manager)
             break
             
@@ -301,7 +403,9 @@ def start_note_generation():
             file_names = input("Give me the file names (separated by comma/pipe/newline): ")
             urls = input("Give the URLS for the files: ")
             if file_names.strip() and urls.strip():
-                manager.add_jobs(file_names, urls)
+                priority, deadline = ask_job_schedule()
+                new_jobs = manager.add_jobs(file_names, urls, priority=priority, deadline=deadline)
+                probe_new_jobs(manager, new_jobs)
                 run_processing_pipeline(manager)
             break
             
@@ -319,22 +423,16 @@ def start_note_generation():
             break
             
         elif sub_choice == '6':
+            show_job_status(manager)
+            
+        elif sub_choice == '7':
             break
         else:
             print("❌ Invalid choice.")
 
 def configure_gemini_models():
     config = ConfigManager()
-    models_file = "models.json"
-    
-    available_models = []
-    if os.path.exists(models_file):
-        try:
-            with open(models_file, 'r') as f:
-                data = json.load(f)
-                available_models = data.get("models", [])
-        except Exception:
-            pass
+    available_models = ConfigManager.load_models_catalog().get("models", [])
             
     if not available_models:
         print("❌ No models found in models.json.")
@@ -415,7 +513,10 @@ def main_menu():
 
 if __name__ == "__main__":
     try:
-        main_menu()
+        if sys.argv[1:] == ["status"]:
+            show_job_status()
+        else:
+            main_menu()
     except KeyboardInterrupt:
         print("\n\nStopped by user.")
         sys.exit(0)